@@ -1,8 +1,10 @@
 from flask import Flask
 from .routes.chat_routes import chat_bp
 from .routes.home_routes import home_bp
+from .routes.metrics_routes import metrics_bp
 from .utils.logger import setup_logger
 from .utils.config import Config
+from .services.warmup import get_warmup
 
 def create_app():
     app = Flask(__name__)
@@ -14,5 +16,9 @@ def create_app():
     # Register blueprints
     app.register_blueprint(chat_bp)
     app.register_blueprint(home_bp)
+    app.register_blueprint(metrics_bp)
+
+    # The models load in the background by default, so '/' is served right away
+    get_warmup().start(Config.WARMUP_MODE)
     
     return app
\ No newline at end of file
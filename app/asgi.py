@@ -0,0 +1,318 @@
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+from . import create_app
+from .routes.chat_routes import _response_data, conversation_handlers, parse_chat_request
+from .services.metrics import get_metrics
+from .services.state_store import turn_keys
+from .utils.config import Config
+from .utils.logger import new_request_id, request_id_var
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def _run_turn(handler, message: str, session_id: str, user_id: str, language: str,
+              translated: Optional[str]) -> Tuple[str, Dict]:
+    """The CPU-bound part of a chat turn, run on the inference executor; the reply stays in English."""
+    with handler.state.turn(turn_keys(user_id, session_id)):
+        response = handler.generate_response(message, session_id, user_id, language, localize=False,
+                                             translated=translated)
+        context = handler.context.get_context(user_id)
+    return response, context
+
+
+class ChatASGIApp:
+    """
+    ASGI front end for the chat API.
+
+    POST /api/chat runs on the event loop: translation of the message and of
+    the reply is awaited on the translation service's I/O pool, and only the
+    turn itself (state, models, response generation) goes to a bounded
+    inference executor of `workers` threads. At most `max_pending` chat
+    requests are admitted at a time; beyond that the request is answered at
+    once with 503 and Retry-After instead of queueing without bound.
+
+    Every other route is served by the Flask app. Each WSGI call runs on a
+    thread of its own, in a copy of the request's context, together with the
+    iteration of its response and close(): streamed bodies (/api/chat/stream,
+    /api/chat/batch) are produced under the same Flask request context and
+    state store turn they started in, and are sent chunk by chunk as they come.
+
+    Request bodies are read into memory whole before the route runs (WSGI
+    reads wsgi.input synchronously), up to max_body_bytes; a larger body, or
+    a Content-Length announcing one, is answered with 413 without reading
+    the rest. Replays bigger than that go through replay.py.
+    """
+
+    def __init__(self, flask_app: Flask, workers: int = 4, max_pending: int = 64, retry_after_seconds: int = 1,
+                 max_body_bytes: int = 10 * 1024 * 1024):
+        self.flask_app = flask_app
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.retry_after_seconds = retry_after_seconds
+        self.max_body_bytes = max_body_bytes
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inference')
+        self.pending = 0
+        self._stats = {'accepted': 0, 'rejected': 0, 'completed': 0, 'errors': 0, 'max_pending_seen': 0}
+        self.metrics = get_metrics()
+        self.metrics.add_collector(self._collect_stats)
+
+    async def __call__(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            if _content_length(scope) > self.max_body_bytes:
+                await _send_too_large(send, self.max_body_bytes)
+            elif scope['path'] == '/api/chat' and scope['method'] == 'POST':
+                request_id = dict(scope.get('headers') or []).get(b'x-request-id', b'').decode('latin-1')
+                request_id_var.set(request_id or new_request_id())
+                await self.chat(receive, _with_request_id(send, request_id_var.get()))
+            else:
+                await self._call_wsgi(scope, receive, send)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, 'pending': self.pending, 'max_pending': self.max_pending, 'workers': self.workers}
+
+    def close(self) -> None:
+        self.metrics.remove_collector(self._collect_stats)
+        self.executor.shutdown(wait=True)
+
+    def _collect_stats(self):
+        return [
+            ('asgi_pending_requests', 'gauge', 'Chat requests admitted and not yet answered.', {}, self.pending),
+            ('asgi_rejected_total', 'counter', 'Chat requests answered 503 over the pending limit.', {},
+             self._stats['rejected']),
+        ]
+
+    async def chat(self, receive: Callable, send: Callable) -> None:
+        if self.pending >= self.max_pending:
+            self._stats['rejected'] += 1
+            await _send_json(send, 503, {"error": "Server busy",
+                                         "message": "Too many conversations at once. Please try again in a moment."},
+                             [(b'retry-after', str(self.retry_after_seconds).encode())])
+            return
+
+        self.pending += 1
+        self._stats['accepted'] += 1
+        self._stats['max_pending_seen'] = max(self._stats['max_pending_seen'], self.pending)
+        try:
+            body = await _read_body(receive, self.max_body_bytes)
+            if body is None:
+                await _send_too_large(send, self.max_body_bytes)
+                return
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                data = None
+            fields, error = parse_chat_request(data)
+            if error:
+                payload, status = error
+                await _send_json(send, status, payload)
+                return
+            session_id, user_id, message, language = fields
+
+            handler = conversation_handlers.get_or_create(session_id)
+            translated = None
+            if language != 'en':
+                # Timed here only: the turn is handed the English message and does not translate again
+                with self.metrics.time('translate_in'):
+                    translated = await handler.translator.translate_async(message, dest='en')
+            loop = asyncio.get_running_loop()
+            # In a copy of this task's context, so the turn's log records carry the request id
+            response, context = await loop.run_in_executor(
+                self.executor, contextvars.copy_context().run, _run_turn, handler, message, session_id, user_id,
+                language, translated)
+            if language != 'en':
+                with self.metrics.time('translate_out'):
+                    response = await handler.translator.translate_response_async(response, dest=language)
+            await _send_json(send, 200, _response_data(response, context))
+            self._stats['completed'] += 1
+        except Exception as e:
+            self._stats['errors'] += 1
+            logger.exception("Error in async chat endpoint: %s", e)
+            await _send_json(send, 500, {"error": "Internal server error",
+                                         "message": "I apologize, but something went wrong. Please try again."})
+        finally:
+            self.pending -= 1
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            event = await receive()
+            if event['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif event['type'] == 'lifespan.shutdown':
+                self.metrics.remove_collector(self._collect_stats)
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _call_wsgi(self, scope: Dict, receive: Callable, send: Callable) -> None:
+        body = await _read_body(receive, self.max_body_bytes)
+        if body is None:
+            await _send_too_large(send, self.max_body_bytes)
+            return
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue(maxsize=8)
+        finished = threading.Event()
+        # The call, every next() of a streamed body and close() on one thread and in one copy of
+        # this task's context: Flask's request context and the state store's turn live in contextvars
+        worker = threading.Thread(target=contextvars.copy_context().run, name='wsgi', daemon=True,
+                                  args=(self._serve_wsgi, _environ(scope, body), loop, events, finished))
+        worker.start()
+        try:
+            while True:
+                kind, payload = await events.get()
+                if kind == 'start':
+                    await send({'type': 'http.response.start', 'status': payload[0], 'headers': payload[1]})
+                elif kind == 'body':
+                    await send({'type': 'http.response.body', 'body': payload, 'more_body': True})
+                elif kind == 'error':
+                    raise payload
+                else:
+                    await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+                    return
+        finally:
+            # Stops the thread at its next chunk if the client went away
+            finished.set()
+
+    def _serve_wsgi(self, environ: Dict, loop: asyncio.AbstractEventLoop, events: asyncio.Queue,
+                    finished: threading.Event) -> None:
+        """Run the Flask app and its response iterable, passing the response to _call_wsgi through events."""
+        started: Dict = {}
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        def emit(kind: str, payload=None) -> None:
+            future = asyncio.run_coroutine_threadsafe(events.put((kind, payload)), loop)
+            while True:
+                try:
+                    future.result(timeout=0.1)
+                    return
+                except FutureTimeout:
+                    if finished.is_set():
+                        future.cancel()
+                        raise _ResponseAbandoned()
+
+        try:
+            result = self.flask_app.wsgi_app(environ, start_response)
+            try:
+                headers_sent = False
+                # One chunk at a time, so streamed responses (SSE, JSONL) are sent as they are produced
+                for chunk in result:
+                    if not headers_sent:
+                        emit('start', (started['status'], started['headers']))
+                        headers_sent = True
+                    if chunk:
+                        emit('body', chunk)
+                if not headers_sent:
+                    emit('start', (started['status'], started['headers']))
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            emit('end')
+        except _ResponseAbandoned:
+            pass
+        except Exception as e:
+            if not finished.is_set():
+                asyncio.run_coroutine_threadsafe(events.put(('error', e)), loop)
+
+
+class _ResponseAbandoned(Exception):
+    """_call_wsgi stopped reading the response (the client disconnected or sending failed)."""
+
+
+async def _read_body(receive: Callable, limit: int) -> Optional[bytes]:
+    """The whole request body, or None once it grows past limit bytes."""
+    chunks, size = [], 0
+    while True:
+        event = await receive()
+        if event['type'] == 'http.disconnect':
+            return b''.join(chunks)
+        chunk = event.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not event.get('more_body', False):
+            return b''.join(chunks)
+
+
+def _content_length(scope: Dict) -> int:
+    for name, value in scope.get('headers') or []:
+        if name == b'content-length':
+            try:
+                return int(value)
+            except ValueError:
+                return 0
+    return 0
+
+
+async def _send_too_large(send: Callable, limit: int) -> None:
+    await _send_json(send, 413, {"error": "Request body too large",
+                                 "message": f"Request bodies are limited to {limit} bytes."})
+
+
+def _with_request_id(send: Callable, request_id: str) -> Callable:
+    """send() that adds an X-Request-ID header to the response."""
+    async def send_with_id(message: Dict) -> None:
+        if message['type'] == 'http.response.start':
+            message = dict(message, headers=list(message.get('headers', [])) + [(b'x-request-id', request_id.encode())])
+        await send(message)
+    return send_with_id
+
+
+async def _send_json(send: Callable, status: int, payload: Dict, headers: Optional[Headers] = None) -> None:
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'),
+                            (b'content-length', str(len(body)).encode())] + (headers or [])})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _environ(scope: Dict, body: bytes) -> Dict:
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if key == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif key != 'CONTENT_LENGTH':
+            key = f"HTTP_{key}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(flask_app: Optional[Flask] = None) -> ChatASGIApp:
+    return ChatASGIApp(flask_app or create_app(), workers=Config.ASYNC_INFERENCE_WORKERS,
+                       max_pending=Config.ASYNC_MAX_PENDING, max_body_bytes=Config.ASYNC_MAX_BODY_BYTES)
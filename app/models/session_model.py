@@ -1,31 +1,157 @@
+import time
+from array import array
 from datetime import datetime
-from typing import List, Dict, Set
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.config import Config
+
+
+def _now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+def _iso(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000).isoformat()
+
+
+class ConversationHistory:
+    """
+    The last `capacity` user/bot message pairs of a session, in a ring.
+
+    Turns are stored as columns rather than a dict each: the two messages in
+    lists and the times in an array of int64 epoch milliseconds. The columns
+    grow with the first turns and, once full, the oldest turn is overwritten
+    in place. Times are kept non-decreasing and only formatted as ISO strings
+    when turns are read. Every turn keeps its sequence number (0 for the
+    first turn of the session, unaffected by wrapping), which serves as the
+    cursor for paging.
+    """
+
+    __slots__ = ('capacity', 'total', '_users', '_bots', '_times')
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"History capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.total = 0
+        self._users: List[str] = []
+        self._bots: List[str] = []
+        self._times = array('q')
+
+    def __len__(self) -> int:
+        return len(self._times)
+
+    @property
+    def oldest(self) -> int:
+        """Sequence number of the oldest turn still held."""
+        return self.total - len(self._times)
+
+    def append(self, user_message: str, bot_message: str, timestamp_ms: Optional[int] = None) -> None:
+        timestamp_ms = _now_ms() if timestamp_ms is None else timestamp_ms
+        if self.total:
+            timestamp_ms = max(timestamp_ms, self._times[(self.total - 1) % self.capacity])
+        if len(self._times) < self.capacity:
+            self._users.append(user_message)
+            self._bots.append(bot_message)
+            self._times.append(timestamp_ms)
+        else:
+            slot = self.total % self.capacity
+            self._users[slot] = user_message
+            self._bots[slot] = bot_message
+            self._times[slot] = timestamp_ms
+        self.total += 1
+
+    def turns(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Turns with sequence numbers in [start, stop) that are still held, oldest first."""
+        entries = []
+        for turn in range(max(start, self.oldest), min(stop, self.total)):
+            slot = turn % self.capacity
+            entries.append({
+                'turn': turn,
+                'user': self._users[slot],
+                'bot': self._bots[slot],
+                'timestamp': _iso(self._times[slot]),
+            })
+        return entries
+
+    def page(self, before: Optional[int] = None, limit: int = 20) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        The `limit` turns preceding the cursor `before` (the newest ones when
+        None), oldest first, and the cursor for the page before them (None when
+        no older turn is held).
+        """
+        end = self.total if before is None else max(self.oldest, min(before, self.total))
+        start = max(self.oldest, end - max(1, limit))
+        return self.turns(start, end), (start if start > self.oldest else None)
+
 
 class Session:
-    def __init__(self, session_id: str, user_id: str):
+    __slots__ = ('session_id', 'user_id', 'created_ms', 'history', '_context')
+
+    def __init__(self, session_id: str, user_id: str, history_size: Optional[int] = None):
         """Initialize a session with a unique ID and user ID."""
         self.session_id = session_id
         self.user_id = user_id
-        self.context = {
-            'user_name': None,
-            'user_id': user_id,  # Store user_id for context
-            'mood_history': [],
-            'risk_level': 'low',
-            'topics_discussed': set(),
-            'coping_strategies_suggested': set(),
-            'last_interaction': datetime.now(),
-            'session_duration': 0
-        }
-        self.conversation_history: List[Dict] = []
+        self.created_ms = _now_ms()
+        self.history = ConversationHistory(Config.SESSION_HISTORY_SIZE if history_size is None else history_size)
+        self._context: Optional[Dict] = None
+
+    @property
+    def context(self) -> Dict:
+        """Per-session context (used by ConversationManager); only built when first read."""
+        if self._context is None:
+            self._context = {
+                'user_name': None,
+                'user_id': self.user_id,  # Store user_id for context
+                'mood_history': [],
+                'risk_level': 'low',
+                'topics_discussed': set(),
+                'coping_strategies_suggested': set(),
+                'last_interaction': datetime.fromtimestamp(self.created_ms / 1000),
+                'session_duration': 0
+            }
+        return self._context
+
+    @property
+    def conversation_history(self) -> List[Dict]:
+        """Every turn still held, as a new list; add turns with update_conversation_history."""
+        return self.get_history()
 
     def update_conversation_history(self, user_message: str, bot_message: str) -> None:
         """Add a user-bot message pair to the conversation history."""
-        self.conversation_history.append({
-            'user': user_message,
-            'bot': bot_message,
-            'timestamp': datetime.now().isoformat()
-        })
+        self.history.append(user_message, bot_message)
 
     def get_history(self) -> List[Dict]:
-        """Return the conversation history."""
-        return self.conversation_history
\ No newline at end of file
+        """Return the conversation history (the last SESSION_HISTORY_SIZE turns), oldest first."""
+        return self.history.turns(0, self.history.total)
+
+    def history_page(self, before: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+        """One page of the history, newest first across pages: pass next_cursor as before for the next one."""
+        turns, next_cursor = self.history.page(before, limit)
+        return {
+            'session_id': self.session_id,
+            'turns': turns,
+            'next_cursor': next_cursor,
+            'total_turns': self.history.total,
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        if 'conversation_history' in state:
+            # Pickled before the history ring (e.g. still in Redis): a list of dicts with ISO times
+            legacy = state['conversation_history']
+            times = [int(datetime.fromisoformat(entry['timestamp']).timestamp() * 1000) for entry in legacy]
+            history = ConversationHistory(Config.SESSION_HISTORY_SIZE)
+            for entry, timestamp_ms in zip(legacy, times):
+                history.append(entry['user'], entry['bot'], timestamp_ms)
+            state = {
+                'session_id': state['session_id'],
+                'user_id': state['user_id'],
+                'created_ms': times[0] if times else _now_ms(),
+                'history': history,
+                '_context': state.get('context'),
+            }
+        for name in self.__slots__:
+            setattr(self, name, state.get(name))
@@ -1,62 +1,187 @@
-from flask import Blueprint, request, jsonify
-import traceback
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+import json
 import logging
-from typing import Dict
+from typing import Dict, Iterator, Optional, Tuple
 from dataclasses import asdict
 
+from app.services.batch_replay import BatchReplayer
 from app.services.conversation_handler import ConversationHandler
 from app.services.intents import MessageIntent
+from app.services.session_store import SessionStore
+from app.services.state_store import turn_keys
+from app.utils.config import Config
 from app.utils.helpers import validate_session
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 chat_bp = Blueprint('chat', __name__)
 
-conversation_handlers: Dict[str, ConversationHandler] = {}
+CRISIS_RESOURCES = {
+    "crisis_line": "1-800-273-8255",
+    "crisis_text": "Text HOME to 741741",
+    "emergency": "911"
+}
+
+# One ConversationHandler per session, evicted when least recently used or idle too long
+conversation_handlers = SessionStore(
+    lambda session_id: ConversationHandler(),
+    max_sessions=Config.MAX_SESSIONS,
+    idle_ttl_seconds=Config.SESSION_IDLE_TTL_SECONDS,
+    reap_interval_seconds=Config.SESSION_REAP_INTERVAL_SECONDS
+)
 
 @chat_bp.route('/api/chat', methods=['POST'])
 def chat():
     try:
-        data = request.get_json()
-        if not data:
-            logger.warning("No data provided in request")
-            return jsonify({"error": "No data provided"}), 400
-
-        session_id = data.get('session_id')
-        user_id = data.get('user_id', f"user_{session_id}")
-        message = data.get('message')
-        language = data.get('language', 'en')
-
-        if not session_id or not message or not user_id:
-            logger.warning("Missing required fields in request")
-            return jsonify({"error": "Missing session_id, user_id, or message"}), 400
-
-        if not validate_session(session_id):
-            logger.warning(f"Invalid session: {session_id}")
-            return jsonify({"error": "Invalid session"}), 401
+        fields, error = _read_chat_request()
+        if error:
+            return error
+        session_id, user_id, message, language = fields
 
         handler = _get_or_create_handler(session_id)
         response_data = _process_message(handler, message, session_id, user_id, language)
-        _cleanup_old_sessions()
 
         return jsonify(response_data)
 
     except Exception as e:
-        logger.error(f"Error in chat endpoint: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception("Error in chat endpoint: %s", e)
+        return _create_error_response(e)
+
+@chat_bp.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Server-Sent Events variant of /api/chat.
+
+    Events, each with a JSON payload:
+        crisis   sent as soon as the regex crisis check fires, before any model
+                 runs: {"message", "priority": "urgent", "resources"}
+        message  the reply: {"message"}
+        done     the same body /api/chat would have returned
+        error    {"error", "message"} if the turn failed
+    """
+    try:
+        fields, error = _read_chat_request()
+        if error:
+            return error
+        session_id, user_id, message, language = fields
+        handler = _get_or_create_handler(session_id)
+    except Exception as e:
+        logger.exception("Error in chat stream endpoint: %s", e)
         return _create_error_response(e)
 
+    def events():
+        try:
+            reply = None
+            with handler.state.turn(turn_keys(user_id, session_id)):
+                for event, text in handler.stream_response(message, session_id, user_id, language):
+                    reply = text
+                    if event == 'crisis':
+                        yield _sse('crisis', {"message": text, "priority": "urgent", "resources": CRISIS_RESOURCES})
+                    else:
+                        yield _sse(event, {"message": text})
+                context = handler.context.get_context(user_id)
+            yield _sse('done', _response_data(reply, context))
+        except Exception as e:
+            logger.exception("Error in chat stream: %s", e)
+            yield _sse('error', {"error": "Internal server error",
+                                 "message": "I apologize, but something went wrong. Please try again."})
+
+    # No buffering by proxies, so the crisis event reaches the client at once
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers=headers)
+
+@chat_bp.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Replay a JSONL body of turns ({"session_id", "message", "language"} per
+    line, optionally "user_id") and stream one JSON result per line back, in
+    input order. Turns run against a fresh state store, not the live sessions.
+    The last line is {"stats": {...}} with the throughput in turns per second.
+
+    Only served with BATCH_REPLAY_ROUTE=True (404 otherwise). batch_size and
+    window may lower, never raise, BATCH_REPLAY_SIZE and BATCH_REPLAY_WINDOW,
+    and bodies over BATCH_REPLAY_MAX_BYTES are refused with 413 (or, without a
+    Content-Length, end with an error line once the limit is passed).
+    """
+    if not Config.BATCH_REPLAY_ROUTE:
+        return jsonify({"error": "Not found"}), 404
+    if (request.content_length or 0) > Config.BATCH_REPLAY_MAX_BYTES:
+        return jsonify({"error": "Request body too large",
+                        "message": f"Replays are limited to {Config.BATCH_REPLAY_MAX_BYTES} bytes."}), 413
+    batch_size = min(request.args.get('batch_size', Config.BATCH_REPLAY_SIZE, type=int), Config.BATCH_REPLAY_SIZE)
+    window = min(request.args.get('window', Config.BATCH_REPLAY_WINDOW, type=int), Config.BATCH_REPLAY_WINDOW)
+    replayer = BatchReplayer(batch_size=batch_size, window=window)
+    lines = _limited_lines(request.stream, Config.BATCH_REPLAY_MAX_BYTES)
+
+    def results():
+        try:
+            for result in replayer.replay(lines):
+                yield json.dumps(result) + "\n"
+        except _BodyTooLarge:
+            yield json.dumps({"error": "Request body too large"}) + "\n"
+        except Exception as e:
+            logger.exception("Error in chat batch: %s", e)
+            yield json.dumps({"error": "Internal server error"}) + "\n"
+        yield json.dumps({"stats": replayer.stats()}) + "\n"
+
+    return Response(stream_with_context(results()), mimetype='application/x-ndjson')
+
+class _BodyTooLarge(Exception):
+    pass
+
+def _limited_lines(stream, limit: int) -> Iterator[str]:
+    """Decoded lines of the stream, raising _BodyTooLarge once more than limit bytes were read."""
+    size = 0
+    for line in stream:
+        size += len(line)
+        if size > limit:
+            raise _BodyTooLarge()
+        yield line.decode('utf-8')
+
+def _read_chat_request() -> Tuple[Optional[Tuple[str, str, str, str]], Optional[tuple]]:
+    """(session_id, user_id, message, language) from the JSON body, or an error response."""
+    fields, error = parse_chat_request(request.get_json())
+    if error:
+        payload, status = error
+        return None, (jsonify(payload), status)
+    return fields, None
+
+def parse_chat_request(data: Optional[Dict]) -> Tuple[Optional[Tuple[str, str, str, str]], Optional[Tuple[Dict, int]]]:
+    """(session_id, user_id, message, language) from a decoded chat body, or an (error payload, status) pair."""
+    if not data:
+        logger.warning("No data provided in request")
+        return None, ({"error": "No data provided"}, 400)
+
+    session_id = data.get('session_id')
+    user_id = data.get('user_id', f"user_{session_id}")
+    message = data.get('message')
+    language = data.get('language', 'en')
+
+    if not session_id or not message or not user_id:
+        logger.warning("Missing required fields in request")
+        return None, ({"error": "Missing session_id, user_id, or message"}, 400)
+
+    if not validate_session(session_id):
+        logger.warning("Invalid session: %s", session_id)
+        return None, ({"error": "Invalid session"}, 401)
+
+    return (session_id, user_id, message, language), None
+
+def _sse(event: str, payload: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 def _get_or_create_handler(session_id: str) -> ConversationHandler:
-    if session_id not in conversation_handlers:
-        logger.info(f"Creating new conversation handler for session: {session_id}")
-        conversation_handlers[session_id] = ConversationHandler()
-    return conversation_handlers[session_id]
+    return conversation_handlers.get_or_create(session_id)
 
 def _process_message(handler: ConversationHandler, message: str, session_id: str, user_id: str, language: str) -> dict:
-    response = handler.generate_response(message, session_id, user_id, language)
-    context = handler.context.get_context(user_id)
+    # The context read joins the handler's turn, so the state store is read once
+    with handler.state.turn(turn_keys(user_id, session_id)):
+        response = handler.generate_response(message, session_id, user_id, language)
+        context = handler.context.get_context(user_id)
     
+    return _response_data(response, context)
+
+def _response_data(response: str, context: Dict) -> dict:
     # Convert MessageIntent to string if present
     previous_intent = context.get("previous_intent")
     if isinstance(previous_intent, MessageIntent):
@@ -75,11 +200,7 @@ def _process_message(handler: ConversationHandler, message: str, session_id: str
     if context["crisis_mode"]:
         response_data.update({
             "priority": "urgent",
-            "resources": {
-                "crisis_line": "1-800-273-8255",
-                "crisis_text": "Text HOME to 741741",
-                "emergency": "911"
-            }
+            "resources": CRISIS_RESOURCES
         })
 
     return response_data
@@ -92,14 +213,3 @@ def _create_error_response(error: Exception) -> tuple:
     if logger.getEffectiveLevel() == logging.DEBUG:
         response["details"] = str(error)
     return jsonify(response), 500
-
-def _cleanup_old_sessions(max_sessions: int = 1000):
-    if len(conversation_handlers) > max_sessions:
-        sorted_sessions = sorted(
-            conversation_handlers.items(),
-            key=lambda x: x[1].context.get_context(x[1].sessions.get('default-session', Session('default-session', 'default-user')).user_id)["interaction_count"]
-        )
-        sessions_to_remove = len(conversation_handlers) - max_sessions
-        for session_id, _ in sorted_sessions[:sessions_to_remove]:
-            logger.info(f"Cleaning up old session: {session_id}")
-            del conversation_handlers[session_id]
\ No newline at end of file
@@ -1,7 +1,14 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, jsonify, render_template
+from app.services.warmup import get_warmup
 
 home_bp = Blueprint('home', __name__)
 
 @home_bp.route('/')
 def home():
-    return render_template('index.html')
\ No newline at end of file
+    return render_template('index.html')
+
+@home_bp.route('/ready')
+def ready():
+    """Readiness probe: 200 once the models are loaded, 503 while warming up."""
+    status = get_warmup().status()
+    return jsonify(status), 200 if status['ready'] else 503
@@ -0,0 +1,52 @@
+from flask import Blueprint, Response
+from typing import List
+
+from app.routes.chat_routes import conversation_handlers
+from app.services.metrics import Sample, get_metrics
+from app.services.model_registry import get_registry
+from app.services.state_store import get_state_store
+from app.utils.logger import dropped_records
+
+metrics_bp = Blueprint('metrics', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def collect_service_stats() -> List[Sample]:
+    """Counters the services already keep, read when /metrics is scraped (only for what is loaded)."""
+    samples: List[Sample] = []
+    registry = get_registry()
+    loaded = registry.loaded()
+    caches = []
+    if 'analysis_cache' in loaded and registry.analysis_cache() is not None:
+        caches.append(('analysis', registry.analysis_cache().stats()))
+    if 'translation_service' in loaded:
+        caches.append(('translation', registry.translation_service().stats()))
+    for cache, stats in caches:
+        labels = {'cache': cache}
+        samples.append(('cache_hits_total', 'counter', 'Cache lookups that were hits.', labels, stats['hits']))
+        samples.append(('cache_misses_total', 'counter', 'Cache lookups that were misses.', labels, stats['misses']))
+        samples.append(('cache_entries', 'gauge', 'Entries held in the cache.', labels, stats['size']))
+
+    sessions = conversation_handlers.stats()
+    samples.append(('live_sessions', 'gauge', 'Chat sessions with a live conversation handler.', {}, sessions['live']))
+    samples.append(('sessions_created_total', 'counter', 'Chat sessions created.', {}, sessions['created']))
+    samples.append(('sessions_evicted_total', 'counter', 'Chat sessions dropped for being idle or over the cap.', {},
+                    sessions['expired_idle'] + sessions['evicted_lru']))
+
+    state = get_state_store()
+    if hasattr(state, 'stats'):
+        samples.append(('state_keys', 'gauge', 'Per-user and per-session state keys held in this process.', {},
+                        state.stats()['keys']))
+    samples.append(('log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full.', {},
+                    dropped_records()))
+    return samples
+
+
+get_metrics().add_collector(collect_service_stats)
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Per-stage latency and batch size histograms, cache and session counters in the Prometheus text format."""
+    return Response(get_metrics().render(), content_type=CONTENT_TYPE)
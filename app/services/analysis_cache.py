@@ -0,0 +1,197 @@
+# services/analysis_cache.py
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_message(message: str) -> str:
+    """
+    Lowercase, collapse whitespace and trim.
+
+    Both DistilBERT and MiniLM use uncased tokenizers that split on whitespace,
+    so messages that normalize to the same text get the same sentiment and embedding.
+    """
+    return _WHITESPACE.sub(' ', message).strip().lower()
+
+
+def cache_key(message: str) -> str:
+    """Digest of the normalized message, so user text is never kept in the cache or on disk."""
+    return hashlib.blake2b(normalize_message(message).encode('utf-8'), digest_size=16).hexdigest()
+
+
+class AnalysisCache:
+    """
+    Bounded LRU cache of model outputs (sentiment, embedding) keyed on normalized text.
+
+    Shared by every session in the process. Entries older than ttl_seconds are
+    treated as misses, and the least recently used entry is evicted once
+    max_entries is reached. Cached embeddings are read-only arrays handed to
+    every caller, so they must not be modified in place.
+
+    With a path, entries are also written to an SQLite file. A new process
+    loads the most recent entries back into memory, and memory misses fall
+    through to the file before running the models. Rows on disk belong to a
+    namespace naming the models that produced them (see
+    model_registry.analysis_namespace), so a process only reads what its own
+    models would have computed. With dimension set (or learned from the first
+    put), embeddings of any other size are never returned and are dropped
+    from the file on load.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400.0, path: Optional[str] = None,
+                 clock: Callable[[], float] = time.time, namespace: str = '', dimension: Optional[int] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+        self.clock = clock
+        self.namespace = namespace
+        self.dimension = dimension
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'disk_hits': 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._open(path)
+
+    def get(self, message: str) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """Return (sentiment, embedding) for a message, or None on a miss."""
+        key = cache_key(message)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl and self._fits(entry[2]):
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[1], entry[2]
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+        entry = self._read(key, now)
+        with self._lock:
+            if entry is None or not self._fits(entry[2]):
+                self._stats['misses'] += 1
+                return None
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            self._insert(key, entry)
+        return entry[1], entry[2]
+
+    def put(self, message: str, sentiment: Dict[str, Any], embedding: Any) -> Tuple[Dict[str, Any], np.ndarray]:
+        """Store model outputs for a message; returns the (shared, read-only) cached values."""
+        key = cache_key(message)
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        if self.dimension is None:
+            self.dimension = embedding.size
+        entry = (self.clock(), dict(sentiment), embedding)
+        with self._lock:
+            self._insert(key, entry)
+        self._write(key, entry)
+        return entry[1], entry[2]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss/eviction counters since the cache was created."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Drop every entry from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute('DELETE FROM analyses WHERE namespace = ?', (self.namespace,))
+                self._db.commit()
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _fits(self, embedding: np.ndarray) -> bool:
+        return self.dimension is None or embedding.size == self.dimension
+
+    def _insert(self, key: str, entry: Tuple[float, Dict[str, Any], np.ndarray]) -> None:
+        # Caller holds self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _open(self, path: str) -> None:
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS analyses (namespace TEXT, key TEXT, created REAL, sentiment TEXT, '
+            'dimension INTEGER, embedding BLOB, PRIMARY KEY (namespace, key))'
+        )
+        self._db.execute('DELETE FROM analyses WHERE created < ?', (self.clock() - self.ttl,))
+        if self.dimension is not None:
+            self._db.execute('DELETE FROM analyses WHERE namespace = ? AND dimension != ?',
+                             (self.namespace, self.dimension))
+        self._db.commit()
+
+        rows = self._db.execute(
+            'SELECT key, created, sentiment, embedding FROM analyses WHERE namespace = ? '
+            'ORDER BY created DESC LIMIT ?',
+            (self.namespace, self.max_entries)
+        ).fetchall()
+        with self._lock:
+            for key, created, sentiment, embedding in reversed(rows):
+                self._insert(key, self._decode(created, sentiment, embedding))
+        logger.info(f"Loaded {len(rows)} cached analyses from {path}")
+
+    def _read(self, key: str, now: float) -> Optional[Tuple[float, Dict[str, Any], np.ndarray]]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT created, sentiment, embedding FROM analyses WHERE namespace = ? AND key = ?',
+                (self.namespace, key)
+            ).fetchone()
+        if row is None or now - row[0] > self.ttl:
+            return None
+        return self._decode(*row)
+
+    def _write(self, key: str, entry: Tuple[float, Dict[str, Any], np.ndarray]) -> None:
+        if self._db is None:
+            return
+        created, sentiment, embedding = entry
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.namespace, key, created, json.dumps(sentiment, default=float), embedding.size,
+                     embedding.tobytes())
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            # The disk tier is best effort; the in-memory entry is already stored
+            logger.error(f"Error writing analysis cache entry: {str(e)}")
+
+    @staticmethod
+    def _decode(created: float, sentiment: str, embedding: bytes) -> Tuple[float, Dict[str, Any], np.ndarray]:
+        vector = np.frombuffer(embedding, dtype=np.float32)  # read-only view of the blob
+        return created, json.loads(sentiment), vector
@@ -0,0 +1,146 @@
+# services/batch_replay.py
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .conversation_handler import ConversationHandler
+from .intents import MessageIntent
+from .model_registry import ModelRegistry, get_registry
+from .state_store import InMemoryStateStore, StateStore, turn_keys
+
+logger = logging.getLogger(__name__)
+
+# (index, session_id, user_id, message, language)
+Turn = Tuple[int, str, str, str, str]
+
+
+def parse_turn(index: int, line: Any) -> Turn:
+    """One replay turn from a JSONL line (or an already decoded dict); raises ValueError if invalid."""
+    data = json.loads(line) if isinstance(line, (str, bytes)) else line
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object")
+    session_id = data.get('session_id')
+    message = data.get('message')
+    if not session_id or not message:
+        raise ValueError("Missing session_id or message")
+    session_id = str(session_id)
+    user_id = str(data.get('user_id') or f"user_{session_id}")
+    return index, session_id, user_id, str(message), data.get('language') or 'en'
+
+
+class BatchReplayer:
+    """
+    Replays recorded conversation turns through the bot in bulk.
+
+    Input is read in windows of `window` turns. Within a window the turns are
+    grouped into waves: wave k holds the k-th turn of every session in the
+    window, so each session's turns still run in their recorded order, while
+    the messages of one wave go through translation and the sentiment and
+    embedding models together, in batches of up to `batch_size`. The turns
+    of the wave then run through the ConversationHandler one by one with
+    their analysis already computed.
+
+    State lives in its own InMemoryStateStore by default, so a replay never
+    touches the conversation state of live users.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, state: Optional[StateStore] = None,
+                 batch_size: int = 32, window: int = 1024):
+        registry = registry or get_registry()
+        self.state = state if state is not None else InMemoryStateStore(max_keys=10 ** 6)
+        self.handler = ConversationHandler(registry, self.state)
+        self.batch_size = max(1, batch_size)
+        self.window = max(1, window)
+        self._stats = {'turns': 0, 'errors': 0, 'batches': 0, 'seconds': 0.0}
+        self._sessions = set()
+
+    def replay(self, lines: Iterable[Any]) -> Iterator[Dict]:
+        """
+        Yield one result per input line, in input order.
+
+        Lines are JSON objects (or JSONL strings) with session_id, message and
+        optionally language and user_id. Invalid lines yield {"index", "error"}.
+        """
+        pending: List[Any] = []
+        for index, line in enumerate(lines):
+            if isinstance(line, (str, bytes)) and not line.strip():
+                continue
+            pending.append((index, line))
+            if len(pending) >= self.window:
+                yield from self._replay_window(pending)
+                pending = []
+        if pending:
+            yield from self._replay_window(pending)
+
+    def stats(self) -> Dict[str, float]:
+        seconds = self._stats['seconds']
+        turns = self._stats['turns']
+        return {
+            **self._stats,
+            'sessions': len(self._sessions),
+            'turns_per_second': turns / seconds if seconds else 0.0,
+            'avg_batch_size': turns / self._stats['batches'] if self._stats['batches'] else 0.0,
+        }
+
+    def _replay_window(self, lines: List[Tuple[int, Any]]) -> List[Dict]:
+        started = time.perf_counter()
+        results: Dict[int, Dict] = {}
+        waves: List[List[Turn]] = []
+        depth: Dict[str, int] = {}
+        for index, line in lines:
+            try:
+                turn = parse_turn(index, line)
+            except (ValueError, TypeError) as e:
+                self._stats['errors'] += 1
+                results[index] = {'index': index, 'error': str(e)}
+                continue
+            wave = depth.get(turn[1], 0)
+            depth[turn[1]] = wave + 1
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(turn)
+
+        for wave in waves:
+            for start in range(0, len(wave), self.batch_size):
+                for turn in self._run_batch(wave[start:start + self.batch_size]):
+                    results[turn['index']] = turn
+
+        self._stats['seconds'] += time.perf_counter() - started
+        return [results[index] for index in sorted(results)]
+
+    def _run_batch(self, turns: List[Turn]) -> List[Dict]:
+        handler = self.handler
+        english = [message for _, _, _, message, _ in turns]
+        # The handler translates with the same service, so these land in its cache
+        foreign = [i for i, (_, _, _, _, language) in enumerate(turns) if language != 'en']
+        if foreign:
+            translated = handler.translator.translate_many([english[i] for i in foreign], dest='en')
+            for i, text in zip(foreign, translated):
+                english[i] = text
+        analyses = handler.analysis_pipeline.analyze_batch(english)
+        self._stats['batches'] += 1
+
+        results = []
+        for (index, session_id, user_id, message, language), analysis in zip(turns, analyses):
+            with self.state.turn(turn_keys(user_id, session_id)):
+                response = handler.generate_response(message, session_id, user_id, language, analysis=analysis)
+                context = handler.context.get_context(user_id)
+            intent = context.get('previous_intent')
+            if isinstance(intent, MessageIntent):
+                intent = intent.value
+            results.append({
+                'index': index,
+                'session_id': session_id,
+                'user_id': user_id,
+                'language': language,
+                'message': message,
+                'response': response,
+                'sentiment': {'label': analysis.sentiment['label'], 'score': float(analysis.sentiment['score'])},
+                'intent': intent,
+                'themes': sorted(context.get('identified_themes', ())),
+                'crisis_mode': bool(context.get('crisis_mode')),
+            })
+            self._stats['turns'] += 1
+            self._sessions.add(session_id)
+        return results
@@ -1,15 +1,14 @@
 from typing import Dict, Set, Optional
 import logging
 from datetime import datetime
+from .state_store import StateStore, InMemoryStateStore, get_state_store, user_key
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ConversationContext:
-    def __init__(self):
-        self.in_memory = True
-        self.context_store: Dict[str, Dict] = {}
-        logger.info("Initialized in-memory context storage")
+    def __init__(self, state: Optional[StateStore] = None):
+        self.state = state if state is not None else get_state_store()
+        self.in_memory = isinstance(self.state, InMemoryStateStore)
 
     def update_context(
         self,
@@ -22,7 +21,7 @@ class ConversationContext:
         preferences: Optional[Dict] = None,
         emotional_state: Optional[str] = None
     ) -> None:
-        """Update user context in in-memory store."""
+        """Update user context in the state store."""
         context = {
             "user_id": user_id,
             "intent": intent,
@@ -36,15 +35,15 @@ class ConversationContext:
             "last_updated": datetime.utcnow().isoformat()
         }
         try:
-            self.context_store[user_id] = context
-            logger.debug(f"Updated context for user {user_id}")
+            self.state.set(user_key('context', user_id), context)
+            logger.debug("Updated context for user %s", user_id)
         except Exception as e:
             logger.error(f"Failed to update context for user {user_id}: {str(e)}")
 
     def get_context(self, user_id: str) -> Dict:
-        """Retrieve user context from in-memory store."""
+        """Retrieve user context from the state store."""
         try:
-            return self.context_store.get(user_id, {
+            return self.state.get(user_key('context', user_id)) or {
                 "user_id": user_id,
                 "intent": None,
                 "interaction_count": 0,
@@ -55,7 +54,7 @@ class ConversationContext:
                 "emotional_state": "validation",
                 "previous_intent": None,
                 "last_updated": datetime.utcnow().isoformat()
-            })
+            }
         except Exception as e:
             logger.error(f"Failed to retrieve context for user {user_id}: {str(e)}")
             return {
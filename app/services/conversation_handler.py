@@ -1,31 +1,36 @@
-from typing import Dict, Optional
-from googletrans import Translator
+from typing import Dict, Iterator, Optional, Tuple
 import logging
-from .message_analyzer import MessageAnalyzer
 from .response_generator import ResponseGenerator
-from .crisis_handler import CrisisHandler
 from .context import ConversationContext
 from .sentiment_analyzer import SentimentAnalyzer
 from .intents import MessageIntent
+from .message_analysis import MessageAnalysis
+from .metrics import get_metrics
+from .model_registry import ModelRegistry, get_registry
+from .state_store import StateStore, get_state_store, session_key, turn_keys
 from app.models.session_model import Session
 from datetime import datetime
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class ConversationHandler:
-    def __init__(self):
-        self.analyzer = MessageAnalyzer()
-        self.response_generator = ResponseGenerator()
-        self.crisis_handler = CrisisHandler()
-        self.sentiment_analyzer = SentimentAnalyzer()
-        self.context = ConversationContext()
-        self.translator = Translator()
-        self.sessions = {}
+    def __init__(self, registry: Optional[ModelRegistry] = None, state: Optional[StateStore] = None):
+        registry = registry or get_registry()
+        # Stateless services: one instance per process, shared by every handler
+        self.analysis_pipeline = registry.analysis_pipeline()
+        self.analyzer = registry.message_analyzer()
+        self.crisis_handler = registry.crisis_handler()
+        self.translator = registry.translation_service()
+        # Per-user and per-session state lives in the state store, so any worker can serve any turn
+        self.state = state if state is not None else get_state_store()
+        self.response_generator = ResponseGenerator(registry, self.state)
+        self.sentiment_analyzer = SentimentAnalyzer(registry, self.state)
+        self.context = ConversationContext(self.state)
+        self.metrics = get_metrics()
 
     def create_session(self, session_id: str, user_id: str) -> None:
         try:
-            self.sessions[session_id] = Session(session_id, user_id)
+            self.state.set(session_key(session_id), Session(session_id, user_id))
             self.context.update_context(
                 user_id=user_id,
                 intent=None,
@@ -36,25 +41,79 @@ class ConversationHandler:
                 preferences={'preferred_technique': 'breathing'},
                 emotional_state='validation'
             )
-            logger.info(f"Created session {session_id} for user {user_id}")
+            logger.info("Created session %s for user %s", session_id, user_id)
         except Exception as e:
             logger.error(f"Failed to create session {session_id}: {str(e)}")
             raise
 
-    def generate_response(self, message: str, session_id: str = None, user_id: str = None, language: str = 'en') -> str:
+    def generate_response(self, message: str, session_id: str = None, user_id: str = None, language: str = 'en',
+                          analysis: Optional[MessageAnalysis] = None, localize: bool = True,
+                          translated: Optional[str] = None) -> str:
+        """
+        Reply to one message. analysis, when given, is the model output for the
+        (English) message computed ahead of time, e.g. in a batch with other
+        sessions' messages; otherwise the analysis pipeline runs here. With
+        localize=False the reply is returned in English, for callers that
+        translate it themselves; translated is the English message for callers
+        that translated it themselves.
+        """
+        session_id = session_id or 'default-session'
+        user_id = user_id or 'default-user'
+        with self.metrics.record_stages() as timings:
+            # One read and one write round trip to the state store for the whole turn
+            with self.metrics.time('turn'), self.state.turn(turn_keys(user_id, session_id)):
+                response = self._generate_response(message, session_id, user_id, language, analysis, localize,
+                                                   translated)
+        logger.info("Chat turn", extra={'session_id': session_id, 'language': language, 'stage_ms': timings})
+        return response
+
+    def stream_response(self, message: str, session_id: str = None, user_id: str = None,
+                        language: str = 'en') -> Iterator[Tuple[str, str]]:
+        """
+        Generate the reply in (event, text) steps for streaming.
+
+        When the regex crisis check fires, ('crisis', crisis response) comes
+        first, before translation or any model runs. The turn is then handled
+        as generate_response would, and its reply follows as ('message', text)
+        unless it is the crisis response already sent.
+        """
+        session_id = session_id or 'default-session'
+        user_id = user_id or 'default-user'
+        with self.state.turn(turn_keys(user_id, session_id)):
+            early = None
+            if self.crisis_handler.matches_crisis_pattern(message):
+                early = self._localize(self.crisis_handler.generate_crisis_response(self.context.get_context(user_id)), language)
+                yield 'crisis', early
+            # Not around the yields: the time the client takes to read an event is not a stage
+            with self.metrics.record_stages() as timings:
+                response = self._generate_response(message, session_id, user_id, language)
+            logger.info("Chat turn", extra={'session_id': session_id, 'language': language, 'stage_ms': timings,
+                                            'streamed': True})
+            if response != early:
+                yield 'message', response
+
+    def _generate_response(self, message: str, session_id: str, user_id: str, language: str,
+                           analysis: Optional[MessageAnalysis] = None, localize: bool = True,
+                           translated: Optional[str] = None) -> str:
         original_message = message
+        reply_language = language if localize else 'en'
         try:
-            session_id = session_id or 'default-session'
-            user_id = user_id or 'default-user'
-
-            if session_id not in self.sessions:
+            if self.state.get(session_key(session_id)) is None:
                 self.create_session(session_id, user_id)
 
-            if language != 'en':
-                message = self.translator.translate(message, dest='en').text
-                logger.debug(f"Translated message from {language} to en: {message}")
+            if language != 'en' and translated is not None:
+                message = translated
+            elif language != 'en':
+                with self.metrics.time('translate_in'):
+                    message = self.translator.translate(message, dest='en')
+                logger.debug("Translated message from %s to en", language, extra={'user_text': message})
 
-            sentiment_result = self.sentiment_analyzer.analyze_message(message, {'user_id': user_id})
+            # Single inference pass: every later stage reads this result
+            if analysis is None or analysis.text != message:
+                with self.metrics.time('analysis'):
+                    analysis = self.analysis_pipeline.analyze(message)
+            with self.metrics.time('themes'):
+                sentiment_result = self.sentiment_analyzer.analyze_message(message, {'user_id': user_id}, analysis)
             context = self.context.get_context(user_id)
             context.update({
                 'sentiment_analysis': sentiment_result,
@@ -64,7 +123,9 @@ class ConversationHandler:
                 'preferences': context.get('preferences', {'preferred_technique': 'breathing'})
             })
 
-            if self.crisis_handler.is_crisis_message(message, sentiment_result):
+            with self.metrics.time('crisis_check'):
+                crisis = self.crisis_handler.is_crisis_message(message, sentiment_result)
+            if crisis:
                 self.context.update_context(
                     user_id=user_id,
                     intent=MessageIntent.CRISIS.value,  # Convert to string
@@ -77,9 +138,10 @@ class ConversationHandler:
                 )
                 response = self.crisis_handler.generate_crisis_response(context)
                 self._update_session(session_id, original_message, response)
-                return self.translator.translate(response, dest=language).text if language != 'en' else response
+                return self._localize(response, reply_language)
 
-            intent, details = self.analyzer.analyze_message(message, context)
+            with self.metrics.time('intent'):
+                intent, details = self.analyzer.analyze_message(message, context, analysis)
             context['details'] = details
 
             if 'anxiety' in sentiment_result['themes'] and context['interaction_count'] > 2:
@@ -97,17 +159,27 @@ class ConversationHandler:
                 emotional_state='validation'
             )
 
-            response = self.response_generator.generate_response(intent, context)
+            with self.metrics.time('response'):
+                response = self.response_generator.generate_response(intent, context)
             self._update_session(session_id, original_message, response)
-            return self.translator.translate(response, dest=language).text if language != 'en' else response
+            return self._localize(response, reply_language)
 
         except Exception as e:
             logger.error(f"Error in conversation handler: {str(e)}")
             fallback = "I’m having trouble understanding. Can you say that again?"
             self._update_session(session_id, original_message, fallback)
-            return self.translator.translate(fallback, dest=language).text if language != 'en' else fallback
+            return self._localize(fallback, reply_language)
+
+    def _localize(self, response: str, language: str) -> str:
+        if language == 'en':
+            return response
+        # Canned paragraphs are usually already in the translation cache
+        with self.metrics.time('translate_out'):
+            return self.translator.translate_response(response, dest=language)
 
     def _update_session(self, session_id: str, user_message: str, bot_message: str) -> None:
-        if session_id in self.sessions:
-            self.sessions[session_id].update_conversation_history(user_message, bot_message)
-            logger.debug(f"Updated session {session_id} with user: {user_message}, bot: {bot_message}")
\ No newline at end of file
+        session = self.state.get(session_key(session_id))
+        if session is not None:
+            session.update_conversation_history(user_message, bot_message)
+            self.state.set(session_key(session_id), session)
+            logger.debug("Updated session %s", session_id, extra={'user_text': user_message, 'bot_text': bot_message})
\ No newline at end of file
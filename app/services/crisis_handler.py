@@ -13,8 +13,12 @@ class CrisisHandler:
             re.compile(r'no\s*reason\s*to\s*go\s*on', re.IGNORECASE),
         ]
 
+    def matches_crisis_pattern(self, message: str) -> bool:
+        """Regex-only check: needs no model output, so it can run before any inference."""
+        return any(pattern.search(message) for pattern in self.crisis_patterns)
+
     def is_crisis_message(self, message: str, sentiment_result: Dict = None) -> bool:
-        if any(pattern.search(message) for pattern in self.crisis_patterns):
+        if self.matches_crisis_pattern(message):
             return True
         if sentiment_result and 'crisis' in sentiment_result.get('themes', []):
             return True
@@ -0,0 +1,157 @@
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Collect single-item inference requests from many threads and run them as one batch.
+
+    A worker thread waits for the first request, then keeps gathering requests
+    until either max_batch_size items are queued or max_wait_ms has passed since
+    the first one arrived. The batch function receives the list of items and must
+    return one result per item, in order.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: int = 16,
+                 max_wait_ms: float = 5.0, name: str = 'batcher'):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue: "queue.Queue[Optional[Tuple[Any, Future, float]]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'errors': 0,
+            'max_batch_size': 0,
+            'queue_wait_seconds': 0.0,
+            'inference_seconds': 0.0,
+            'latency_seconds': 0.0,
+        }
+        # Held to check _closed and queue in one step, so nothing is queued behind the stop marker
+        self._submit_lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name=f"{name}-worker", daemon=True)
+        self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue an item and return a Future that resolves to its result."""
+        future: Future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError(f"{self.name} is closed")
+            self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    def close(self) -> None:
+        """Stop the worker once the already queued requests have been served."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._worker.join()
+
+    def stats(self) -> Dict[str, float]:
+        """Throughput and latency counters since the batcher was created."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        requests = stats['requests'] or 1
+        batches = stats['batches'] or 1
+        stats['avg_batch_size'] = stats['requests'] / batches
+        stats['avg_queue_wait_ms'] = stats['queue_wait_seconds'] * 1000 / requests
+        stats['avg_latency_ms'] = stats['latency_seconds'] * 1000 / requests
+        return stats
+
+    def _collect(self, first: Tuple[Any, Future, float]) -> Tuple[List[Tuple[Any, Future, float]], bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+        return batch, False
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, stop = self._collect(first)
+            started = time.perf_counter()
+            try:
+                results = self.batch_fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise ValueError(f"{self.name}: batch function returned {len(results)} results for {len(batch)} items")
+            except Exception as e:
+                logger.error(f"{self.name}: batch of {len(batch)} failed: {str(e)}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._stats_lock:
+                    self._stats['errors'] += len(batch)
+                continue
+            finished = time.perf_counter()
+            get_metrics().observe_batch(self.name, len(batch))
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+            with self._stats_lock:
+                self._stats['requests'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['max_batch_size'] = max(self._stats['max_batch_size'], len(batch))
+                self._stats['inference_seconds'] += finished - started
+                for _, _, submitted in batch:
+                    self._stats['queue_wait_seconds'] += started - submitted
+                    self._stats['latency_seconds'] += finished - submitted
+
+
+class InferenceScheduler:
+    """
+    Micro-batching front end for the shared sentiment and embedding models.
+
+    Concurrent requests for DistilBERT sentiment and MiniLM embeddings are
+    grouped into padded batches instead of running one message at a time.
+    """
+
+    def __init__(self, sentiment_model, embedding_model, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        self.sentiment_batcher = MicroBatcher(
+            lambda texts: sentiment_model(texts, batch_size=len(texts)),
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name='sentiment'
+        )
+        self.embedding_batcher = MicroBatcher(
+            lambda texts: list(embedding_model.encode(texts, batch_size=len(texts))),
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name='embedding'
+        )
+
+    def infer(self, message: str) -> Tuple[Dict[str, Any], Any]:
+        """Return (sentiment, embedding) for a message; both models are queued at once."""
+        sentiment = self.sentiment_batcher.submit(message)
+        embedding = self.embedding_batcher.submit(message)
+        return sentiment.result(), embedding.result()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            'sentiment': self.sentiment_batcher.stats(),
+            'embedding': self.embedding_batcher.stats(),
+        }
+
+    def close(self) -> None:
+        self.sentiment_batcher.close()
+        self.embedding_batcher.close()
@@ -0,0 +1,87 @@
+# services/intent_classifier.py
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .intent_matcher import DEFAULT_PRIORITY, IntentMatcher
+from .intents import MessageIntent
+from .theme_index import ThemeEmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+INTENT_ENGINES = ('regex', 'hybrid')
+
+
+@dataclass(frozen=True)
+class IntentPrediction:
+    intent: MessageIntent
+    # 1.0 for a regex fast-path match, the nearest exemplar's similarity for an embedding one
+    score: float
+    source: str  # 'regex' or 'embedding'
+
+
+def build_exemplar_index(embedding_model: Any, exemplars: Dict[MessageIntent, List[str]],
+                         dtype: str = 'float32') -> ThemeEmbeddingIndex:
+    """Embed every exemplar in one encode call and stack them, grouped by intent, into one matrix."""
+    phrases = [phrase for intent_phrases in exemplars.values() for phrase in intent_phrases]
+    embeddings = np.asarray(embedding_model.encode(phrases), dtype=np.float32)
+    by_intent, start = {}, 0
+    for intent, intent_phrases in exemplars.items():
+        by_intent[intent.value] = embeddings[start:start + len(intent_phrases)]
+        start += len(intent_phrases)
+    return ThemeEmbeddingIndex(by_intent, dtype=dtype)
+
+
+class IntentClassifier:
+    """
+    Intent from the regexes where they are reliable, from exemplar embeddings elsewhere.
+
+    A regex match of crisis or of a specific concern (priority DEFAULT_PRIORITY
+    and up; those patterns are multi-word phrases) is taken as is, without any
+    arithmetic. When only the catch-all or the short small-talk patterns
+    matched ('hi' also matches 'this'), the message embedding the analysis
+    stage already computed is compared with every exemplar in one
+    matrix-vector product. The top_k nearest exemplars vote, weighted by
+    similarity, and the winning intent is taken if its nearest exemplar is at
+    least threshold similar; otherwise the regex result stands.
+
+    With index=None (INTENT_ENGINE=regex) this is the regex matcher alone.
+    """
+
+    def __init__(self, matcher: IntentMatcher, index: Optional[ThemeEmbeddingIndex] = None,
+                 threshold: float = 0.5, top_k: int = 5):
+        self.matcher = matcher
+        self.index = index
+        self.threshold = threshold
+        self.top_k = max(1, top_k)
+        self._intents = [MessageIntent(value) for value in index.themes] if index is not None else []
+
+    def classify(self, message: str, embedding: Optional[Sequence[float]] = None) -> IntentPrediction:
+        matches = self.matcher.match(message)
+        if matches and matches[0].priority >= DEFAULT_PRIORITY:
+            return IntentPrediction(matches[0].intent, 1.0, 'regex')
+        if self.index is not None and embedding is not None:
+            predicted = self.nearest(embedding)
+            if predicted is not None:
+                return predicted
+        return IntentPrediction(matches[0].intent if matches else MessageIntent.GENERAL, 0.0, 'regex')
+
+    def nearest(self, embedding: Sequence[float]) -> Optional[IntentPrediction]:
+        """Similarity-weighted vote of the top_k nearest exemplars, or None if the winner is not close enough."""
+        similarities = self.index.similarities(embedding)
+        # The winner's nearest exemplar is at most the nearest overall: most turns stop here
+        if not len(similarities) or similarities.max() < self.threshold:
+            return None
+        k = min(self.top_k, len(similarities))
+        top = np.argpartition(similarities, -k)[-k:]
+        votes: Dict[int, float] = {}
+        nearest: Dict[int, float] = {}
+        for intent_id, similarity in zip(self.index.theme_ids[top].tolist(), similarities[top].tolist()):
+            votes[intent_id] = votes.get(intent_id, 0.0) + max(similarity, 0.0)
+            nearest[intent_id] = max(nearest.get(intent_id, similarity), similarity)
+        best = max(votes, key=lambda intent_id: (votes[intent_id], -intent_id))
+        if votes[best] <= 0 or nearest[best] < self.threshold:
+            return None
+        return IntentPrediction(self._intents[best], nearest[best], 'embedding')
@@ -0,0 +1,115 @@
+# services/intent_exemplars.py
+from typing import Dict, List
+from .intents import MessageIntent
+
+# Typical phrasings of each intent, embedded once into the exemplar matrix of
+# IntentClassifier. They are meant to cover what the regexes in
+# message_patterns.py miss: paraphrases without the trigger words, indirect
+# descriptions and longer sentences. Only intents with responses are listed,
+# and not CRISIS: crisis detection belongs to CrisisHandler and its patterns,
+# never to a similarity threshold.
+INTENT_EXEMPLARS: Dict[MessageIntent, List[str]] = {
+    MessageIntent.GREETING: [
+        "hello",
+        "hi there",
+        "hey, good to meet you",
+        "good evening",
+        "hiya, anyone here?",
+        "hello, I just wanted to say hi",
+    ],
+    MessageIntent.FAREWELL: [
+        "goodbye",
+        "I have to go now",
+        "talk to you later",
+        "I'm logging off for tonight",
+        "that's all for today, see you",
+        "I'll come back another time",
+    ],
+    MessageIntent.GRATITUDE: [
+        "thank you so much",
+        "that really helped, thanks",
+        "I appreciate you listening to me",
+        "I'm grateful for your support",
+        "you've been really kind",
+    ],
+    MessageIntent.GENERAL: [
+        "what can you help me with?",
+        "who are you?",
+        "tell me something interesting",
+        "how does this chat work?",
+        "can I ask you a question?",
+    ],
+    MessageIntent.ANXIETY: [
+        "I feel anxious all the time",
+        "my heart races and I can't breathe properly",
+        "I keep worrying that something terrible will happen",
+        "I get panic attacks in crowded places",
+        "my mind won't stop racing with what-ifs",
+        "I'm on edge and can't relax",
+        "my chest tightens whenever I think about tomorrow",
+    ],
+    MessageIntent.DEPRESSION: [
+        "I feel empty inside",
+        "nothing makes me happy anymore",
+        "I've lost interest in everything I used to enjoy",
+        "I've been crying every day for weeks",
+        "everything feels grey and pointless",
+        "I feel so low I can barely function",
+        "I stay in bed all day because I see no point getting up",
+    ],
+    MessageIntent.STRESS: [
+        "I have way too much to do",
+        "the pressure at work is crushing me",
+        "deadlines are piling up and I can't keep up",
+        "I'm stretched thin between work and family",
+        "I'm burnt out and running on empty",
+        "everything is happening at once and I can't cope",
+    ],
+    MessageIntent.LONELINESS: [
+        "I have nobody to talk to",
+        "I feel invisible to everyone around me",
+        "I spend every weekend by myself",
+        "my friends stopped inviting me anywhere",
+        "I moved to a new city and don't know anyone",
+        "I feel disconnected from the people around me",
+    ],
+    MessageIntent.ANGER: [
+        "I'm so angry I could scream",
+        "I keep snapping at everyone",
+        "my temper is out of control",
+        "I'm fuming about what they did",
+        "little things make me explode with rage",
+        "I'm so irritated with everyone lately",
+    ],
+    MessageIntent.SELF_CARE: [
+        "how can I look after myself better?",
+        "what are some ways to unwind after a long day?",
+        "I want to build healthier habits",
+        "give me tips to relax before bed",
+        "how do I make time for myself?",
+    ],
+    MessageIntent.RELATIONSHIP: [
+        "my partner and I keep arguing",
+        "my girlfriend broke up with me",
+        "my husband doesn't listen to me",
+        "I think my best friend betrayed me",
+        "my parents and I fight all the time",
+        "we're getting divorced",
+    ],
+    MessageIntent.GRIEF: [
+        "my mother passed away last month",
+        "I lost my dog and I miss him so much",
+        "I can't accept that my friend is gone",
+        "it's the anniversary of my father's death",
+        "I keep thinking about the people I've lost",
+        "since the funeral I don't know how to go on with life",
+    ],
+    MessageIntent.SLEEP: [
+        "I can't fall asleep at night",
+        "I wake up at 3am and can't get back to sleep",
+        "I'm exhausted but my brain won't switch off in bed",
+        "I haven't had a proper night's rest in weeks",
+        "I lie awake for hours every night",
+        "my sleep schedule is a mess",
+    ],
+}
@@ -0,0 +1,224 @@
+# services/intent_matcher.py
+import re
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+from app.utils.helpers import build_trie_pattern
+from .intents import MessageIntent
+from .message_patterns import MessagePattern
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+logger = logging.getLogger(__name__)
+
+# Higher wins. Crisis always outranks everything, specific concerns outrank
+# small talk, and the catch-all UNKNOWN pattern only wins when nothing else matched.
+# Ties are broken by declaration order in message_patterns.patterns_data.
+INTENT_PRIORITY: Dict[MessageIntent, int] = {
+    MessageIntent.CRISIS: 100,
+    MessageIntent.GRATITUDE: 30,
+    MessageIntent.FAREWELL: 20,
+    MessageIntent.GREETING: 10,
+    MessageIntent.GENERAL: 5,
+    MessageIntent.UNKNOWN: 0,
+}
+DEFAULT_PRIORITY = 50
+
+# Characters that IGNORECASE matches against ASCII letters but that str.lower()
+# leaves alone (or lengthens), mapped so the lowered text lines up with the
+# original string position by position.
+_CASE_FOLD = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's'})
+
+_MAX_PREFIXES = 32
+_TRANSPARENT = [('', True)]
+_WORDS = re.compile(r'\S+')
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: MessageIntent
+    priority: int
+    span: Tuple[int, int]
+
+
+def _literal_prefixes(parsed) -> List[Tuple[str, bool]]:
+    """
+    Expand a parsed regex into the literal strings every match must start with.
+    Returns (prefix, complete) pairs; complete means the whole sequence was literal
+    so a following item may extend the prefix.
+    """
+    results = [('', True)]
+    for op, av in parsed:
+        if not any(complete for _, complete in results):
+            break
+        options = _item_prefixes(op, av)
+        extended = []
+        for prefix, complete in results:
+            if not complete or (options is _TRANSPARENT and not prefix):
+                # A match may begin with whitespace the scanner never sees
+                extended.append((prefix, False))
+                continue
+            for option, option_complete in options:
+                extended.append((prefix + option, option_complete))
+        if len(extended) > _MAX_PREFIXES:
+            return [(prefix, False) for prefix, _ in results]
+        results = extended
+    return results
+
+
+def _is_whitespace(op, av) -> bool:
+    if op is sre_constants.LITERAL:
+        return chr(av).isspace()
+    return op is sre_constants.IN and av == [(sre_constants.CATEGORY, sre_constants.CATEGORY_SPACE)]
+
+
+def _item_prefixes(op, av) -> List[Tuple[str, bool]]:
+    # Whitespace is removed from the scanned text, so it is transparent here
+    if _is_whitespace(op, av):
+        return _TRANSPARENT
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and len(av[2]) == 1 and _is_whitespace(*av[2][0]):
+        return _TRANSPARENT
+    if op is sre_constants.LITERAL:
+        char = chr(av)
+        return [(char.lower(), True)] if char.isascii() else [('', False)]
+    if op is sre_constants.SUBPATTERN:
+        return _literal_prefixes(av[-1])
+    if op is sre_constants.BRANCH:
+        options = []
+        for branch in av[1]:
+            options.extend(_literal_prefixes(branch))
+        return options
+    if op is sre_constants.IN and all(item_op is sre_constants.LITERAL for item_op, _ in av):
+        return [(prefix, True) for item_op, value in av for prefix, _ in _item_prefixes(item_op, value)]
+    if op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+        return [(prefix, False) for prefix, _ in _literal_prefixes(av[2])]
+    return [('', False)]
+
+
+class IntentMatcher:
+    """
+    Match a message against every intent pattern in a single pass.
+
+    Each regex is reduced at build time to the literal prefixes its matches must
+    start with, reading through whitespace (so 'feel\\s*like\\s*I' gives 'feellikei'),
+    and all prefixes are compiled into one alternation. At request time the
+    lowered, whitespace-free message is scanned once; only patterns whose prefix
+    occurred are verified, anchored at the position where the prefix was found.
+    Patterns without a usable prefix (such as the '.*' catch-all) are always verified.
+    """
+
+    def __init__(self, entries: List[MessagePattern]):
+        self._patterns: List[Tuple[int, Pattern]] = []  # (intent slot, compiled regex)
+        self._intents: List[MessageIntent] = []
+        self._priorities: List[Tuple[int, int]] = []
+        self._always: List[int] = []
+        prefixes: Dict[str, Set[int]] = {}
+
+        for entry in entries:
+            if entry.intent not in self._intents:
+                self._intents.append(entry.intent)
+                slot = len(self._intents) - 1
+                self._priorities.append((INTENT_PRIORITY.get(entry.intent, DEFAULT_PRIORITY), -slot))
+            slot = self._intents.index(entry.intent)
+            for pattern in entry.patterns:
+                if not isinstance(pattern, Pattern):
+                    continue
+                pattern_id = len(self._patterns)
+                self._patterns.append((slot, pattern))
+                options = {prefix for prefix, _ in _literal_prefixes(sre_parse.parse(pattern.pattern, pattern.flags))}
+                if '' in options:
+                    self._always.append(pattern_id)
+                    continue
+                for prefix in options:
+                    prefixes.setdefault(prefix, set()).add(pattern_id)
+
+        self._build_scanner(prefixes)
+        logger.debug(f"Compiled {len(self._patterns)} intent patterns into {len(prefixes)} literal prefixes")
+
+    def _build_scanner(self, prefixes: Dict[str, Set[int]]) -> None:
+        # The alternation is laid out as a trie, so the regex engine branches on
+        # one character at a time instead of trying every prefix at every position.
+        # Longer continuations come before the end of a prefix, so each position
+        # reports the longest prefix starting there; every shorter prefix of it
+        # starts there as well.
+        self._scanner = re.compile('(?=(' + build_trie_pattern(prefixes) + '))')
+        self._expansions: Dict[str, List[int]] = {
+            longest: sorted({
+                pattern_id
+                for prefix, pattern_ids in prefixes.items() if longest.startswith(prefix)
+                for pattern_id in pattern_ids
+            })
+            for longest in prefixes
+        }
+
+    def _candidates(self, lowered: str) -> Dict[int, List[int]]:
+        """Scan once; map pattern id -> start positions of its prefixes in the message."""
+        candidates: Dict[int, List[int]] = {}
+        expansions = self._expansions
+        # Start of each word in the whitespace-free text and in the message, for mapping hits back
+        compact_starts, message_starts, pieces, position = [], [], [], 0
+        for word in _WORDS.finditer(lowered):
+            compact_starts.append(position)
+            message_starts.append(word.start())
+            piece = word.group()
+            pieces.append(piece)
+            position += len(piece)
+        compact = ''.join(pieces)
+        for hit in self._scanner.finditer(compact):
+            start = hit.start()
+            word = bisect_right(compact_starts, start) - 1
+            start = message_starts[word] + start - compact_starts[word]
+            for pattern_id in expansions[hit.group(1)]:
+                candidates.setdefault(pattern_id, []).append(start)
+        return candidates
+
+    def match(self, message: str) -> List[IntentMatch]:
+        """Return every matching intent, highest priority first."""
+        lowered = message.translate(_CASE_FOLD).lower()
+        if len(lowered) != len(message):
+            return self._match_linear(message)
+
+        candidates = self._candidates(lowered)
+        for pattern_id in self._always:
+            candidates[pattern_id] = []
+
+        found: Dict[int, Tuple[int, int]] = {}
+        for pattern_id in sorted(candidates):
+            slot, pattern = self._patterns[pattern_id]
+            if slot in found:
+                continue
+            positions = candidates[pattern_id]
+            if positions:
+                for position in positions:
+                    hit = pattern.match(message, position)
+                    if hit:
+                        found[slot] = hit.span()
+                        break
+            else:
+                hit = pattern.search(message)
+                if hit:
+                    found[slot] = hit.span()
+        return self._rank(found)
+
+    def _match_linear(self, message: str) -> List[IntentMatch]:
+        found: Dict[int, Tuple[int, int]] = {}
+        for slot, pattern in self._patterns:
+            if slot not in found:
+                hit = pattern.search(message)
+                if hit:
+                    found[slot] = hit.span()
+        return self._rank(found)
+
+    def _rank(self, found: Dict[int, Tuple[int, int]]) -> List[IntentMatch]:
+        slots = sorted(found, key=lambda slot: self._priorities[slot], reverse=True)
+        return [IntentMatch(self._intents[slot], self._priorities[slot][0], found[slot]) for slot in slots]
+
+    def best(self, message: str) -> Optional[MessageIntent]:
+        """Highest-priority matching intent, or None."""
+        matches = self.match(message)
+        return matches[0].intent if matches else None
@@ -0,0 +1,175 @@
+# services/lite_analysis.py
+import re
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from .intensity_scorer import INTENSITY_MARKERS
+from .theme_matcher import ThemeMatcher
+
+# Word -> valence, roughly -3 (very negative) to +3 (very positive)
+SENTIMENT_LEXICON: Dict[str, float] = {
+    # Negative
+    'sad': -2.0, 'unhappy': -2.0, 'depressed': -2.5, 'depression': -2.0, 'miserable': -2.5, 'hopeless': -2.5,
+    'despair': -2.5, 'empty': -1.5, 'numb': -1.5, 'gloomy': -1.5, 'down': -1.0, 'low': -1.0, 'blue': -0.5,
+    'anxious': -2.0, 'anxiety': -2.0, 'worried': -1.5, 'worry': -1.5, 'nervous': -1.5, 'panic': -2.0,
+    'scared': -2.0, 'afraid': -2.0, 'terrified': -2.5, 'fear': -2.0, 'dread': -2.0, 'tense': -1.0,
+    'stressed': -2.0, 'stress': -1.5, 'overwhelmed': -2.0, 'pressure': -1.0, 'exhausted': -2.0, 'tired': -1.5,
+    'drained': -1.5, 'burnout': -2.0, 'lonely': -2.0, 'alone': -1.5, 'isolated': -2.0, 'abandoned': -2.5,
+    'angry': -2.0, 'furious': -2.5, 'mad': -1.5, 'annoyed': -1.5, 'frustrated': -1.5, 'irritated': -1.5,
+    'hate': -2.5, 'worthless': -3.0, 'useless': -2.5, 'failure': -2.5, 'failed': -2.0, 'inadequate': -2.0,
+    'guilty': -2.0, 'ashamed': -2.0, 'shame': -2.0, 'embarrassed': -1.5, 'humiliated': -2.5, 'regret': -1.5,
+    'hurt': -2.0, 'pain': -2.0, 'painful': -2.0, 'cry': -2.0, 'crying': -2.0, 'cried': -2.0, 'tears': -1.5,
+    'grief': -2.0, 'loss': -1.5, 'lost': -1.5, 'died': -2.0, 'death': -2.0, 'die': -3.0, 'dead': -2.0,
+    'suicidal': -3.0, 'kill': -3.0, 'harm': -2.5, 'trauma': -2.0, 'abuse': -2.5, 'broken': -2.0,
+    'heartbroken': -2.5, 'devastated': -3.0, 'terrible': -2.5, 'awful': -2.5, 'horrible': -2.5,
+    'bad': -1.5, 'worse': -2.0, 'worst': -2.5, 'sick': -1.5, 'ill': -1.5, 'struggling': -2.0, 'struggle': -1.5,
+    'pointless': -2.5, 'meaningless': -2.5, 'stuck': -1.5, 'confused': -1.0, 'insomnia': -1.5,
+    'problem': -1.0, 'difficult': -1.0, 'hard': -1.0, 'wrong': -1.5, 'sorry': -1.0, 'upset': -2.0,
+    'disappointed': -2.0, 'betrayed': -2.5, 'rejected': -2.0, 'ignored': -1.5, 'fired': -2.0, 'breakup': -2.0,
+    'disappear': -2.0, 'gone': -1.0, 'trapped': -2.0, 'scary': -2.0, 'nightmare': -2.0, 'ruined': -2.5,
+    # Positive
+    'happy': 2.5, 'glad': 2.0, 'joy': 2.5, 'joyful': 2.5, 'excited': 2.0, 'cheerful': 2.0, 'delighted': 2.5,
+    'good': 1.5, 'great': 2.5, 'better': 1.5, 'best': 2.0, 'fine': 1.0, 'okay': 0.5, 'ok': 0.5, 'well': 1.0,
+    'calm': 1.5, 'relaxed': 1.5, 'peaceful': 2.0, 'rested': 1.5, 'hopeful': 2.0, 'hope': 1.5,
+    'grateful': 2.5, 'thankful': 2.5, 'thank': 2.0, 'thanks': 2.0, 'appreciate': 2.0, 'helpful': 2.0,
+    'helps': 1.5, 'helped': 1.5, 'love': 2.5, 'loved': 2.5, 'lovely': 2.5, 'wonderful': 3.0, 'amazing': 3.0,
+    'proud': 2.0, 'confident': 2.0, 'strong': 1.5, 'safe': 1.5, 'supported': 2.0, 'support': 1.0,
+    'enjoy': 2.0, 'enjoyed': 2.0, 'fun': 2.0, 'smile': 2.0, 'laugh': 2.0, 'nice': 1.5, 'kind': 1.5,
+    'improving': 1.5, 'improved': 1.5, 'progress': 1.5, 'motivated': 2.0, 'energized': 2.0, 'finally': 1.0,
+    'success': 2.5, 'won': 2.0, 'achieved': 2.0, 'managed': 1.0, 'recovered': 2.0, 'healing': 1.5,
+}
+
+# Words that flip the valence of the next few words
+NEGATIONS = {
+    'not', 'no', 'never', 'nothing', 'nobody', 'none', 'neither', 'nor', 'without', 'hardly',
+    "can't", "cannot", "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "won't", "wouldn't",
+    "couldn't", "shouldn't", "haven't", "hasn't", "ain't",
+}
+NEGATION_SCOPE = 3
+
+# Words that are not theme keywords but point at a theme, standing in for the
+# neighbours a sentence embedding would place near that theme's keywords
+RELATED_WORDS: Dict[str, str] = {
+    'anxiety': 'anxiety', 'worry': 'anxiety', 'panic': 'anxiety', 'racing': 'anxiety', 'shaking': 'anxiety',
+    'overthinking': 'anxiety', 'sadness': 'depression', 'crying': 'depression', 'cry': 'depression',
+    'numb': 'depression', 'unhappy': 'depression', 'depression': 'depression', 'deadline': 'stress',
+    'deadlines': 'stress', 'busy': 'stress', 'burnt': 'stress', 'nobody': 'loneliness', 'ignored': 'loneliness',
+    'left': 'loneliness', 'rage': 'anger', 'hate': 'anger', 'angry': 'anger', 'yelled': 'anger',
+    'ugly': 'self_esteem', 'stupid': 'self_esteem', 'loser': 'self_esteem', 'abused': 'trauma',
+    'assault': 'trauma', 'nightmares': 'trauma', 'boyfriend': 'relationships', 'girlfriend': 'relationships',
+    'husband': 'relationships', 'wife': 'relationships', 'parents': 'relationships', 'mother': 'relationships',
+    'father': 'relationships', 'divorce': 'relationships', 'died': 'grief', 'passed': 'grief',
+    'funeral': 'grief', 'death': 'grief', 'miss': 'grief', 'fear': 'fear', 'scary': 'fear', 'panicking': 'fear',
+    'fault': 'guilt', 'apologize': 'guilt', 'embarrassing': 'shame', 'pointless': 'hopelessness',
+    'quit': 'hopelessness', 'sleepy': 'fatigue', 'sleep': 'fatigue', 'insomnia': 'fatigue', 'energy': 'fatigue',
+    'idk': 'confusion', 'unsure': 'confusion', 'suicide': 'crisis', 'die': 'crisis', 'kill': 'crisis',
+    'glad': 'joy', 'great': 'joy', 'wonderful': 'joy', 'office': 'work', 'fired': 'work', 'colleague': 'work',
+    'colleagues': 'work', 'manager': 'work', 'doctor': 'health', 'hospital': 'health', 'diagnosis': 'health',
+    'procrastinating': 'motivation', 'bored': 'motivation', 'pointlessness': 'motivation',
+}
+
+_WORD = re.compile(r"[a-z]+(?:'[a-z]+)?")
+_SUFFIXES = ('ing', 'ed', 'es', 's', 'ly')
+
+
+def _words(text: str) -> List[str]:
+    return _WORD.findall(text.lower().replace('’', "'"))
+
+
+def _lookup(table: Dict, word: str):
+    """The table entry for a word or, failing that, for its stem without a common suffix."""
+    if word in table:
+        return table[word]
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            stem = word[:-len(suffix)]
+            if stem in table:
+                return table[stem]
+    return None
+
+
+class LexiconSentiment:
+    """
+    Stand-in for the DistilBERT sentiment pipeline without a model.
+
+    Sums lexicon valences over the words of a message. A negation flips (and
+    halves) the next NEGATION_SCOPE words, intensity modifiers scale the next
+    word up or down. The sum goes through a logistic, so, like the pipeline, it returns
+    a POSITIVE/NEGATIVE label with a confidence of 0.5 to 1 (0.5 when no
+    lexicon word occurs).
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None):
+        self.lexicon = SENTIMENT_LEXICON if lexicon is None else lexicon
+
+    def score(self, text: str) -> float:
+        """Signed valence of the message."""
+        total, negated, boost = 0.0, 0, 1.0
+        for word in _words(text):
+            if word in NEGATIONS:
+                negated = NEGATION_SCOPE
+                continue
+            if word in INTENSITY_MARKERS:
+                boost = 1.5 if INTENSITY_MARKERS[word] >= 1.5 else 0.5
+                continue
+            valence = _lookup(self.lexicon, word)
+            if valence is not None:
+                total += valence * boost * (-0.5 if negated else 1.0)
+            boost = 1.0
+            negated = max(0, negated - 1)
+        return total
+
+    def __call__(self, inputs: Union[str, List[str]], **kwargs) -> List[Dict[str, float]]:
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        results = []
+        for text in texts:
+            total = self.score(text)
+            positive = 1.0 / (1.0 + np.exp(-total))
+            label = 'POSITIVE' if total >= 0 else 'NEGATIVE'
+            results.append({'label': label, 'score': float(max(positive, 1.0 - positive))})
+        return results
+
+
+class StaticKeywordEmbedder:
+    """
+    Stand-in for the MiniLM encoder: messages embedded in a theme space.
+
+    Each dimension is one theme. A message's vector counts the theme keywords
+    it contains (via ThemeMatcher, so phrases like 'burnt out' work) plus the
+    precomputed vectors of RELATED_WORDS, and is L2-normalized. Encoding the
+    theme-space unit vectors take the place of the keyword embeddings in
+    ThemeEmbeddingIndex, so theme similarity keeps working without a model.
+    """
+
+    def __init__(self, theme_keywords: Dict[str, List[str]], related_words: Optional[Dict[str, str]] = None):
+        self.themes = list(theme_keywords)
+        self.matcher = ThemeMatcher(theme_keywords)
+        position = {theme: i for i, theme in enumerate(self.themes)}
+        related = RELATED_WORDS if related_words is None else related_words
+        self.word_vectors: Dict[str, np.ndarray] = {}
+        for word, theme in related.items():
+            if theme in position:
+                vector = np.zeros(len(self.themes), dtype=np.float32)
+                vector[position[theme]] = 1.0
+                self.word_vectors[word] = vector
+        self._position = position
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(len(self.themes), dtype=np.float32)
+        for theme in self.matcher.match(text.lower()):
+            vector[self._position[theme]] += 1.0
+        for word in _words(text):
+            word_vector = _lookup(self.word_vectors, word)
+            if word_vector is not None:
+                vector += word_vector
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return len(self.themes)
+
+    def encode(self, sentences: Union[str, List[str]], **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self._embed(sentences)
+        return np.stack([self._embed(text) for text in sentences]) if sentences else np.zeros((0, len(self.themes)), dtype=np.float32)
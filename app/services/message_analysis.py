@@ -0,0 +1,103 @@
+import re
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from .model_registry import ModelRegistry, get_registry
+from .inference_scheduler import InferenceScheduler
+from .analysis_cache import AnalysisCache
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+@dataclass
+class MessageAnalysis:
+    """
+    Everything derived from a single user message.
+
+    Built once per turn by AnalysisPipeline and read by the theme detection,
+    crisis check, intent detection and response generation stages, so the
+    transformer models never run twice on the same text.
+    """
+    text: str
+    lowered: str
+    words: List[str]
+    sentiment: Dict[str, Any]
+    embedding: Any
+    themes: List[str] = field(default_factory=list)
+    emotion_intensity: float = 0.0
+
+    @property
+    def sentiment_score(self) -> float:
+        """Signed sentiment score: positive for POSITIVE, negative for NEGATIVE."""
+        score = self.sentiment['score']
+        return score if self.sentiment['label'] == 'POSITIVE' else -score
+
+
+class AnalysisPipeline:
+    """Stateless analysis stage: one DistilBERT pass and one MiniLM pass per message."""
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, scheduler: Optional[InferenceScheduler] = None,
+                 cache: Optional[AnalysisCache] = None):
+        registry = registry or get_registry()
+        self.sentiment_model = registry.sentiment_pipeline()
+        self.embedding_model = registry.embedding_model()
+        # When set, model calls are micro-batched with other concurrent requests
+        self.scheduler = scheduler
+        # When set, repeated messages reuse the model outputs of an earlier one
+        self.cache = cache
+        self.metrics = get_metrics()
+
+    def analyze(self, message: str) -> MessageAnalysis:
+        cached = self.cache.get(message) if self.cache is not None else None
+        if cached:
+            return self._build(message, *cached)
+        if self.scheduler:
+            # Queueing plus the shared batch; batch sizes are recorded by the scheduler
+            with self.metrics.time('batched_inference'):
+                sentiment, embedding = self.scheduler.infer(message)
+        else:
+            with self.metrics.time('sentiment_model'):
+                sentiment = self.sentiment_model(message)[0]
+            with self.metrics.time('embedding_model'):
+                embedding = self.embedding_model.encode(message)
+            self.metrics.observe_batch('sentiment', 1)
+            self.metrics.observe_batch('embedding', 1)
+        if self.cache is not None:
+            sentiment, embedding = self.cache.put(message, sentiment, embedding)
+        return self._build(message, sentiment, embedding)
+
+    def analyze_batch(self, messages: List[str]) -> List[MessageAnalysis]:
+        """Analyze several messages with one padded batch per model (cached messages are skipped)."""
+        if not messages:
+            return []
+        results = [self.cache.get(message) if self.cache is not None else None for message in messages]
+        misses = [message for message, cached in zip(messages, results) if cached is None]
+        if misses:
+            with self.metrics.time('sentiment_model'):
+                sentiments = self.sentiment_model(misses, batch_size=len(misses))
+            with self.metrics.time('embedding_model'):
+                embeddings = self.embedding_model.encode(misses, batch_size=len(misses))
+            self.metrics.observe_batch('sentiment', len(misses))
+            self.metrics.observe_batch('embedding', len(misses))
+            computed = iter(zip(misses, sentiments, embeddings))
+            for i, cached in enumerate(results):
+                if cached is None:
+                    message, sentiment, embedding = next(computed)
+                    results[i] = self.cache.put(message, sentiment, embedding) if self.cache is not None else (sentiment, embedding)
+        return [
+            self._build(message, sentiment, embedding)
+            for message, (sentiment, embedding) in zip(messages, results)
+        ]
+
+    def _build(self, message: str, sentiment: Dict[str, Any], embedding: Any) -> MessageAnalysis:
+        lowered = message.lower()
+        return MessageAnalysis(
+            text=message,
+            lowered=lowered,
+            words=WORD_PATTERN.findall(lowered),
+            sentiment=sentiment,
+            embedding=embedding
+        )
@@ -1,24 +1,17 @@
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer
-import re
 import logging
-from typing import Tuple, Dict, Set
+from typing import Tuple, Dict, Optional, Set
 from .intents import MessageIntent
-from .patterns import get_patterns
+from .model_registry import ModelRegistry, get_registry
+from .message_analysis import MessageAnalysis
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MessageAnalyzer:
-    def __init__(self):
-        self.nlp = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            tokenizer="distilbert-base-uncased-finetuned-sst-2-english",
-            clean_up_tokenization_spaces=False
-        )
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
-        self.patterns = get_patterns()
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        registry = registry or get_registry()
+        # Shared analysis stage; sentiment is read from its result, never recomputed
+        self.pipeline = registry.analysis_pipeline()
+        self.intent_classifier = registry.intent_classifier()
         self.intent_theme_map = {
             MessageIntent.ANXIETY: ["anxiety", "panic", "worry"],
             MessageIntent.DEPRESSION: ["sadness", "hopelessness", "fatigue"],
@@ -31,25 +24,17 @@ class MessageAnalyzer:
             MessageIntent.GENERAL: []
         }
 
-    def analyze_message(self, message: str, context: Dict) -> Tuple[MessageIntent, Dict]:
+    def analyze_message(self, message: str, context: Dict, analysis: Optional[MessageAnalysis] = None) -> Tuple[MessageIntent, Dict]:
         """Analyze message to determine intent and extract details."""
         try:
-            # Sentiment analysis
-            sentiment = self.nlp(message)[0]
-            sentiment_score = sentiment['score'] if sentiment['label'] == 'POSITIVE' else -sentiment['score']
+            # Sentiment comes from the shared analysis stage
+            analysis = analysis or self.pipeline.analyze(message)
+            sentiment = analysis.sentiment
+            sentiment_score = analysis.sentiment_score
 
-            # Intent detection using regex patterns
-            detected_intent = MessageIntent.GENERAL
+            # Intent detection: specific regex matches first, then the exemplars nearest to the message embedding
             details = {'sentiment': sentiment['label'], 'confidence': abs(sentiment_score)}
-
-            for intent, pattern in self.patterns.items():
-                try:
-                    if pattern.search(message):
-                        detected_intent = intent
-                        break
-                except AttributeError as e:
-                    logger.error(f"Invalid pattern for intent {intent}: {str(e)}")
-                    continue
+            detected_intent = self.intent_classifier.classify(message, analysis.embedding).intent
 
             # Extract themes based on intent
             themes = set(self.intent_theme_map.get(detected_intent, []))
@@ -60,7 +45,7 @@ class MessageAnalyzer:
             details.update({
                 'themes': list(themes),
                 'intensity': 'moderate' if abs(sentiment_score) > 0.5 else 'low',
-                'keywords': re.findall(r'\w+', message.lower())
+                'keywords': list(analysis.words)
             })
 
             return detected_intent, details
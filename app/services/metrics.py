@@ -0,0 +1,226 @@
+# services/metrics.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.utils.config import Config
+
+PREFIX = 'ssuubi'
+# Seconds: from a regex scan (well under a millisecond) to a slow translation call
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+# (name, type, help, labels, value) of a sample gathered at scrape time
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+# Milliseconds per stage of the turn being recorded by Metrics.record_stages(), for its log record
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar('stage_timings', default=None)
+
+
+class Histogram:
+    """Counts of observations per bucket (upper bound inclusive), plus their sum."""
+
+    __slots__ = ('buckets', 'counts', 'sum', '_lock')
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        # One count per bucket and a last one for values above every bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        """Cumulative counts per bucket, the last being the total count, and the sum."""
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        cumulative, running = [], 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total
+
+
+class _Timer:
+    __slots__ = ('histogram', 'stage', 'started')
+
+    def __init__(self, histogram: Histogram, stage: str):
+        self.histogram = histogram
+        self.stage = stage
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.started
+        self.histogram.observe(elapsed)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[self.stage] = round(timings.get(self.stage, 0.0) + elapsed * 1000, 3)
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> '_NoTimer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+class Metrics:
+    """
+    Process-local chat metrics in the Prometheus text format.
+
+    The request path only touches histograms: time(stage) around each stage of
+    a chat turn (two perf_counter calls and one bucket increment) and
+    observe_batch() once per model batch. Everything that is already counted
+    elsewhere (cache hits, live sessions, state keys) is read from its owner's
+    stats() by the collectors when /metrics is scraped, so it costs the request
+    path nothing. With enabled=False time() hands out a shared no-op timer.
+
+    Each gunicorn worker has its own Metrics; Prometheus scrapes them as
+    separate targets or a sidecar sums them.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._stages: Dict[str, Histogram] = {}
+        self._batches: Dict[str, Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def time(self, stage: str):
+        """Context manager recording the duration of a stage of a chat turn."""
+        if not self.enabled:
+            return _NO_TIMER
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            histogram = self._histogram(self._stages, stage, LATENCY_BUCKETS)
+        return _Timer(histogram, stage)
+
+    @contextmanager
+    def record_stages(self) -> Iterator[Dict[str, float]]:
+        """Also collect the milliseconds of each stage timed in the block into the dict yielded."""
+        timings: Dict[str, float] = {}
+        if _stage_timings.get() is not None:
+            # Nested turn: its stages already go to the outer one
+            yield timings
+            return
+        token = _stage_timings.set(timings)
+        try:
+            yield timings
+        finally:
+            _stage_timings.reset(token)
+
+    def observe_batch(self, model: str, size: int) -> None:
+        """Record the size of one batch run through a model."""
+        if not self.enabled:
+            return
+        histogram = self._batches.get(model)
+        if histogram is None:
+            histogram = self._histogram(self._batches, model, BATCH_BUCKETS)
+        histogram.observe(size)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Register a function returning samples to read at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Unregister a collector (e.g. of an app being shut down); unknown ones are ignored."""
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """Count and mean milliseconds per stage."""
+        stats = {}
+        for stage, histogram in sorted(self._stages.items()):
+            counts, total = histogram.snapshot()
+            stats[stage] = {'count': counts[-1], 'avg_ms': total * 1000 / counts[-1] if counts[-1] else 0.0}
+        return stats
+
+    def render(self) -> str:
+        """Every histogram and collected sample in the Prometheus text exposition format."""
+        lines: List[str] = []
+        self._render_histograms(lines, f'{PREFIX}_chat_stage_seconds', 'stage',
+                                'Time spent in each stage of a chat turn.', self._stages)
+        self._render_histograms(lines, f'{PREFIX}_model_batch_size', 'model',
+                                'Messages per batch run through a model.', self._batches)
+        samples: Dict[str, Tuple[str, str, List[Tuple[Dict[str, str], float]]]] = {}
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            for name, kind, help_text, labels, value in collector():
+                samples.setdefault(name, (kind, help_text, []))[2].append((labels, value))
+        for name, (kind, help_text, values) in samples.items():
+            lines.append(f'# HELP {PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PREFIX}_{name} {kind}')
+            for labels, value in values:
+                lines.append(f'{PREFIX}_{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """Drop every histogram (collectors stay registered)."""
+        with self._lock:
+            self._stages.clear()
+            self._batches.clear()
+
+    def _histogram(self, histograms: Dict[str, Histogram], key: str, buckets: Iterable[float]) -> Histogram:
+        with self._lock:
+            return histograms.setdefault(key, Histogram(buckets))
+
+    def _render_histograms(self, lines: List[str], name: str, label: str, help_text: str,
+                           histograms: Dict[str, Histogram]) -> None:
+        if not histograms:
+            return
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(histograms.items()):
+            counts, total = histogram.snapshot()
+            for bound, count in zip(histogram.buckets, counts):
+                lines.append(f'{name}_bucket{_labels({label: key, "le": _number(bound)})} {count}')
+            lines.append(f'{name}_bucket{_labels({label: key, "le": "+Inf"})} {counts[-1]}')
+            lines.append(f'{name}_sum{_labels({label: key})} {_number(total)}')
+            lines.append(f'{name}_count{_labels({label: key})} {counts[-1]}')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (key + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for key, value in labels.items())
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """The process-wide Metrics."""
+    global _metrics
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                _metrics = Metrics(enabled=Config.METRICS_ENABLED)
+    return _metrics
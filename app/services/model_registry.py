@@ -0,0 +1,363 @@
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+INFERENCE_BACKENDS = ('torch', 'onnx')
+ANALYSIS_MODES = ('full', 'lite')
+
+
+def _inference_backend() -> str:
+    from app.utils.config import Config
+    if Config.INFERENCE_BACKEND not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend '{Config.INFERENCE_BACKEND}', expected one of {INFERENCE_BACKENDS}")
+    return Config.INFERENCE_BACKEND
+
+
+def _lite_mode() -> bool:
+    from app.utils.config import Config
+    if Config.ANALYSIS_MODE not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{Config.ANALYSIS_MODE}', expected one of {ANALYSIS_MODES}")
+    return Config.ANALYSIS_MODE == 'lite'
+
+
+def _load_lite_sentiment(registry: 'ModelRegistry'):
+    from .lite_analysis import LexiconSentiment
+    return LexiconSentiment()
+
+
+def _load_lite_embedding(registry: 'ModelRegistry'):
+    from .lite_analysis import StaticKeywordEmbedder
+    from .sentiment_analyzer import THEME_KEYWORDS
+    return StaticKeywordEmbedder(THEME_KEYWORDS)
+
+
+def _load_sentiment_pipeline(registry: 'ModelRegistry'):
+    if _lite_mode():
+        return _load_lite_sentiment(registry)
+    if _inference_backend() == 'onnx':
+        from app.utils.config import Config
+        from .onnx_backend import load_sentiment
+        return load_sentiment(SENTIMENT_MODEL, Config.ONNX_MODEL_DIR, quantized=Config.ONNX_QUANTIZE,
+                              threads=Config.ONNX_THREADS)
+    from transformers import pipeline
+    return pipeline(
+        "sentiment-analysis",
+        model=SENTIMENT_MODEL,
+        tokenizer=SENTIMENT_MODEL,
+        clean_up_tokenization_spaces=False
+    )
+
+
+def _load_embedding_model(registry: 'ModelRegistry'):
+    if _lite_mode():
+        return _load_lite_embedding(registry)
+    if _inference_backend() == 'onnx':
+        from app.utils.config import Config
+        from .onnx_backend import load_embedding
+        return load_embedding(EMBEDDING_MODEL, Config.ONNX_MODEL_DIR, quantized=Config.ONNX_QUANTIZE,
+                              threads=Config.ONNX_THREADS)
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL)
+
+
+def _load_lite_theme_index(registry: 'ModelRegistry'):
+    import numpy as np
+    from .theme_index import ThemeEmbeddingIndex
+    # One unit row per theme: a message's similarity to a theme is that theme's share of its vector
+    themes = registry.embedding_model().themes
+    return ThemeEmbeddingIndex({theme: np.eye(len(themes), dtype=np.float32)[i:i + 1] for i, theme in enumerate(themes)})
+
+
+def _load_theme_index(registry: 'ModelRegistry'):
+    if _lite_mode():
+        return _load_lite_theme_index(registry)
+    from app.utils.config import Config
+    from .sentiment_analyzer import THEME_KEYWORDS
+    from .theme_index import ThemeEmbeddingIndex
+    # One encode call for all keywords, then split back per theme
+    keywords = [keyword for theme_keywords in THEME_KEYWORDS.values() for keyword in theme_keywords]
+    embeddings = registry.embedding_model().encode(keywords)
+    by_theme, start = {}, 0
+    for theme, theme_keywords in THEME_KEYWORDS.items():
+        by_theme[theme] = embeddings[start:start + len(theme_keywords)]
+        start += len(theme_keywords)
+    return ThemeEmbeddingIndex(by_theme, dtype=Config.THEME_INDEX_DTYPE)
+
+
+def _load_theme_matcher(registry: 'ModelRegistry'):
+    from .sentiment_analyzer import THEME_KEYWORDS
+    from .theme_matcher import ThemeMatcher
+    return ThemeMatcher(THEME_KEYWORDS)
+
+
+def _load_response_bank(registry: 'ModelRegistry') -> Dict:
+    import json
+    try:
+        with open('mental_health_responses.json', 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logger.warning("mental_health_responses.json not found, using empty responses")
+        return {}
+
+
+def _load_response_index(registry: 'ModelRegistry'):
+    from .patterns import get_patterns
+    from .response_index import ResponseIndex
+    return ResponseIndex(registry.response_bank(), get_patterns())
+
+
+def _load_intent_matcher(registry: 'ModelRegistry'):
+    from .intent_matcher import IntentMatcher
+    from .patterns import get_patterns
+    return IntentMatcher(get_patterns())
+
+
+def _load_intent_index(registry: 'ModelRegistry'):
+    from .intent_classifier import build_exemplar_index
+    from .intent_exemplars import INTENT_EXEMPLARS
+    return build_exemplar_index(registry.embedding_model(), INTENT_EXEMPLARS)
+
+
+def _load_intent_classifier(registry: 'ModelRegistry'):
+    from app.utils.config import Config
+    from .intent_classifier import INTENT_ENGINES, IntentClassifier
+    if Config.INTENT_ENGINE not in INTENT_ENGINES:
+        raise ValueError(f"Unknown intent engine '{Config.INTENT_ENGINE}', expected one of {INTENT_ENGINES}")
+    index = registry.intent_index() if Config.INTENT_ENGINE == 'hybrid' else None
+    return IntentClassifier(registry.intent_matcher(), index, threshold=Config.INTENT_EMBEDDING_THRESHOLD,
+                            top_k=Config.INTENT_TOP_K)
+
+
+def _load_inference_scheduler(registry: 'ModelRegistry'):
+    from app.utils.config import Config
+    from .inference_scheduler import InferenceScheduler
+    return InferenceScheduler(
+        registry.sentiment_pipeline(),
+        registry.embedding_model(),
+        max_batch_size=Config.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms=Config.INFERENCE_BATCH_WINDOW_MS
+    )
+
+
+def analysis_namespace() -> str:
+    """Which models produce sentiment and embeddings under the current settings, e.g. 'onnx-int8:<models>'."""
+    if _lite_mode():
+        return 'lite'
+    backend = _inference_backend()
+    if backend == 'onnx':
+        from app.utils.config import Config
+        backend = 'onnx-int8' if Config.ONNX_QUANTIZE else 'onnx'
+    return f"{backend}:{SENTIMENT_MODEL}:{EMBEDDING_MODEL}"
+
+
+def _load_analysis_cache(registry: 'ModelRegistry'):
+    from app.utils.config import Config
+    from .analysis_cache import AnalysisCache
+    dimension = getattr(registry.embedding_model(), 'get_sentence_embedding_dimension', None)
+    return AnalysisCache(
+        max_entries=Config.ANALYSIS_CACHE_SIZE,
+        ttl_seconds=Config.ANALYSIS_CACHE_TTL_SECONDS,
+        path=Config.ANALYSIS_CACHE_PATH or None,
+        namespace=analysis_namespace(),
+        dimension=dimension() if callable(dimension) else None
+    )
+
+
+def _load_analysis_pipeline(registry: 'ModelRegistry'):
+    from app.utils.config import Config
+    from .message_analysis import AnalysisPipeline
+    scheduler = registry.inference_scheduler() if Config.INFERENCE_BATCHING else None
+    cache = registry.analysis_cache() if Config.ANALYSIS_CACHE_SIZE > 0 else None
+    return AnalysisPipeline(registry, scheduler=scheduler, cache=cache)
+
+
+def _load_translation_service(registry: 'ModelRegistry'):
+    from app.utils.config import Config
+    from .translation import TranslationService, create_backend
+    service = TranslationService(
+        create_backend(Config.TRANSLATION_BACKEND),
+        max_entries=Config.TRANSLATION_CACHE_SIZE,
+        max_workers=Config.TRANSLATION_WORKERS
+    )
+    languages = [language.strip() for language in Config.PRETRANSLATE_LANGUAGES.split(',') if language.strip()]
+    if languages:
+        from .patterns import get_patterns
+        from .response_generator import canned_paragraphs
+        crisis_handler = registry.crisis_handler()
+        texts = canned_paragraphs(registry.response_bank(), get_patterns())
+        for location in ('US', 'UK'):
+            texts.extend(crisis_handler.generate_crisis_response({'user_location': location}).split('\n\n'))
+        service.pretranslate(texts, languages)
+    return service
+
+
+def _load_message_analyzer(registry: 'ModelRegistry'):
+    from .message_analyzer import MessageAnalyzer
+    return MessageAnalyzer(registry)
+
+
+def _load_crisis_handler(registry: 'ModelRegistry'):
+    from .crisis_handler import CrisisHandler
+    return CrisisHandler()
+
+
+DEFAULT_LOADERS: Dict[str, Callable[['ModelRegistry'], Any]] = {
+    'sentiment': _load_sentiment_pipeline,
+    'embedding': _load_embedding_model,
+    'theme_index': _load_theme_index,
+    'theme_matcher': _load_theme_matcher,
+    'response_bank': _load_response_bank,
+    'response_index': _load_response_index,
+    'intent_matcher': _load_intent_matcher,
+    'intent_index': _load_intent_index,
+    'intent_classifier': _load_intent_classifier,
+    # Stateless services built on top of the shared models
+    'inference_scheduler': _load_inference_scheduler,
+    'analysis_cache': _load_analysis_cache,
+    'analysis_pipeline': _load_analysis_pipeline,
+    'translation_service': _load_translation_service,
+    'message_analyzer': _load_message_analyzer,
+    'crisis_handler': _load_crisis_handler,
+}
+
+
+# Model-free stand-ins for the transformer models (ANALYSIS_MODE=lite)
+LITE_LOADERS: Dict[str, Callable[['ModelRegistry'], Any]] = {
+    'sentiment': _load_lite_sentiment,
+    'embedding': _load_lite_embedding,
+    'theme_index': _load_lite_theme_index,
+}
+
+# Resources that own threads, sockets or open files (or hold one that does). They
+# cannot be shared across a fork, so a forked worker drops and rebuilds them; the
+# models and indexes they are built on stay shared copy-on-write with the parent.
+PROCESS_LOCAL_RESOURCES = ('inference_scheduler', 'analysis_cache', 'analysis_pipeline', 'message_analyzer',
+                           'translation_service')
+# ONNX Runtime sessions create their thread pools when they are constructed, and
+# a forked child inherits the session without the threads: with
+# INFERENCE_BACKEND=onnx the models are rebuilt in every worker as well.
+ONNX_SESSION_RESOURCES = ('sentiment', 'embedding')
+
+
+def process_local_resources() -> Tuple[str, ...]:
+    """The resources a forked worker has to rebuild under the current configuration."""
+    if not _lite_mode() and _inference_backend() == 'onnx':
+        return PROCESS_LOCAL_RESOURCES + ONNX_SESSION_RESOURCES
+    return PROCESS_LOCAL_RESOURCES
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of read-only models and precomputed indexes.
+
+    Every resource is loaded at most once per process, on first use, and the
+    same instance is handed to every ConversationHandler and request thread.
+    Nothing stored here may carry per-user or per-session state.
+    """
+
+    def __init__(self, loaders: Optional[Dict[str, Callable[['ModelRegistry'], Any]]] = None):
+        self._loaders = dict(DEFAULT_LOADERS)
+        self._loaders.update(loaders or {})
+        self._resources: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self._loaders}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[['ModelRegistry'], Any]) -> None:
+        """Register (or replace) the loader for a resource and drop any cached instance."""
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._resources.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Return the shared resource, loading it on first access."""
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        if name not in self._loaders:
+            raise KeyError(f"No loader registered for '{name}'")
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited on the lock
+            resource = self._resources.get(name)
+            if resource is None:
+                logger.info(f"Loading shared resource '{name}'")
+                resource = self._loaders[name](self)
+                self._resources[name] = resource
+        return resource
+
+    def sentiment_pipeline(self):
+        return self.get('sentiment')
+
+    def embedding_model(self):
+        return self.get('embedding')
+
+    def theme_index(self):
+        return self.get('theme_index')
+
+    def theme_matcher(self):
+        return self.get('theme_matcher')
+
+    def response_bank(self) -> Dict:
+        return self.get('response_bank')
+
+    def response_index(self):
+        return self.get('response_index')
+
+    def intent_matcher(self):
+        return self.get('intent_matcher')
+
+    def intent_index(self):
+        return self.get('intent_index')
+
+    def intent_classifier(self):
+        return self.get('intent_classifier')
+
+    def inference_scheduler(self):
+        return self.get('inference_scheduler')
+
+    def analysis_cache(self):
+        return self.get('analysis_cache')
+
+    def analysis_pipeline(self):
+        return self.get('analysis_pipeline')
+
+    def translation_service(self):
+        return self.get('translation_service')
+
+    def message_analyzer(self):
+        return self.get('message_analyzer')
+
+    def crisis_handler(self):
+        return self.get('crisis_handler')
+
+    def loaded(self) -> List[str]:
+        """Names of the resources that are currently loaded."""
+        return sorted(self._resources)
+
+    def clear(self) -> None:
+        """Drop every cached resource; the next access reloads it."""
+        with self._registry_lock:
+            self._resources.clear()
+
+    def after_fork(self) -> None:
+        """
+        Make the registry usable in a forked worker: the locks are recreated (a
+        thread of the parent may have held one at the fork) and the
+        process_local_resources() are dropped, to be rebuilt on first use.
+        """
+        self._registry_lock = threading.Lock()
+        self._locks = {name: threading.Lock() for name in self._loaders}
+        for name in process_local_resources():
+            self._resources.pop(name, None)
+
+
+_registry = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide model registry."""
+    return _registry
@@ -0,0 +1,268 @@
+# services/onnx_backend.py
+import json
+import os
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+# Longest input each model was trained on; longer messages are truncated
+SENTIMENT_MAX_LENGTH = 512
+EMBEDDING_MAX_LENGTH = 256
+
+# Labeled messages the exported models are checked against the PyTorch ones on
+PARITY_SAMPLE: List[Tuple[str, str]] = [
+    ("I feel so much better after talking to my sister", 'POSITIVE'),
+    ("Today was a good day, I finally slept well", 'POSITIVE'),
+    ("Thank you, that actually helps a lot", 'POSITIVE'),
+    ("I'm proud of myself for going to therapy", 'POSITIVE'),
+    ("I got the job and I'm so happy!", 'POSITIVE'),
+    ("Things are looking up, I feel hopeful", 'POSITIVE'),
+    ("My friends threw me a surprise party, I loved it", 'POSITIVE'),
+    ("I managed to finish my assignment on time", 'POSITIVE'),
+    ("The breathing exercise really calmed me down", 'POSITIVE'),
+    ("I'm grateful for my family's support", 'POSITIVE'),
+    ("I went for a walk and the sunshine felt wonderful", 'POSITIVE'),
+    ("I feel confident about tomorrow's exam", 'POSITIVE'),
+    ("We had a great conversation and made up", 'POSITIVE'),
+    ("I'm excited to start my new hobby", 'POSITIVE'),
+    ("I feel calm and rested this morning", 'POSITIVE'),
+    ("I feel so sad and I can't get out of bed", 'NEGATIVE'),
+    ("I'm really anxious about work and can't sleep", 'NEGATIVE'),
+    ("Everything feels pointless and I'm exhausted", 'NEGATIVE'),
+    ("I feel so lonely, no one understands me", 'NEGATIVE'),
+    ("I'm furious, my boss humiliated me in front of everyone", 'NEGATIVE'),
+    ("My partner left me and I feel worthless", 'NEGATIVE'),
+    ("I've been crying all day since my grandmother died", 'NEGATIVE'),
+    ("I'm terrified something bad will happen", 'NEGATIVE'),
+    ("I can't stop thinking about what a failure I am", 'NEGATIVE'),
+    ("I'm so stressed, there is too much on my plate", 'NEGATIVE'),
+    ("I had another panic attack on the bus", 'NEGATIVE'),
+    ("I hate myself for messing everything up", 'NEGATIVE'),
+    ("Nobody would notice if I disappeared", 'NEGATIVE'),
+    ("I feel guilty and ashamed about what I said", 'NEGATIVE'),
+    ("I'm tired of pretending that I'm okay", 'NEGATIVE'),
+]
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def _batches(texts: List[str], batch_size: Optional[int]) -> List[List[str]]:
+    size = max(1, batch_size or len(texts) or 1)
+    return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+
+class OnnxModel:
+    """An onnxruntime CPU session plus the tokenizer it was exported with."""
+
+    def __init__(self, session, tokenizer, max_length: int):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self._input_names = {model_input.name for model_input in session.get_inputs()}
+
+    def run(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """First model output and the attention mask for one padded batch."""
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length, return_tensors='np')
+        feed = {name: np.asarray(value, dtype=np.int64) for name, value in encoded.items() if name in self._input_names}
+        return self.session.run(None, feed)[0], feed['attention_mask']
+
+
+class OnnxSentimentPipeline:
+    """
+    Drop-in for the transformers sentiment-analysis pipeline on onnxruntime.
+
+    Called with a string it returns [{'label', 'score'}]; called with a list
+    it returns one such dict per text, batch_size texts per session run.
+    """
+
+    def __init__(self, model: OnnxModel, labels: Dict[int, str]):
+        self.model = model
+        self.labels = labels
+
+    def __call__(self, inputs: Union[str, List[str]], batch_size: Optional[int] = None, **kwargs) -> List[Dict[str, Any]]:
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        results = []
+        for batch in _batches(texts, batch_size):
+            logits, _ = self.model.run(batch)
+            probabilities = _softmax(logits.astype(np.float32))
+            for row in probabilities:
+                best = int(row.argmax())
+                results.append({'label': self.labels[best], 'score': float(row[best])})
+        return results
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in for SentenceTransformer.encode on onnxruntime: mean pooling over
+    the attention mask, then L2 normalization when the original model had a
+    Normalize module (all-MiniLM-L6-v2 does).
+    """
+
+    def __init__(self, model: OnnxModel, normalize: bool = True):
+        self.model = model
+        self.normalize = normalize
+
+    def get_sentence_embedding_dimension(self) -> Optional[int]:
+        """Hidden size of the exported model, or None if the export left it symbolic."""
+        size = self.model.session.get_outputs()[0].shape[-1]
+        return size if isinstance(size, int) else None
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        chunks = []
+        for batch in _batches(texts, batch_size):
+            hidden, mask = self.model.run(batch)
+            weights = mask[..., None].astype(np.float32)
+            pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            chunks.append(pooled.astype(np.float32))
+        embeddings = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def export_sentiment(model_name: str, directory: str) -> str:
+    """Export the sequence classifier to ONNX with its tokenizer and labels; returns the fp32 path."""
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    os.makedirs(directory, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name).eval()
+    sample = tokenizer(["export sample"], return_tensors='pt')
+    path = os.path.join(directory, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model, (sample['input_ids'], sample['attention_mask']), path,
+            input_names=['input_ids', 'attention_mask'], output_names=['logits'],
+            dynamic_axes={'input_ids': {0: 'batch', 1: 'sequence'},
+                          'attention_mask': {0: 'batch', 1: 'sequence'},
+                          'logits': {0: 'batch'}},
+            opset_version=14
+        )
+    tokenizer.save_pretrained(directory)
+    with open(os.path.join(directory, 'labels.json'), 'w') as f:
+        json.dump({int(i): label for i, label in model.config.id2label.items()}, f)
+    return path
+
+
+def export_embedding(model_name: str, directory: str) -> str:
+    """Export the SentenceTransformer's transformer to ONNX; pooling runs in numpy. Returns the fp32 path."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize
+
+    os.makedirs(directory, exist_ok=True)
+    sentence_model = SentenceTransformer(model_name, device='cpu')
+    transformer, tokenizer = sentence_model[0].auto_model.eval(), sentence_model.tokenizer
+    sample = tokenizer(["export sample"], return_tensors='pt')
+    names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    path = os.path.join(directory, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(sample[name] for name in names), path,
+            input_names=names, output_names=['last_hidden_state'],
+            dynamic_axes={**{name: {0: 'batch', 1: 'sequence'} for name in names},
+                          'last_hidden_state': {0: 'batch', 1: 'sequence'}},
+            opset_version=14
+        )
+    tokenizer.save_pretrained(directory)
+    with open(os.path.join(directory, 'pooling.json'), 'w') as f:
+        json.dump({'normalize': any(isinstance(module, Normalize) for module in sentence_model),
+                   'max_length': sentence_model.max_seq_length}, f)
+    return path
+
+
+def quantize(fp32_path: str) -> str:
+    """int8 dynamic quantization of the weights (activations stay float); returns the int8 path."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    int8_path = os.path.join(os.path.dirname(fp32_path), INT8_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+def _session(path: str, threads: int):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # 0 lets onnxruntime use one thread per physical core
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+
+def _ensure_exported(directory: str, export, quantized: bool) -> str:
+    """Path of the model file to serve, exporting (and quantizing) on first use only."""
+    fp32_path = os.path.join(directory, FP32_FILE)
+    int8_path = os.path.join(directory, INT8_FILE)
+    if not os.path.exists(fp32_path):
+        logger.info(f"Exporting ONNX model to {directory} (one-off)")
+        export()
+    if quantized and not os.path.exists(int8_path):
+        logger.info(f"Quantizing {fp32_path} to int8 (one-off)")
+        quantize(fp32_path)
+    return int8_path if quantized else fp32_path
+
+
+def load_sentiment(model_name: str, directory: str, quantized: bool = True, threads: int = 0) -> OnnxSentimentPipeline:
+    from transformers import AutoTokenizer
+    directory = os.path.join(directory, 'sentiment')
+    path = _ensure_exported(directory, lambda: export_sentiment(model_name, directory), quantized)
+    with open(os.path.join(directory, 'labels.json')) as f:
+        labels = {int(i): label for i, label in json.load(f).items()}
+    model = OnnxModel(_session(path, threads), AutoTokenizer.from_pretrained(directory), SENTIMENT_MAX_LENGTH)
+    return OnnxSentimentPipeline(model, labels)
+
+
+def load_embedding(model_name: str, directory: str, quantized: bool = True, threads: int = 0) -> OnnxSentenceEncoder:
+    from transformers import AutoTokenizer
+    directory = os.path.join(directory, 'embedding')
+    path = _ensure_exported(directory, lambda: export_embedding(model_name, directory), quantized)
+    with open(os.path.join(directory, 'pooling.json')) as f:
+        pooling = json.load(f)
+    max_length = pooling.get('max_length') or EMBEDDING_MAX_LENGTH
+    model = OnnxModel(_session(path, threads), AutoTokenizer.from_pretrained(directory), max_length)
+    return OnnxSentenceEncoder(model, normalize=pooling.get('normalize', True))
+
+
+def check_parity(reference_sentiment, candidate_sentiment, reference_encoder, candidate_encoder,
+                 sample: Sequence[Tuple[str, str]] = PARITY_SAMPLE) -> Dict[str, float]:
+    """
+    Compare a candidate backend with the reference (PyTorch) one on labeled messages.
+
+    Returns:
+        Dict with each backend's accuracy against the labels, how often their
+        labels agree, the largest score difference and the mean/min cosine
+        similarity between their embeddings.
+    """
+    texts = [text for text, _ in sample]
+    labels = [label for _, label in sample]
+    reference = reference_sentiment(texts, batch_size=len(texts))
+    candidate = candidate_sentiment(texts, batch_size=len(texts))
+    reference_embeddings = np.asarray(reference_encoder.encode(texts, batch_size=len(texts)), dtype=np.float32)
+    candidate_embeddings = np.asarray(candidate_encoder.encode(texts, batch_size=len(texts)), dtype=np.float32)
+    reference_embeddings /= np.linalg.norm(reference_embeddings, axis=1, keepdims=True)
+    candidate_embeddings /= np.linalg.norm(candidate_embeddings, axis=1, keepdims=True)
+    cosines = (reference_embeddings * candidate_embeddings).sum(axis=1)
+
+    def signed(result: Dict[str, Any]) -> float:
+        return result['score'] if result['label'] == 'POSITIVE' else -result['score']
+
+    return {
+        'reference_accuracy': float(np.mean([r['label'] == label for r, label in zip(reference, labels)])),
+        'candidate_accuracy': float(np.mean([c['label'] == label for c, label in zip(candidate, labels)])),
+        'label_agreement': float(np.mean([r['label'] == c['label'] for r, c in zip(reference, candidate)])),
+        'max_score_diff': float(max(abs(signed(r) - signed(c)) for r, c in zip(reference, candidate))),
+        'mean_embedding_cosine': float(cosines.mean()),
+        'min_embedding_cosine': float(cosines.min()),
+    }
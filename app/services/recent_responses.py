@@ -0,0 +1,41 @@
+# services/recent_responses.py
+from array import array
+from typing import Any, List
+
+# Response ids as unsigned 32-bit integers
+_ID_TYPE = 'I'
+
+
+class RecentResponses:
+    """
+    The response ids a user got most recently, as a fixed-size ring.
+
+    Holds no per-user data itself: a user's ring is the value stored under
+    their 'responses' key, packed into bytes (4 per id, oldest first), so
+    it costs at most 4 * capacity bytes per user however long they chat,
+    and expires with the rest of their state.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = max(1, capacity)
+
+    def ids(self, value: Any) -> List[int]:
+        """Ids in a stored ring, oldest first; anything else (no or legacy state) is empty."""
+        if not isinstance(value, (bytes, bytearray)):
+            return []
+        ring = array(_ID_TYPE)
+        ring.frombytes(value)
+        return ring.tolist()
+
+    def mask(self, value: Any) -> int:
+        """The ring as a bitmask of response ids, to AND against ResponseIndex candidate sets."""
+        mask = 0
+        for response_id in self.ids(value):
+            mask |= 1 << response_id
+        return mask
+
+    def add(self, value: Any, response_id: int) -> bytes:
+        """The ring with response_id as the newest entry, dropping the oldest beyond capacity."""
+        ids = [i for i in self.ids(value) if i != response_id]
+        ids.append(response_id)
+        return array(_ID_TYPE, ids[-self.capacity:]).tobytes()
@@ -1,27 +1,69 @@
 import random
-import json
 import logging
-from typing import Dict, Union, Set, List
+from typing import Dict, Optional, Union, Set, List
 from datetime import datetime
 from .intents import MessageIntent
 from .patterns import get_patterns
+from .model_registry import ModelRegistry, get_registry
+from .recent_responses import RecentResponses
+from .state_store import StateStore, get_state_store, user_key
+from app.utils.config import Config
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Start of the technique paragraph appended to formatted responses
+TECHNIQUE_PREFIX = "Try this: "
+
+def canned_paragraphs(response_bank: Dict, patterns: List) -> List[str]:
+    """
+    Every paragraph ResponseGenerator can emit verbatim, for pre-translation.
+    Args:
+        response_bank: Parsed mental_health_responses.json.
+        patterns: MessagePattern entries with their responses.
+    Returns:
+        Unique paragraphs; messages with placeholders are skipped since they depend on the user.
+    """
+    paragraphs = []
+
+    def add(text: str) -> None:
+        paragraphs.extend(p for p in text.split('\n\n') if p.strip())
+
+    def add_response(response_data: Union[str, Dict]) -> None:
+        if isinstance(response_data, str):
+            add(response_data)
+        elif isinstance(response_data, dict):
+            message = response_data.get('message')
+            if isinstance(message, str) and '{' not in message:
+                add(message)
+            for technique in response_data.get('techniques') or []:
+                add(f"{TECHNIQUE_PREFIX}{technique}")
+            if response_data.get('followup'):
+                add(response_data['followup'])
+
+    for themes in response_bank.values():
+        if isinstance(themes, dict):
+            for responses in themes.values():
+                for response_data in responses:
+                    add_response(response_data)
+    for pattern in patterns:
+        for response_data in pattern.responses:
+            add_response(response_data)
+    return list(dict.fromkeys(paragraphs))
+
 class ResponseGenerator:
-    def __init__(self):
+    def __init__(self, registry: Optional[ModelRegistry] = None, state: Optional[StateStore] = None):
+        registry = registry or get_registry()
         self.patterns = get_patterns()
-        # Load JSON responses
-        try:
-            with open('mental_health_responses.json', 'r') as f:
-                self.json_responses = json.load(f)
-        except FileNotFoundError:
-            logger.warning("mental_health_responses.json not found, using empty responses")
-            self.json_responses = {}
-        self.user_history = {}  # {user_id: set(used_response_strings)}
-        self.user_state = {}   # {user_id: {'stage': str, 'intent': MessageIntent, 'last_updated': datetime}}
+        # JSON responses are parsed once per process and shared read-only
+        self.json_responses = registry.response_bank()
+        # The same responses (and the pattern ones) compiled into id bitsets
+        self.index = registry.response_index()
+        self.recent = RecentResponses(Config.RECENT_RESPONSES_PER_USER)
+        # Per-user state in the state store:
+        #   'responses': ring of the ids of the user's most recent responses (RecentResponses)
+        #   'stage': {'stage': str, 'intent': MessageIntent, 'last_updated': datetime}
+        self.state = state if state is not None else get_state_store()
 
     def generate_response(self, intent: MessageIntent, context: Dict) -> str:
         """
@@ -36,8 +78,8 @@ class ResponseGenerator:
         sentiment = context.get('sentiment_analysis', {})
         details = context.get('details', {})
         preferences = context.get('preferences', {'preferred_technique': 'breathing'})
-        used_responses = self.user_history.get(user_id, set())
-        state = self.user_state.get(user_id, {
+        used_responses = self._used_responses(user_id)
+        state = self.state.get(user_key('stage', user_id), {
             'stage': 'validation',
             'intent': intent,
             'last_updated': datetime.utcnow()
@@ -50,67 +92,26 @@ class ResponseGenerator:
                 "Call 988 or text HOME to 741741 (US)\nEmergency: 911\n\n"
                 "Would you like me to stay with you and talk?"
             )
-            self.user_history.setdefault(user_id, set()).add(response)
-            logger.info(f"Generated crisis response for user {user_id}")
+            logger.info("Generated crisis response for user %s", user_id)
             return response
 
-        # JSON-based response
-        json_key = intent.value.lower()
-        if json_key in self.json_responses:
-            responses = []
-            for theme in sentiment.get('themes', []):
-                if theme in self.json_responses.get(json_key, {}):
-                    responses.extend(self.json_responses[json_key][theme])
-            if responses:
-                # Filter by emotional stage and preferences
-                stage_responses = self._filter_by_stage(responses, state['stage'], preferences)
-                # Serialize responses for comparison
-                stage_responses = [r for r in stage_responses if json.dumps(r, sort_keys=True) not in used_responses] or stage_responses
-                if stage_responses:
-                    response_data = random.choice(stage_responses)
-                    self.user_history.setdefault(user_id, set()).add(json.dumps(response_data, sort_keys=True))
-                    self._update_state(user_id, intent, state['stage'])
-                    return self._format_response(response_data, details, preferences)
-
-        # Fallback to patterns
-        pattern = next((p for p in self.patterns if p.intent == intent), None)
-        if pattern:
-            stage_responses = self._filter_by_stage(pattern.responses, state['stage'], preferences)
-            # Serialize responses for comparison
-            stage_responses = [r for r in stage_responses if json.dumps(r, sort_keys=True) not in used_responses] or stage_responses
+        # JSON-based response, then the intent's pattern responses
+        preferred = preferences.get('preferred_technique', 'breathing')
+        for candidates in (self.index.bank_candidates(intent.value.lower(), sentiment.get('themes', [])),
+                           self.index.pattern_candidates(intent)):
+            # Filter by emotional stage and preferences, then prefer responses this user has not had lately
+            stage_responses = self.index.filter_by_stage(candidates, state['stage'], preferred)
+            stage_responses = (stage_responses & ~used_responses) or stage_responses
             if stage_responses:
-                response_data = random.choice(stage_responses)
-                self.user_history.setdefault(user_id, set()).add(json.dumps(response_data, sort_keys=True))
+                response_id = random.choice(self.index.ids(stage_responses))
+                self._remember_response(user_id, response_id)
                 self._update_state(user_id, intent, state['stage'])
-                return self._format_response(response_data, details, preferences)
+                return self._format_response(self.index.responses[response_id], details, preferences)
 
         # Fallback response
-        logger.warning(f"No matching response for intent {intent} and themes {sentiment.get('themes', [])}")
+        logger.warning("No matching response for intent %s and themes %s", intent, sentiment.get('themes', []))
         return self._generate_fallback_response(context)
 
-    def _filter_by_stage(self, responses: List[Union[str, Dict]], stage: str, preferences: Dict) -> List[Union[str, Dict]]:
-        """
-        Filter responses by emotional stage and user preferences.
-        Args:
-            responses: List of possible responses.
-            stage: Current emotional stage ('validation', 'exploration', 'coping').
-            preferences: User preferences (e.g., preferred_technique).
-        Returns:
-            Filtered list of responses.
-        """
-        if stage == 'validation':
-            return [r for r in responses if 'validation' in str(r).lower() or 'sorry' in str(r).lower()]
-        elif stage == 'exploration':
-            return [r for r in responses if isinstance(r, dict) and 'followup' in r]
-        elif stage == 'coping':
-            preferred = preferences.get('preferred_technique', 'breathing').lower()
-            return [
-                r for r in responses
-                if isinstance(r, dict) and 'techniques' in r and r['techniques']  # Ensure techniques exist
-                and any(preferred in t.lower() for t in r['techniques'])
-            ] or [r for r in responses if isinstance(r, dict) and 'techniques' in r]
-        return responses
-
     def _update_state(self, user_id: str, intent: MessageIntent, current_stage: str) -> None:
         """
         Update user's emotional state for progression.
@@ -121,12 +122,25 @@ class ResponseGenerator:
         """
         stages = ['validation', 'exploration', 'coping']
         next_stage = stages[min(stages.index(current_stage) + 1, len(stages) - 1)] if current_stage in stages else 'validation'
-        self.user_state[user_id] = {
+        self.state.set(user_key('stage', user_id), {
             'stage': next_stage,
             'intent': intent,
             'last_updated': datetime.utcnow()
-        }
-        logger.debug(f"Updated state for user {user_id}: stage={next_stage}, intent={intent}")
+        })
+        logger.debug("Updated state for user %s: stage=%s, intent=%s", user_id, next_stage, intent)
+
+    def _used_responses(self, user_id: str) -> int:
+        return self.recent.mask(self.state.get(user_key('responses', user_id)))
+
+    def _remember_response(self, user_id: str, response_id: int) -> None:
+        """
+        Record a response as used so it is not repeated to the same user soon.
+        Args:
+            user_id: Unique user identifier.
+            response_id: The response's id in the response index.
+        """
+        key = user_key('responses', user_id)
+        self.state.set(key, self.recent.add(self.state.get(key), response_id))
 
     def _format_response(self, response_data: Union[str, Dict], details: Dict, preferences: Dict) -> str:
         """
@@ -157,7 +171,7 @@ class ResponseGenerator:
             preferred = preferences.get('preferred_technique', 'breathing').lower()
             techniques = [t for t in response_data['techniques'] if preferred in t.lower()] or response_data['techniques']
             if techniques:  # Ensure non-empty
-                response += f"\n\nTry this: {random.choice(techniques)}"
+                response += f"\n\n{TECHNIQUE_PREFIX}{random.choice(techniques)}"
             else:
                 logger.debug("No techniques available for response")
         if response_data.get('followup'):
@@ -0,0 +1,118 @@
+# services/response_index.py
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Union
+
+from .intents import MessageIntent
+
+Response = Union[str, Dict]
+
+STAGES = ('validation', 'exploration', 'coping')
+
+
+def _ids(mask: int) -> List[int]:
+    """Ids of the set bits of mask, lowest first."""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+class ResponseIndex:
+    """
+    The response bank and pattern responses compiled for selection by bitset.
+
+    Every distinct response (by its sorted-key JSON form) gets an integer id,
+    assigned in bank order and then pattern order, so the ids are the same in
+    every worker that loads the same bank. Candidate sets are Python ints used
+    as bitsets: one mask per (intent, theme) in the bank and per pattern
+    intent, and one per stage filter of ResponseGenerator (validation,
+    exploration, coping with and without the preferred technique). Selecting a
+    candidate for a turn is a few ANDs and ORs, with no serialization or
+    lowercasing of responses on the request path.
+    """
+
+    def __init__(self, response_bank: Dict, patterns: Iterable):
+        self.responses: List[Response] = []
+        self._ids: Dict[str, int] = {}
+        self.bank: Dict[tuple, int] = {}
+        self.pattern: Dict[MessageIntent, int] = {}
+        for intent_key, themes in response_bank.items():
+            if isinstance(themes, dict):
+                for theme, responses in themes.items():
+                    self.bank[(intent_key, theme)] = self._add_all(responses)
+        for pattern in patterns:
+            # Like a linear scan for the first pattern of an intent, later duplicates are ignored
+            if pattern.intent not in self.pattern:
+                self.pattern[pattern.intent] = self._add_all(pattern.responses)
+
+        self.validation = self._mask(lambda r: 'validation' in str(r).lower() or 'sorry' in str(r).lower())
+        self.exploration = self._mask(lambda r: isinstance(r, dict) and 'followup' in r)
+        self.techniques = self._mask(lambda r: isinstance(r, dict) and 'techniques' in r)
+        # preferred technique -> responses with a technique containing it, built on first use
+        self._preferred: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def id_of(self, response: Response) -> Optional[int]:
+        return self._ids.get(json.dumps(response, sort_keys=True))
+
+    def bank_candidates(self, intent_key: str, themes: Iterable[str]) -> int:
+        """Responses of the bank for any of the themes under the intent."""
+        mask = 0
+        for theme in themes:
+            mask |= self.bank.get((intent_key, theme), 0)
+        return mask
+
+    def pattern_candidates(self, intent: MessageIntent) -> int:
+        return self.pattern.get(intent, 0)
+
+    def filter_by_stage(self, mask: int, stage: str, preferred: str) -> int:
+        """The candidates in mask that ResponseGenerator._filter_by_stage keeps for the stage."""
+        if stage == 'validation':
+            return mask & self.validation
+        if stage == 'exploration':
+            return mask & self.exploration
+        if stage == 'coping':
+            return (mask & self.preferred(preferred)) or (mask & self.techniques)
+        return mask
+
+    def preferred(self, technique: str) -> int:
+        """Responses with a non-empty technique list where some technique contains the preferred one."""
+        technique = technique.lower()
+        mask = self._preferred.get(technique)
+        if mask is None:
+            mask = self._mask(lambda r: isinstance(r, dict) and 'techniques' in r and r['techniques']
+                              and any(technique in t.lower() for t in r['techniques']))
+            with self._lock:
+                if len(self._preferred) < 256:
+                    self._preferred[technique] = mask
+        return mask
+
+    def ids(self, mask: int) -> List[int]:
+        return _ids(mask)
+
+    def _add_all(self, responses: List[Response]) -> int:
+        mask = 0
+        for response in responses:
+            mask |= 1 << self._add(response)
+        return mask
+
+    def _add(self, response: Response) -> int:
+        key = json.dumps(response, sort_keys=True)
+        response_id = self._ids.get(key)
+        if response_id is None:
+            response_id = self._ids[key] = len(self.responses)
+            self.responses.append(response)
+        return response_id
+
+    def _mask(self, keep) -> int:
+        mask = 0
+        for response_id, response in enumerate(self.responses):
+            if keep(response):
+                mask |= 1 << response_id
+        return mask
@@ -0,0 +1,135 @@
+# services/session_store.py
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Bounded map of session id -> per-session object (a ConversationHandler).
+
+    Entries are kept in an OrderedDict in order of last use, so every operation
+    is O(1): a lookup moves the session to the end, going over max_sessions
+    evicts from the front (least recently used), and because the front is also
+    the longest idle, the reaper only walks the sessions it actually expires.
+    Idle sessions are reaped by a daemon thread every reap_interval seconds
+    instead of on the request path. The thread is started on first use (and
+    again in a forked worker, where threads do not survive the fork).
+    """
+
+    def __init__(self, factory: Callable[[str], Any], max_sessions: int = 1000, idle_ttl_seconds: float = 1800.0,
+                 reap_interval_seconds: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.factory = factory
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl_seconds
+        self.reap_interval = reap_interval_seconds
+        self.clock = clock
+        self._sessions: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'evicted_lru': 0, 'expired_idle': 0, 'peak': 0}
+        self._stop = threading.Event()
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_pid: Optional[int] = None
+
+    def get_or_create(self, session_id: str) -> Any:
+        """Return the session's object, creating it if needed, and mark it as used."""
+        self._ensure_reaper()
+        session = self.get(session_id)
+        if session is not None:
+            return session
+        # Built outside the lock so a slow factory never blocks other sessions
+        created = self.factory(session_id)
+        with self._lock:
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                session = existing[0]
+            else:
+                session = created
+                self._stats['created'] += 1
+                logger.info("Created session %s", session_id)
+            self._sessions[session_id] = (session, self.clock())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._stats['evicted_lru'] += 1
+                logger.debug("Evicted least recently used session %s", evicted)
+            self._stats['peak'] = max(self._stats['peak'], len(self._sessions))
+        return session
+
+    def get(self, session_id: str) -> Optional[Any]:
+        """Return the session's object and mark it as used, or None if it is unknown or idle too long."""
+        now = self.clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if now - entry[1] > self.idle_ttl:
+                del self._sessions[session_id]
+                self._stats['expired_idle'] += 1
+                return None
+            self._sessions[session_id] = (entry[0], now)
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def reap(self) -> int:
+        """Drop every session idle for longer than idle_ttl; returns how many were dropped."""
+        cutoff = self.clock() - self.idle_ttl
+        expired = 0
+        with self._lock:
+            while self._sessions:
+                session_id, (_, last_used) = next(iter(self._sessions.items()))
+                if last_used >= cutoff:
+                    break
+                del self._sessions[session_id]
+                expired += 1
+            self._stats['expired_idle'] += expired
+        if expired:
+            logger.info(f"Reaped {expired} idle sessions, {len(self)} live")
+        return expired
+
+    def stats(self) -> Dict[str, int]:
+        """Live session count plus creation and eviction counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['live'] = len(self._sessions)
+        return stats
+
+    def close(self) -> None:
+        """Stop the reaper thread."""
+        self._stop.set()
+        if self._reaper is not None and self._reaper_pid == os.getpid():
+            self._reaper.join()
+        self._reaper = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def _ensure_reaper(self) -> None:
+        if self.reap_interval <= 0 or self._stop.is_set():
+            return
+        if self._reaper_pid == os.getpid():
+            return
+        with self._lock:
+            if self._reaper_pid != os.getpid():
+                self._reaper_pid = os.getpid()
+                self._reaper = threading.Thread(target=self._run_reaper, name='session-reaper', daemon=True)
+                self._reaper.start()
+
+    def _run_reaper(self) -> None:
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception as e:
+                logger.error(f"Session reaper failed: {str(e)}")
@@ -0,0 +1,286 @@
+# services/state_store.py
+import hashlib
+import hmac
+import pickle
+import threading
+import time
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'ssuubi'
+# Per-user state, one key per kind: ConversationContext, ResponseGenerator
+# (used responses, emotional stage) and SentimentAnalyzer history
+USER_STATE_KINDS = ('context', 'responses', 'stage', 'sentiment_history')
+
+_MISSING = object()
+_MAC_SIZE = hashlib.sha256().digest_size
+
+
+def user_key(kind: str, user_id: str) -> str:
+    return f"{KEY_PREFIX}:{kind}:{user_id}"
+
+
+def session_key(session_id: str) -> str:
+    return f"{KEY_PREFIX}:session:{session_id}"
+
+
+def turn_keys(user_id: str, session_id: str) -> List[str]:
+    """Every key a chat turn reads, so they can be fetched in one round trip."""
+    return [user_key(kind, user_id) for kind in USER_STATE_KINDS] + [session_key(session_id)]
+
+
+class _Turn:
+    """Values read and written during one chat turn."""
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.writes: Dict[str, Any] = {}
+
+
+class StateStore(ABC):
+    """
+    Key/value storage for per-user conversation state.
+
+    Backends implement get_many/set_many/delete_many. Services call get() and
+    set(); inside a turn() block those are served from a per-turn buffer: the
+    turn's keys are prefetched with one get_many, and every write is flushed
+    with one set_many when the block exits, so a chat turn costs one read and
+    one write round trip. The buffer lives in a ContextVar, so concurrent turns
+    on other threads or asyncio tasks never see each other's values.
+
+    Values are not shared between turns: a service that changes a value must
+    set() it again for the change to be stored.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl = ttl_seconds
+        self._turn: ContextVar[Optional[_Turn]] = ContextVar(f"state_turn_{id(self)}", default=None)
+
+    @abstractmethod
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Values for the keys that exist, in one round trip."""
+
+    @abstractmethod
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """Store several values (with the store's TTL) in one round trip."""
+
+    @abstractmethod
+    def delete_many(self, keys: List[str]) -> None:
+        """Remove the keys that exist."""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        turn = self._turn.get()
+        if turn is None:
+            return self.get_many([key]).get(key, default)
+        if key not in turn.values:
+            # Not prefetched: fetch it now and keep it (or its absence) for the rest of the turn
+            turn.values[key] = self.get_many([key]).get(key, _MISSING)
+        value = turn.values[key]
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any) -> None:
+        turn = self._turn.get()
+        if turn is None:
+            self.set_many({key: value})
+            return
+        turn.values[key] = value
+        turn.writes[key] = value
+
+    def delete(self, key: str) -> None:
+        turn = self._turn.get()
+        if turn is not None:
+            turn.values[key] = _MISSING
+            turn.writes.pop(key, None)
+        self.delete_many([key])
+
+    @contextmanager
+    def turn(self, keys: Iterable[str] = ()) -> Iterator['StateStore']:
+        """Prefetch keys and buffer writes until the block exits; nested turns join the outer one."""
+        if self._turn.get() is not None:
+            yield self
+            return
+        turn = _Turn()
+        keys = list(keys)
+        if keys:
+            with get_metrics().time('state_read'):
+                found = self.get_many(keys)
+            for key in keys:
+                turn.values[key] = found.get(key, _MISSING)
+        token = self._turn.set(turn)
+        try:
+            yield self
+        finally:
+            self._turn.reset(token)
+            # Written even when the turn failed part way, like the in-process state was
+            if turn.writes:
+                with get_metrics().time('state_write'):
+                    self.set_many(turn.writes)
+
+
+class InMemoryStateStore(StateStore):
+    """
+    Process-local backend: an LRU-bounded dict with TTL expiry.
+
+    Values are pickled like the Redis backend does, so state behaves the same
+    way on both (nothing is shared by reference between turns).
+
+    Keys are kept in order of last use, so the front holds the users who have
+    been idle longest. Every write also pops expired keys off the front,
+    so memory follows the users active within the TTL rather than every user
+    ever seen. A key read after its last write can sit behind newer keys, but
+    it is removed at the latest one TTL after that read, and any read of an
+    expired key drops it as well.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_keys: int = 100000,
+                 clock: Callable[[], float] = time.monotonic):
+        super().__init__(ttl_seconds)
+        self.max_keys = max(1, max_keys)
+        self.clock = clock
+        self._data: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'expired': 0, 'evicted': 0}
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        now = self.clock()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None:
+                    continue
+                expires, payload = entry
+                if expires is not None and expires <= now:
+                    del self._data[key]
+                    self._stats['expired'] += 1
+                    continue
+                self._data.move_to_end(key)
+                found[key] = payload
+        return {key: pickle.loads(payload) for key, payload in found.items()}
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        now = self.clock()
+        expires = now + self.ttl if self.ttl else None
+        payloads = {key: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for key, value in items.items()}
+        with self._lock:
+            for key, payload in payloads.items():
+                self._data[key] = (expires, payload)
+                self._data.move_to_end(key)
+            while self._data:
+                oldest = next(iter(self._data.values()))[0]
+                if oldest is None or oldest > now:
+                    break
+                self._data.popitem(last=False)
+                self._stats['expired'] += 1
+            while len(self._data) > self.max_keys:
+                self._data.popitem(last=False)
+                self._stats['evicted'] += 1
+
+    def delete_many(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Live keys, and keys dropped so far for expiry or over max_keys."""
+        with self._lock:
+            return {'keys': len(self._data), **self._stats}
+
+
+class RedisStateStore(StateStore):
+    """
+    Redis (or any Redis-protocol server) backend; works with fakeredis in tests.
+
+    Reads are a single MGET and writes a single non-transactional pipeline of
+    SETs with the store's TTL. Values are pickled and stored behind an
+    HMAC-SHA256 of the key and the pickle, keyed by secret_key (SECRET_KEY):
+    a value that was not written by a store with the same secret, or was
+    moved to another key, is dropped unread instead of being unpickled. The
+    secret must be set: the default SECRET_KEY is public, so anyone able to
+    write to Redis could sign a pickle with it, and is refused.
+    """
+
+    def __init__(self, client=None, url: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 secret_key: Optional[str] = None):
+        super().__init__(ttl_seconds)
+        from app.utils.config import DEFAULT_SECRET_KEY, Config
+        if secret_key is None:
+            secret_key = Config.SECRET_KEY
+        if not secret_key or secret_key == DEFAULT_SECRET_KEY:
+            raise ValueError("RedisStateStore needs SECRET_KEY set to a private value; "
+                             "the default one would let anyone who can write to Redis sign state")
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url or 'redis://localhost:6379/0')
+        self.client = client
+        self._secret = secret_key.encode('utf-8')
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        payloads = self.client.mget(keys)
+        found = {}
+        for key, payload in zip(keys, payloads):
+            if payload is None:
+                continue
+            mac, data = payload[:_MAC_SIZE], payload[_MAC_SIZE:]
+            if not hmac.compare_digest(mac, self._mac(key, data)):
+                logger.warning("Dropping state value of %s: bad signature", key)
+                continue
+            found[key] = pickle.loads(data)
+        return found
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        expires = int(self.ttl) if self.ttl else None
+        pipeline = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            pipeline.set(key, self._mac(key, data) + data, ex=expires)
+        pipeline.execute()
+
+    def _mac(self, key: str, data: bytes) -> bytes:
+        return hmac.new(self._secret, key.encode('utf-8') + b'\0' + data, hashlib.sha256).digest()
+
+    def delete_many(self, keys: List[str]) -> None:
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_state_store(backend: str = 'memory', url: Optional[str] = None,
+                       ttl_seconds: Optional[float] = None) -> StateStore:
+    """Build a state store by backend name ('memory' or 'redis')."""
+    if backend == 'memory':
+        return InMemoryStateStore(ttl_seconds=ttl_seconds)
+    if backend == 'redis':
+        return RedisStateStore(url=url, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown state store backend '{backend}', expected 'memory' or 'redis'")
+
+
+_state_store: Optional[StateStore] = None
+_state_store_lock = threading.Lock()
+
+
+def get_state_store() -> StateStore:
+    """Return the process-wide state store, built from Config on first use."""
+    global _state_store
+    if _state_store is None:
+        with _state_store_lock:
+            if _state_store is None:
+                from app.utils.config import Config
+                _state_store = create_state_store(
+                    Config.STATE_BACKEND,
+                    url=Config.REDIS_URL,
+                    ttl_seconds=Config.STATE_TTL_SECONDS or None
+                )
+                logger.info(f"Using '{Config.STATE_BACKEND}' conversation state store")
+    return _state_store
@@ -0,0 +1,74 @@
+# services/theme_index.py
+from typing import Dict, List, Sequence
+import numpy as np
+
+SUPPORTED_DTYPES = ('float32', 'int8', 'float16')
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class ThemeEmbeddingIndex:
+    """
+    All theme keyword embeddings stacked into one row-normalized matrix.
+
+    Rows are grouped by theme, so a single matrix-vector product gives the
+    cosine similarity of a message to every keyword and one segmented max
+    (np.maximum.reduceat) turns that into the best score per theme.
+
+    dtype selects the storage format of the matrix:
+        float32  exact, 4 bytes per value; fastest, the product goes to BLAS
+        int8     a quarter of the memory; each row is quantized symmetrically
+                 with its own scale, scores are within ~1e-3 of float32
+        float16  half the memory; NumPy has no half-precision BLAS, so the
+                 product is several times slower than float32
+    """
+
+    def __init__(self, theme_embeddings: Dict[str, np.ndarray], dtype: str = 'float32'):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported theme index dtype '{dtype}', expected one of {SUPPORTED_DTYPES}")
+        self.dtype = dtype
+        self.themes: List[str] = [theme for theme, rows in theme_embeddings.items() if len(rows)]
+        blocks = [np.asarray(theme_embeddings[theme], dtype=np.float32).reshape(len(theme_embeddings[theme]), -1)
+                  for theme in self.themes]
+        counts = [len(block) for block in blocks]
+        self.theme_ids = np.repeat(np.arange(len(self.themes)), counts)
+        self._starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.intp) if counts else np.zeros(0, np.intp)
+
+        matrix = _normalize(np.vstack(blocks)) if blocks else np.zeros((0, 0), np.float32)
+        if dtype == 'int8':
+            scales = np.abs(matrix).max(axis=1, keepdims=True) / 127.0
+            scales[scales == 0] = 1.0
+            self._matrix = np.round(matrix / scales).astype(np.int8)
+            self._scales = scales.ravel().astype(np.float32)
+        else:
+            self._matrix = matrix.astype(dtype)
+            self._scales = None
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the keyword matrix (and quantization scales)."""
+        return self._matrix.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+    def similarities(self, embedding: Sequence[float]) -> np.ndarray:
+        """Cosine similarity of the message to every row; self.theme_ids gives each row's theme."""
+        if not self.themes:
+            return np.zeros(0, dtype=np.float32)
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.sqrt(vector @ vector)) or 1.0
+        if self._scales is not None:
+            return (self._matrix @ vector) * (self._scales / norm)
+        return (self._matrix @ vector) / norm
+
+    def scores(self, embedding: Sequence[float]) -> np.ndarray:
+        """Best cosine similarity of the message to each theme's keywords, in self.themes order."""
+        if not self.themes:
+            return np.zeros(0, dtype=np.float32)
+        return np.maximum.reduceat(self.similarities(embedding), self._starts)
+
+    def match(self, embedding: Sequence[float], threshold: float = 0.6) -> List[str]:
+        """Themes whose best keyword similarity is above threshold."""
+        scores = self.scores(embedding)
+        return [self.themes[i] for i in np.flatnonzero(scores > threshold)]
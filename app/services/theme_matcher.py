@@ -0,0 +1,46 @@
+# services/theme_matcher.py
+import re
+from typing import Dict, FrozenSet, List, Set
+from app.utils.helpers import build_trie_pattern
+
+
+class ThemeMatcher:
+    """
+    Precompiled keyword index for theme detection.
+
+    All theme keywords are compiled into a single regex that is scanned once per
+    message. Each match is the longest whole-word keyword starting at that
+    position (matches may overlap), and keywords are mapped back to every theme
+    that lists them. A theme is reported exactly when one of its keywords occurs
+    as a whole word, which is what a separate '\\b(k1|k2|...)\\b' search per theme
+    reported. Multi-word phrases such as 'burnt out' or 'not good enough' match
+    only with the spacing they are written with.
+    """
+
+    def __init__(self, theme_keywords: Dict[str, List[str]]):
+        keyword_themes: Dict[str, Set[str]] = {}
+        for theme, keywords in theme_keywords.items():
+            for keyword in keywords:
+                keyword_themes.setdefault(keyword.lower(), set()).add(theme)
+
+        # The trie tries longer keywords first, so each position reports its
+        # longest whole-word keyword
+        ordered = sorted(keyword_themes)
+        self._pattern = re.compile(r'\b(?=(' + build_trie_pattern(ordered) + r')\b)')
+
+        # A shorter keyword that ends on a word boundary inside a longer one
+        # ('giving' inside 'giving up') matches wherever the longer one does.
+        self._themes: Dict[str, FrozenSet[str]] = {}
+        for keyword in ordered:
+            themes = set()
+            for other in ordered:
+                if keyword.startswith(other) and re.match(r'\b' + re.escape(other) + r'\b', keyword):
+                    themes.update(keyword_themes[other])
+            self._themes[keyword] = frozenset(themes)
+
+    def match(self, lowered: str) -> Set[str]:
+        """Return every theme with a keyword in the (already lowercased) message."""
+        themes: Set[str] = set()
+        for hit in self._pattern.finditer(lowered):
+            themes.update(self._themes[hit.group(1)])
+        return themes
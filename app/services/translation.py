@@ -0,0 +1,208 @@
+# services/translation.py
+import asyncio
+import inspect
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+PARAGRAPH_SEPARATOR = '\n\n'
+
+
+class TranslationBackend(ABC):
+    """Translates a batch of texts in one call. Implementations must be thread-safe."""
+
+    name = 'base'
+
+    @abstractmethod
+    def translate_batch(self, texts: List[str], dest: str, src: str = 'auto') -> List[str]:
+        """One translation per text, in order."""
+
+
+class GoogleTranslateBackend(TranslationBackend):
+    """googletrans, imported on first use; supports both its sync and its async (>= 4.0.2) API."""
+
+    name = 'google'
+
+    def __init__(self):
+        from googletrans import Translator
+        self._translator_class = Translator
+        self._is_async = inspect.iscoroutinefunction(Translator.translate)
+        self._translator = None if self._is_async else Translator()
+
+    def translate_batch(self, texts: List[str], dest: str, src: str = 'auto') -> List[str]:
+        if self._is_async:
+            # Each worker thread runs its own event loop and client
+            results = asyncio.run(self._translate_async(texts, dest, src))
+        else:
+            results = self._translator.translate(texts, dest=dest, src=src)
+        return [result.text for result in results]
+
+    async def _translate_async(self, texts: List[str], dest: str, src: str):
+        async with self._translator_class() as translator:
+            return await translator.translate(texts, dest=dest, src=src)
+
+
+class StubTranslationBackend(TranslationBackend):
+    """Offline backend for tests and local runs: tags each text with its target language."""
+
+    name = 'stub'
+
+    def __init__(self):
+        self.calls: List[Tuple[Tuple[str, ...], str, str]] = []
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts: List[str], dest: str, src: str = 'auto') -> List[str]:
+        with self._lock:
+            self.calls.append((tuple(texts), dest, src))
+        return [f"[{dest}] {text}" for text in texts]
+
+
+class TranslationService:
+    """
+    Cached, batched front end for a translation backend.
+
+    Translations are kept in an LRU cache keyed on (text, src, dest), and every
+    cache miss in a call is sent to the backend in batches of batch_size.
+    Bot responses are translated paragraph by paragraph, so the canned parts of
+    the response bank hit the cache even when a response mixes them with
+    user-specific text; pretranslate() fills the cache for those ahead of time.
+    Backend calls can be moved off the request thread with submit() or
+    translate_async(), which run on a bounded thread pool.
+
+    A failed backend call is logged and the text is returned untranslated
+    (and not cached), so a translation outage never breaks a reply.
+    """
+
+    def __init__(self, backend: TranslationBackend, max_entries: int = 10000, max_workers: int = 4,
+                 batch_size: int = 32):
+        self.backend = backend
+        self.max_entries = max(1, max_entries)
+        self.batch_size = max(1, batch_size)
+        self._cache: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'backend_calls': 0, 'errors': 0}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='translation')
+
+    def translate(self, text: str, dest: str, src: str = 'auto') -> str:
+        """Translate one text, blocking until the result is available."""
+        return self.translate_many([text], dest, src)[0]
+
+    def translate_many(self, texts: List[str], dest: str, src: str = 'auto') -> List[str]:
+        """Translate several texts; cache misses go to the backend in as few calls as possible."""
+        if src == dest:
+            return list(texts)
+        results: List[str] = []
+        misses: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (text, src, dest)
+                if not text.strip():
+                    results.append(text)
+                elif key in self._cache:
+                    self._cache.move_to_end(key)
+                    self._stats['hits'] += 1
+                    results.append(self._cache[key])
+                else:
+                    self._stats['misses'] += 1
+                    misses.setdefault(text, []).append(i)
+                    results.append(text)
+
+        pending = list(misses)
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            translated = self._call_backend(batch, dest, src)
+            if translated is None:
+                continue
+            with self._lock:
+                for text, translation in zip(batch, translated):
+                    self._store((text, src, dest), translation)
+                    for i in misses[text]:
+                        results[i] = translation
+        return results
+
+    def translate_response(self, response: str, dest: str, src: str = 'en') -> str:
+        """Translate a bot response paragraph by paragraph, so canned paragraphs come from the cache."""
+        if src == dest:
+            return response
+        return PARAGRAPH_SEPARATOR.join(self.translate_many(response.split(PARAGRAPH_SEPARATOR), dest, src))
+
+    def submit(self, text: str, dest: str, src: str = 'auto') -> Future:
+        """Translate on the service's thread pool; returns a Future with the translated text."""
+        return self._executor.submit(self.translate, text, dest, src)
+
+    async def translate_async(self, text: str, dest: str, src: str = 'auto') -> str:
+        """Awaitable translate() that keeps the event loop free while the backend is called."""
+        if src == dest:
+            return text
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.translate, text, dest, src)
+
+    async def translate_response_async(self, response: str, dest: str, src: str = 'en') -> str:
+        """Awaitable translate_response()."""
+        if src == dest:
+            return response
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.translate_response, response, dest, src)
+
+    def pretranslate(self, texts: Iterable[str], languages: Iterable[str], src: str = 'en') -> Future:
+        """Fill the cache with translations of canned texts in the background; returns a Future."""
+        texts = list(dict.fromkeys(texts))
+        languages = [language for language in languages if language and language != src]
+
+        def run() -> int:
+            for language in languages:
+                self.translate_many(texts, language, src)
+            logger.info(f"Pre-translated {len(texts)} canned texts into {len(languages)} languages")
+            return len(texts) * len(languages)
+
+        return self._executor.submit(run)
+
+    def stats(self) -> Dict[str, float]:
+        """Cache and backend counters since the service was created."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._cache)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _call_backend(self, texts: List[str], dest: str, src: str):
+        with self._lock:
+            self._stats['backend_calls'] += 1
+        try:
+            translated = self.backend.translate_batch(texts, dest, src)
+            if len(translated) != len(texts):
+                raise ValueError(f"backend returned {len(translated)} translations for {len(texts)} texts")
+            return translated
+        except Exception as e:
+            logger.error(f"Translation to '{dest}' failed for {len(texts)} texts: {str(e)}")
+            with self._lock:
+                self._stats['errors'] += 1
+            return None
+
+    def _store(self, key: Tuple[str, str, str], translation: str) -> None:
+        # Caller holds self._lock
+        self._cache[key] = translation
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+            self._stats['evictions'] += 1
+
+
+BACKENDS = {
+    'google': GoogleTranslateBackend,
+    'stub': StubTranslationBackend,
+}
+
+
+def create_backend(name: str) -> TranslationBackend:
+    """Build a translation backend by name ('google' or 'stub')."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,146 @@
+# services/warmup.py
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from .model_registry import ModelRegistry, get_registry, process_local_resources
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODES = ('background', 'eager', 'lazy', 'preload')
+
+# Cheap indexes first, then the transformer models, then what is built on top of them
+WARMUP_RESOURCES = [
+    'response_bank',
+    'response_index',
+    'intent_matcher',
+    'theme_matcher',
+    'crisis_handler',
+    'sentiment',
+    'embedding',
+    'theme_index',
+    'intent_classifier',
+    'analysis_pipeline',
+    'message_analyzer',
+    'translation_service',
+]
+
+
+class Warmup:
+    """
+    Loads the shared models before the first chat request needs them.
+
+    In 'background' mode this runs on a daemon thread while Flask already serves
+    the home page; a chat request that arrives first simply waits on the
+    registry for the model it needs. status() backs the /ready endpoint.
+
+    'preload' is for a parent process that forks workers (gunicorn
+    --preload): it loads only what can be shared across the fork, on the
+    caller, and after_fork() builds the process-local rest in each worker.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None, resources: Optional[List[str]] = None):
+        self.registry = registry or get_registry()
+        self.resources = list(WARMUP_RESOURCES if resources is None else resources)
+        self.mode: Optional[str] = None
+        self.state = 'pending'
+        self.error: Optional[str] = None
+        self.timings_ms: Dict[str, float] = {}
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state in ('ready', 'skipped')
+
+    def run(self, resources: Optional[List[str]] = None) -> bool:
+        """Load everything (or the given resources) on the calling thread; returns True when all of it loaded."""
+        self._started = time.perf_counter()
+        self.state = 'warming'
+        try:
+            for name in self.resources if resources is None else resources:
+                self._timed(name, lambda name=name: self.registry.get(name))
+            self.state = 'ready'
+            logger.info(f"Warm-up finished in {(time.perf_counter() - self._started) * 1000:.0f} ms")
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            logger.error(f"Warm-up failed: {str(e)}")
+        self._finished = time.perf_counter()
+        return self.state == 'ready'
+
+    def start(self, mode: str = 'background') -> 'Warmup':
+        """Start warming up once per process: on a thread, on the caller ('eager'), or not at all ('lazy')."""
+        if mode not in WARMUP_MODES:
+            raise ValueError(f"Unknown warm-up mode '{mode}', expected one of {WARMUP_MODES}")
+        with self._lock:
+            if self.mode is not None:
+                return self
+            self.mode = mode
+        if mode == 'lazy':
+            # Models load on the first request that needs them
+            self.state = 'skipped'
+        elif mode == 'eager':
+            self.run()
+        elif mode == 'preload':
+            self.run([name for name in self.resources if name not in process_local_resources()])
+        else:
+            self._thread = threading.Thread(target=self.run, name='warmup', daemon=True)
+            self._thread.start()
+        return self
+
+    def after_fork(self) -> 'Warmup':
+        """
+        Call in a worker right after the fork: resets the registry for this
+        process and, after a preload, builds the process-local resources on a
+        background thread (/ready reports 503 until they are loaded).
+        """
+        self.registry.after_fork()
+        self._lock = threading.Lock()
+        if self.mode == 'preload':
+            remaining = [name for name in self.resources if name in process_local_resources()]
+            self._thread = threading.Thread(target=self.run, args=(remaining,), name='warmup', daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until a background warm-up has finished; returns whether it is ready."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def status(self) -> Dict[str, Any]:
+        if self._started is None:
+            elapsed = 0.0
+        else:
+            elapsed = ((self._finished or time.perf_counter()) - self._started) * 1000
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'mode': self.mode,
+            'loaded': self.registry.loaded(),
+            'timings_ms': dict(self.timings_ms),
+            'elapsed_ms': round(elapsed, 1),
+            'error': self.error,
+        }
+
+    def _timed(self, name: str, load: Callable[[], Any]) -> None:
+        started = time.perf_counter()
+        load()
+        self.timings_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+_warmup: Optional[Warmup] = None
+_warmup_lock = threading.Lock()
+
+
+def get_warmup() -> Warmup:
+    """Return the process-wide warm-up tracker."""
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = Warmup()
+    return _warmup
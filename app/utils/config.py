@@ -1,5 +1,81 @@
 import os
 
+# Placeholder secret: fine for local runs, refused where the secret protects something (RedisStateStore)
+DEFAULT_SECRET_KEY = 'supersecretkey'
+
 class Config:
-    SECRET_KEY = os.getenv('SECRET_KEY', 'supersecretkey')
-    DEBUG = os.getenv('DEBUG', 'False') == 'True'
\ No newline at end of file
+    SECRET_KEY = os.getenv('SECRET_KEY', DEFAULT_SECRET_KEY)
+    DEBUG = os.getenv('DEBUG', 'False') == 'True'
+    # Logging: records go through a queue to a writer thread that formats them (json or text)
+    # and writes them to stderr and LOG_FILE ('' for stderr only)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+    # Share of requests whose DEBUG records are kept when LOG_LEVEL=DEBUG
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '0.1'))
+    # User and bot text in log records is replaced by its length and a digest unless this is False
+    LOG_REDACT_TEXT = os.getenv('LOG_REDACT_TEXT', 'True') == 'True'
+    # Records waiting for the writer; beyond this they are dropped instead of blocking requests
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # How the models are loaded: 'background' (serve '/' at once, warm up on a
+    # thread), 'eager' (before serving), 'lazy' (on the first request that needs them)
+    # or 'preload' (in the gunicorn master, shared copy-on-write by the workers; see gunicorn.conf.py)
+    WARMUP_MODE = os.getenv('WARMUP_MODE', 'background')
+    # 'full' runs DistilBERT/MiniLM; 'lite' replaces them with a sentiment lexicon and static
+    # keyword vectors (no models, for instances that cannot hold them)
+    ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'full')
+    # Inference backend for DistilBERT/MiniLM: 'torch' or 'onnx' (onnxruntime; the models are
+    # exported to ONNX_MODEL_DIR once and, with ONNX_QUANTIZE, int8-quantized)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch')
+    ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', 'onnx_models')
+    ONNX_QUANTIZE = os.getenv('ONNX_QUANTIZE', 'True') == 'True'
+    # onnxruntime intra-op threads per model (0 = one per physical core)
+    ONNX_THREADS = int(os.getenv('ONNX_THREADS', '0'))
+    # Micro-batching of sentiment/embedding inference across concurrent requests
+    INFERENCE_BATCHING = os.getenv('INFERENCE_BATCHING', 'False') == 'True'
+    INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', '5'))
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '16'))
+    # Storage for the theme keyword embedding matrix: float32, int8 or float16
+    THEME_INDEX_DTYPE = os.getenv('THEME_INDEX_DTYPE', 'float32')
+    # Intent detection: 'regex' (patterns only) or 'hybrid' (specific regex matches as is, the
+    # rest by similarity of the message embedding to exemplar phrases, taken at or above the threshold)
+    INTENT_ENGINE = os.getenv('INTENT_ENGINE', 'regex')
+    INTENT_EMBEDDING_THRESHOLD = float(os.getenv('INTENT_EMBEDDING_THRESHOLD', '0.5'))
+    INTENT_TOP_K = int(os.getenv('INTENT_TOP_K', '5'))
+    # Cache of sentiment/embedding results keyed on normalized message text (0 disables)
+    ANALYSIS_CACHE_SIZE = int(os.getenv('ANALYSIS_CACHE_SIZE', '10000'))
+    ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv('ANALYSIS_CACHE_TTL_SECONDS', '86400'))
+    # Optional SQLite file so restarted workers start with a warm cache
+    ANALYSIS_CACHE_PATH = os.getenv('ANALYSIS_CACHE_PATH', '')
+    # Translation backend ('google' or the offline 'stub'), its cache and thread pool
+    TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'google')
+    TRANSLATION_CACHE_SIZE = int(os.getenv('TRANSLATION_CACHE_SIZE', '10000'))
+    TRANSLATION_WORKERS = int(os.getenv('TRANSLATION_WORKERS', '4'))
+    # Comma-separated languages to translate the canned responses into at startup, e.g. 'sw,lg,fr'
+    PRETRANSLATE_LANGUAGES = os.getenv('PRETRANSLATE_LANGUAGES', '')
+    # Live chat sessions: LRU cap, idle timeout and how often idle sessions are reaped
+    MAX_SESSIONS = int(os.getenv('MAX_SESSIONS', '1000'))
+    SESSION_IDLE_TTL_SECONDS = float(os.getenv('SESSION_IDLE_TTL_SECONDS', '1800'))
+    SESSION_REAP_INTERVAL_SECONDS = float(os.getenv('SESSION_REAP_INTERVAL_SECONDS', '60'))
+    # ASGI serving (asgi.py): threads running chat turns, and chat requests admitted before answering 503
+    ASYNC_INFERENCE_WORKERS = int(os.getenv('ASYNC_INFERENCE_WORKERS', '4'))
+    ASYNC_MAX_PENDING = int(os.getenv('ASYNC_MAX_PENDING', '64'))
+    # Request bodies are read whole before the route runs: larger ones are answered 413
+    ASYNC_MAX_BODY_BYTES = int(os.getenv('ASYNC_MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+    # Batch replay (/api/chat/batch, replay.py): messages per model batch and turns read per window,
+    # also the upper bounds of the route's batch_size and window parameters
+    BATCH_REPLAY_SIZE = int(os.getenv('BATCH_REPLAY_SIZE', '32'))
+    BATCH_REPLAY_WINDOW = int(os.getenv('BATCH_REPLAY_WINDOW', '1024'))
+    # /api/chat/batch is unauthenticated bulk work: off unless enabled, and its body is capped
+    BATCH_REPLAY_ROUTE = os.getenv('BATCH_REPLAY_ROUTE', 'False') == 'True'
+    BATCH_REPLAY_MAX_BYTES = int(os.getenv('BATCH_REPLAY_MAX_BYTES', str(1024 * 1024)))
+    # Per-stage latency and batch size histograms for /metrics (off makes the stage timers no-ops)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+    # Per-user conversation state: 'memory' (single worker) or 'redis' (shared by workers and nodes)
+    STATE_BACKEND = os.getenv('STATE_BACKEND', 'memory')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    STATE_TTL_SECONDS = float(os.getenv('STATE_TTL_SECONDS', '86400'))
+    # Turns of conversation history kept per session (a ring: the oldest is dropped beyond this)
+    SESSION_HISTORY_SIZE = int(os.getenv('SESSION_HISTORY_SIZE', '100'))
+    # How many of a user's most recent responses are not repeated to them
+    RECENT_RESPONSES_PER_USER = int(os.getenv('RECENT_RESPONSES_PER_USER', '32'))
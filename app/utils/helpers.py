@@ -1,3 +1,28 @@
+import re
+from typing import Dict, Iterable
+
 def validate_session(session_id):
     # Add session validation logic here
-    return True
\ No newline at end of file
+    return True
+
+def build_trie_pattern(words: Iterable[str]) -> str:
+    """
+    Build a regex alternation matching any of the given literal strings, laid out
+    as a trie so the engine branches on one character at a time. Longer
+    continuations are tried first, so the longest word at a position wins.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    return _trie_node_pattern(trie)
+
+def _trie_node_pattern(node: Dict) -> str:
+    branches = [re.escape(char) + _trie_node_pattern(child) for char, child in sorted(node.items()) if char]
+    if '' in node:
+        branches.append('')
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
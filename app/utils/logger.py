@@ -1,11 +1,212 @@
+import atexit
+import hashlib
+import json
 import logging
+import queue
+import sys
+import threading
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, List, Optional
+
+from flask import g, request
 from flask.logging import default_handler
 
+from .config import Config
+
+# Request id of the chat request being served, set per request (Flask) or task (ASGI)
+request_id_var: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# Record fields holding raw user or bot text: logged as their length and a digest unless redaction is off
+TEXT_FIELDS = ('user_text', 'bot_text')
+
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+_listener: Optional[QueueListener] = None
+_handlers: List[logging.Handler] = []
+_queue_handler: Optional['NonBlockingQueueHandler'] = None
+_lock = threading.Lock()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def redact(text: Any) -> Dict[str, Any]:
+    """What is logged instead of a message: enough to correlate repeats, nothing to read."""
+    text = str(text)
+    return {'chars': len(text), 'sha256': hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request id; runs on the calling thread, where the ContextVar is set."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Keeps DEBUG records of a fraction of requests.
+
+    The choice is made per request id, so a sampled request keeps all of its
+    debug records and the others none; records outside a request are sampled
+    one by one. INFO and above always pass.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(1.0, rate)) * 10000)
+        self._count = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.threshold >= 10000:
+            return True
+        request_id = getattr(record, 'request_id', None)
+        if request_id is None:
+            self._count += 1
+            return self._count * self.threshold // 10000 != (self._count - 1) * self.threshold // 10000
+        return zlib.crc32(request_id.encode()) % 10000 < self.threshold
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread as they are, without formatting them.
+
+    The message is only merged with its args (and the exception rendered) by
+    the listener's formatter, off the request thread. When the queue is full
+    the record is dropped and counted rather than blocking the request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request id and any extra fields."""
+
+    def __init__(self, redact_text: bool = True):
+        super().__init__()
+        self.redact_text = redact_text
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            entry['request_id'] = record.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = redact(value) if self.redact_text and key in TEXT_FIELDS else value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """The plain format for local runs; extra fields, and so any raw text, are left out."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+
+
+def configure_logging(level: Optional[str] = None, path: Optional[str] = None, fmt: Optional[str] = None,
+                      debug_sample_rate: Optional[float] = None, redact_text: Optional[bool] = None,
+                      queue_size: Optional[int] = None) -> NonBlockingQueueHandler:
+    """
+    Route every logger through one queue to a background writer (idempotent).
+
+    The root logger gets a NonBlockingQueueHandler; a QueueListener thread
+    formats the records (JSON by default) and writes them to stderr and, when
+    path is set, to that file. Arguments default to the LOG_* settings.
+    """
+    global _listener, _queue_handler, _handlers
+    level = level or Config.LOG_LEVEL
+    path = Config.LOG_FILE if path is None else path
+    fmt = fmt or Config.LOG_FORMAT
+    debug_sample_rate = Config.LOG_DEBUG_SAMPLE_RATE if debug_sample_rate is None else debug_sample_rate
+    redact_text = Config.LOG_REDACT_TEXT if redact_text is None else redact_text
+    queue_size = Config.LOG_QUEUE_SIZE if queue_size is None else queue_size
+
+    with _lock:
+        root = logging.getLogger()
+        root.setLevel(level.upper())
+        if _queue_handler is not None:
+            return _queue_handler
+        formatter = JsonFormatter(redact_text) if fmt == 'json' else TextFormatter()
+        _handlers = [logging.StreamHandler(sys.stderr)]
+        if path:
+            _handlers.append(logging.FileHandler(path))
+        for handler in _handlers:
+            handler.setFormatter(formatter)
+        _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=max(0, queue_size)))
+        _queue_handler.addFilter(RequestContextFilter())
+        if debug_sample_rate < 1.0:
+            _queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+        # Records reaching the root go through the queue only
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        _listener = QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _queue_handler
+
+
+def stop_logging() -> None:
+    """Write out the queued records and stop the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def after_fork() -> None:
+    """Give a forked worker its own queue and writer thread (threads do not survive a fork)."""
+    global _listener
+    with _lock:
+        if _queue_handler is None:
+            return
+        _queue_handler.queue = queue.Queue(maxsize=_queue_handler.queue.maxsize)
+        _listener = QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+def _assign_request_id() -> None:
+    g.request_id = request.headers.get('X-Request-ID') or new_request_id()
+    request_id_var.set(g.request_id)
+
+
+def _echo_request_id(response):
+    response.headers.setdefault('X-Request-ID', g.get('request_id', ''))
+    return response
+
+
 def setup_logger(app):
-    logging.basicConfig(level=logging.INFO)
     app.logger.removeHandler(default_handler)
-    handler = logging.FileHandler('app.log')
-    handler.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    app.logger.addHandler(handler)
\ No newline at end of file
+    configure_logging()
+    # Every request gets an id (the caller's X-Request-ID if sent), stamped on its log records and echoed back
+    app.before_request(_assign_request_id)
+    app.after_request(_echo_request_id)
@@ -0,0 +1,72 @@
+"""
+Per-process memory, to see how much of each gunicorn worker is really its own.
+
+    python -m app.utils.memory <gunicorn master pid>
+
+RSS counts every page a process maps, including the model weights it shares
+copy-on-write with the master and the other workers. Unique memory (USS, the
+private pages) is what a worker actually adds, and PSS splits each shared page
+evenly between the processes mapping it, so PSS summed over master and workers
+is the real footprint of the whole server. Linux only (/proc/<pid>/smaps_rollup).
+"""
+import os
+import sys
+from typing import Dict, List, Optional
+
+_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_mb',
+    'Shared_Dirty': 'shared_mb',
+    'Private_Clean': 'uss_mb',
+    'Private_Dirty': 'uss_mb',
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """rss_mb, pss_mb, uss_mb and shared_mb of a process (this one by default); empty where /proc is unavailable."""
+    pid = os.getpid() if pid is None else pid
+    usage = {'pid': pid, 'rss_mb': 0.0, 'pss_mb': 0.0, 'uss_mb': 0.0, 'shared_mb': 0.0}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in _FIELDS:
+                    usage[_FIELDS[name]] += int(rest.split()[0]) / 1024
+    except OSError:
+        return {}
+    return usage
+
+
+def children(pid: int) -> List[int]:
+    """Direct child processes of pid (e.g. the workers of a gunicorn master)."""
+    found = []
+    try:
+        for task in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{task}/children') as f:
+                found.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return sorted(set(found))
+
+
+def server_memory(master_pid: int) -> List[Dict[str, float]]:
+    """process_memory() of the master followed by each of its workers."""
+    return [usage for usage in (process_memory(pid) for pid in [master_pid] + children(master_pid)) if usage]
+
+
+def format_report(usages: List[Dict[str, float]]) -> str:
+    lines = [f"{'process':<8} {'pid':>8} {'RSS MB':>8} {'unique MB':>10} {'PSS MB':>8} {'shared MB':>10}"]
+    for i, usage in enumerate(usages):
+        role = 'master' if i == 0 else f'worker{i}'
+        lines.append(f"{role:<8} {usage['pid']:8d} {usage['rss_mb']:8.1f} {usage['uss_mb']:10.1f} "
+                     f"{usage['pss_mb']:8.1f} {usage['shared_mb']:10.1f}")
+    lines.append(f"{'total':<8} {'':>8} {sum(u['rss_mb'] for u in usages):8.1f} "
+                 f"{sum(u['uss_mb'] for u in usages):10.1f} {sum(u['pss_mb'] for u in usages):8.1f}")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    print(format_report(server_memory(int(sys.argv[1]))))
@@ -0,0 +1,5 @@
+from app.asgi import create_asgi_app
+
+# ASGI entry point: uvicorn asgi:app (chat turns on a bounded executor, 503 when
+# more than ASYNC_MAX_PENDING are in flight; other routes are served by Flask)
+app = create_asgi_app()
@@ -0,0 +1,69 @@
+"""
+Batch replay throughput against one generate_response call per turn.
+
+    python -m benchmarks.bench_batch_replay [--turns 2000] [--sessions 100] [--batch-sizes 1,8,32,64] [--lite]
+
+Generates a synthetic transcript of interleaved sessions from the parity and
+theme samples and replays it sequentially through a ConversationHandler and
+through BatchReplayer at each batch size, each time against a fresh state
+store with the analysis cache disabled, reporting turns/sec. --lite uses the
+model-free ANALYSIS_MODE=lite models, so it runs without transformers.
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from app.services.batch_replay import BatchReplayer
+from app.services.conversation_handler import ConversationHandler
+from app.services.model_registry import LITE_LOADERS, ModelRegistry
+from app.services.onnx_backend import PARITY_SAMPLE
+from app.services.state_store import InMemoryStateStore
+from app.services.translation import StubTranslationBackend, TranslationService
+from benchmarks.bench_lite_agreement import THEME_SAMPLE
+
+
+def transcript(turns: int, sessions: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    messages = [text for text, _ in PARITY_SAMPLE] + THEME_SAMPLE
+    return [{'session_id': f"s{rng.randrange(sessions)}", 'message': rng.choice(messages), 'language': 'en'}
+            for _ in range(turns)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--batch-sizes', default='1,8,32,64')
+    parser.add_argument('--lite', action='store_true', help='lexicon sentiment and static vectors instead of the models')
+    args = parser.parse_args()
+
+    loaders = dict(LITE_LOADERS) if args.lite else {}
+    loaders['analysis_cache'] = lambda registry: None
+    loaders['inference_scheduler'] = lambda registry: None
+    loaders['translation_service'] = lambda registry: TranslationService(StubTranslationBackend())
+    registry = ModelRegistry(loaders=loaders)
+    turns = transcript(args.turns, args.sessions)
+    # Load the models before timing
+    registry.analysis_pipeline().analyze_batch([turn['message'] for turn in turns[:8]])
+
+    handler = ConversationHandler(registry, InMemoryStateStore(max_keys=10 ** 6))
+    started = time.perf_counter()
+    for turn in turns:
+        handler.generate_response(turn['message'], turn['session_id'], f"user_{turn['session_id']}", turn['language'])
+    sequential = len(turns) / (time.perf_counter() - started)
+
+    print(f"{len(turns)} turns over {args.sessions} sessions ({'lite' if args.lite else 'full'} models)")
+    print(f"{'mode':<16} {'turns/sec':>10} {'avg batch':>10} {'speedup':>8}")
+    print(f"{'sequential':<16} {sequential:10.1f} {1:10.1f} {1:8.2f}")
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        replayer = BatchReplayer(registry, batch_size=batch_size)
+        for _ in replayer.replay(turns):
+            pass
+        stats = replayer.stats()
+        print(f"{f'batch {batch_size}':<16} {stats['turns_per_second']:10.1f} {stats['avg_batch_size']:10.1f} "
+              f"{stats['turns_per_second'] / sequential:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
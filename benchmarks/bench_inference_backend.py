@@ -0,0 +1,113 @@
+"""
+PyTorch against onnxruntime (fp32 and int8) for DistilBERT sentiment and MiniLM embeddings.
+
+    python -m benchmarks.bench_inference_backend [--rounds 200] [--backends torch,onnx,onnx-int8] [--threads 0]
+
+Each backend is measured in a fresh interpreter: load time, resident memory
+after loading both models, and p50/p99 latency of one message through
+sentiment + embedding. Afterwards every ONNX backend is checked against the
+PyTorch models on the labeled PARITY_SAMPLE (accuracy, label agreement,
+embedding cosine). The first ONNX run exports the models to ONNX_MODEL_DIR.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+# backend name -> environment for the registry loaders
+BACKENDS: Dict[str, Dict[str, str]] = {
+    'torch': {'INFERENCE_BACKEND': 'torch'},
+    'onnx': {'INFERENCE_BACKEND': 'onnx', 'ONNX_QUANTIZE': 'False'},
+    'onnx-int8': {'INFERENCE_BACKEND': 'onnx', 'ONNX_QUANTIZE': 'True'},
+}
+
+MEASURE_SCRIPT = r'''
+import json, time
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+from app.services.model_registry import ModelRegistry
+from app.services.onnx_backend import PARITY_SAMPLE
+before = rss_mb()
+started = time.perf_counter()
+registry = ModelRegistry()
+sentiment, embedding = registry.sentiment_pipeline(), registry.embedding_model()
+load_s = time.perf_counter() - started
+messages = [text for text, _ in PARITY_SAMPLE]
+for message in messages[:5]:
+    sentiment(message), embedding.encode(message)
+latencies = []
+for _ in range({rounds}):
+    for message in messages:
+        started = time.perf_counter()
+        sentiment(message)[0]
+        embedding.encode(message)
+        latencies.append(time.perf_counter() - started)
+latencies.sort()
+pick = lambda pct: latencies[min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))] * 1000
+print(json.dumps({{'load_s': load_s, 'rss_mb': rss_mb(), 'model_mb': rss_mb() - before,
+                  'p50_ms': pick(50), 'p99_ms': pick(99)}}))
+'''
+
+
+def measure(backend: str, rounds: int, threads: int) -> Dict:
+    env = dict(os.environ, ONNX_THREADS=str(threads), **BACKENDS[backend])
+    result = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT.format(rounds=rounds)],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def parity(backend: str, threads: int) -> Dict[str, float]:
+    from app.services import onnx_backend
+    from app.services.model_registry import EMBEDDING_MODEL, SENTIMENT_MODEL
+    from app.utils.config import Config
+    from sentence_transformers import SentenceTransformer
+    from transformers import pipeline
+
+    quantized = BACKENDS[backend].get('ONNX_QUANTIZE') == 'True'
+    return onnx_backend.check_parity(
+        pipeline("sentiment-analysis", model=SENTIMENT_MODEL, tokenizer=SENTIMENT_MODEL),
+        onnx_backend.load_sentiment(SENTIMENT_MODEL, Config.ONNX_MODEL_DIR, quantized=quantized, threads=threads),
+        SentenceTransformer(EMBEDDING_MODEL),
+        onnx_backend.load_embedding(EMBEDDING_MODEL, Config.ONNX_MODEL_DIR, quantized=quantized, threads=threads),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=200, help='passes over the sample per backend')
+    parser.add_argument('--backends', default='torch,onnx,onnx-int8')
+    parser.add_argument('--threads', type=int, default=0, help='ONNX_THREADS for the onnx backends')
+    args = parser.parse_args()
+    backends = args.backends.split(',')
+
+    print(f"{'backend':<12} {'load s':>7} {'RSS MB':>8} {'models MB':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for backend in backends:
+        result = measure(backend, args.rounds, args.threads)
+        if 'error' in result:
+            print(f"{backend:<12} error: {result['error']}")
+            continue
+        print(f"{backend:<12} {result['load_s']:7.1f} {result['rss_mb']:8.0f} {result['model_mb']:10.0f} "
+              f"{result['p50_ms']:8.1f} {result['p99_ms']:8.1f}")
+
+    onnx_backends = [backend for backend in backends if backend != 'torch']
+    if onnx_backends:
+        print()
+        print(f"{'backend':<12} {'torch acc':>9} {'acc':>6} {'agree':>6} {'max dscore':>10} {'cos mean':>9} {'cos min':>8}")
+    for backend in onnx_backends:
+        report = parity(backend, args.threads)
+        print(f"{backend:<12} {report['reference_accuracy']:9.2f} {report['candidate_accuracy']:6.2f} "
+              f"{report['label_agreement']:6.2f} {report['max_score_diff']:10.3f} "
+              f"{report['mean_embedding_cosine']:9.4f} {report['min_embedding_cosine']:8.4f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Requests per second against concurrency, with and without micro-batching.
+
+    python -m benchmarks.bench_inference_batching
+    python -m benchmarks.bench_inference_batching --synthetic --concurrency 1,4,16,64
+
+By default the real DistilBERT/MiniLM models are loaded through the model
+registry and run on CPU. --synthetic swaps them for a model with a fixed
+per-call overhead plus a small per-item cost, which shows the scheduling
+behaviour without downloading anything.
+"""
+import argparse
+import threading
+import time
+from typing import Callable, List
+
+from app.services.inference_scheduler import InferenceScheduler
+from app.services.model_registry import ModelRegistry
+
+MESSAGES = [
+    "I'm feeling really anxious about work",
+    "I can't sleep at night",
+    "hi",
+    "I feel so lonely since my friend moved away",
+    "My boss keeps putting pressure on me and I'm burnt out",
+    "I'm sad",
+    "Thanks, that helped a lot",
+    "I don't know what to do anymore, everything feels pointless",
+]
+
+
+class _SyntheticDevice:
+    """One shared compute unit: calls serialize, each costs overhead + per-item time."""
+
+    def __init__(self, overhead_ms: float, per_item_ms: float):
+        self.overhead = overhead_ms / 1000.0
+        self.per_item = per_item_ms / 1000.0
+        self.lock = threading.Lock()
+
+    def run(self, n: int) -> None:
+        with self.lock:
+            time.sleep(self.overhead + self.per_item * n)
+
+
+class _SyntheticSentiment:
+    def __init__(self, device: _SyntheticDevice):
+        self.device = device
+
+    def __call__(self, texts, batch_size: int = 1):
+        batch = texts if isinstance(texts, list) else [texts]
+        self.device.run(len(batch))
+        return [{'label': 'NEGATIVE', 'score': 0.9} for _ in batch]
+
+
+class _SyntheticEmbedder:
+    def __init__(self, device: _SyntheticDevice):
+        self.device = device
+
+    def encode(self, texts, batch_size: int = 1):
+        batch = texts if isinstance(texts, list) else [texts]
+        self.device.run(len(batch))
+        vectors = [[0.0] * 4 for _ in batch]
+        return vectors if isinstance(texts, list) else vectors[0]
+
+
+def _run(concurrency: int, requests_per_thread: int, infer: Callable[[str], object]) -> List[float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def worker(offset: int) -> None:
+        local = []
+        for i in range(requests_per_thread):
+            message = MESSAGES[(offset + i) % len(MESSAGES)]
+            started = time.perf_counter()
+            infer(message)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help='comma separated thread counts')
+    parser.add_argument('--requests', type=int, default=20, help='requests per thread')
+    parser.add_argument('--window-ms', type=float, default=5.0)
+    parser.add_argument('--max-batch', type=int, default=16)
+    parser.add_argument('--synthetic', action='store_true', help='use a synthetic model instead of DistilBERT/MiniLM')
+    parser.add_argument('--overhead-ms', type=float, default=8.0, help='synthetic per-call cost')
+    parser.add_argument('--per-item-ms', type=float, default=0.5, help='synthetic per-item cost')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        device = _SyntheticDevice(args.overhead_ms, args.per_item_ms)
+        sentiment_model, embedding_model = _SyntheticSentiment(device), _SyntheticEmbedder(device)
+    else:
+        registry = ModelRegistry()
+        sentiment_model, embedding_model = registry.sentiment_pipeline(), registry.embedding_model()
+        # Warm up both models so the first measurement is not a load
+        sentiment_model(MESSAGES[0])
+        embedding_model.encode(MESSAGES[0])
+
+    def direct(message: str):
+        return sentiment_model(message)[0], embedding_model.encode(message)
+
+    print(f"{'threads':>7} {'mode':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'avg batch':>9}")
+    for concurrency in [int(c) for c in args.concurrency.split(',')]:
+        started = time.perf_counter()
+        latencies = _run(concurrency, args.requests, direct)
+        elapsed = time.perf_counter() - started
+        print(f"{concurrency:>7} {'direct':>8} {len(latencies) / elapsed:>9.1f} "
+              f"{_percentile(latencies, 50) * 1000:>8.1f} {_percentile(latencies, 99) * 1000:>8.1f} {1.0:>9.1f}")
+
+        scheduler = InferenceScheduler(sentiment_model, embedding_model,
+                                       max_batch_size=args.max_batch, max_wait_ms=args.window_ms)
+        started = time.perf_counter()
+        latencies = _run(concurrency, args.requests, scheduler.infer)
+        elapsed = time.perf_counter() - started
+        stats = scheduler.stats()['sentiment']
+        scheduler.close()
+        print(f"{concurrency:>7} {'batched':>8} {len(latencies) / elapsed:>9.1f} "
+              f"{_percentile(latencies, 50) * 1000:>8.1f} {_percentile(latencies, 99) * 1000:>8.1f} "
+              f"{stats['avg_batch_size']:>9.1f}")
+    print(f"{args.requests} requests per thread; window={args.window_ms}ms max_batch={args.max_batch}")
+
+
+if __name__ == '__main__':
+    main()
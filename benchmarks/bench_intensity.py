@@ -0,0 +1,106 @@
+"""
+IntensityScorer against NLTK word_tokenize, which it replaces.
+
+    python -m benchmarks.bench_intensity [--rounds 2000] [--fuzz 20000] [--show-differences]
+
+Every corpus message, plus --fuzz random punctuation-heavy ones, is scored
+both ways and the share that agrees is reported. The scorer is a plain regex
+and is not expected to match word_tokenize everywhere: see IntensityScorer
+for the cases where they differ. The reference needs NLTK's punkt_tab data;
+without it only the scorer is timed.
+"""
+import argparse
+import random
+import time
+from typing import Callable, List, Optional
+
+from app.services.intensity_scorer import INTENSITY_MARKERS, MAX_INTENSITY, IntensityScorer
+
+CORPUS = [
+    "I'm feeling really anxious about work",
+    "I am very, very tired.",
+    "I'm SO stressed out, too much on my plate!!",
+    "extremely sad... and somewhat lonely",
+    "It's been incredibly hard (really hard) since she passed.",
+    "I feel so-so today",
+    "I'm barely sleeping, it's terribly quiet at night.",
+    "\"so\" is what everyone says",
+    "I can't go on, it's unbearably painful and I'm desperately tired",
+    "Honestly? Moderately okay. Slightly better than yesterday.",
+    "very'nt sure what I feel",
+    "My therapist said I'm highly sensitive; I'm profoundly grateful for her.",
+    "it's overwhelmingly quiet--too quiet",
+    "really?really!really.",
+    "I just feel... so... empty.",
+    "thanks, that helps a lot",
+    "ok",
+    "",
+    "🙂 so happy today 🙂",
+    "My boss keeps putting pressure on me and I'm absolutely burnt out, extremely exhausted and really, really done.",
+]
+
+_FUZZ_PIECES = list(INTENSITY_MARKERS) + list("'.,:;-!?\"`()[]{}<>/_*&%$#@«»“”‘’—") + [
+    "n't", "'s", "'ll", "...", "--", "'re", "'m", " ", "  ", "\n", ". ", "I", "feel", "Dr.", "3.5",
+]
+
+
+def reference_scorer() -> Optional[Callable[[str], float]]:
+    """Score the way the analyzer used to: look up every word_tokenize token (None without punkt_tab)."""
+    from nltk.tokenize import word_tokenize
+
+    try:
+        word_tokenize('warm up.')
+    except LookupError:
+        return None
+
+    def score(message: str) -> float:
+        return min(sum(INTENSITY_MARKERS.get(word, 0) for word in word_tokenize(message.lower())), MAX_INTENSITY)
+    return score
+
+
+def fuzz_messages(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [''.join(rng.choice(_FUZZ_PIECES) for _ in range(rng.randint(1, 20))) for _ in range(count)]
+
+
+def _time(fn: Callable[[str], object], messages: List[str], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - started) / (rounds * len(messages)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--fuzz', type=int, default=20000, help='random messages to compare with word_tokenize')
+    parser.add_argument('--show-differences', action='store_true')
+    args = parser.parse_args()
+
+    reference = reference_scorer()
+    scorer = IntensityScorer()
+    fast = _time(scorer.score, CORPUS, args.rounds)
+    if reference is None:
+        print("reference unavailable: nltk punkt_tab data is not installed")
+        print(f"IntensityScorer: {fast:.1f} us/message ({len(CORPUS)} messages x {args.rounds} rounds)")
+        return
+
+    fuzzed = fuzz_messages(args.fuzz)
+    for name, messages in (('corpus', CORPUS), ('fuzzed', fuzzed)):
+        differences = [(m, scorer.score(m), reference(m)) for m in messages if scorer.score(m) != reference(m)]
+        print(f"{name}: {len(messages) - len(differences)}/{len(messages)} messages scored the same as word_tokenize")
+        if args.show_differences:
+            for message, ours, theirs in differences[:20]:
+                print(f"  {message!r}: {ours:g} vs. {theirs:g}")
+
+    baseline = _time(reference, CORPUS, args.rounds)
+    print(f"timing {len(CORPUS)} messages x {args.rounds} rounds")
+    print(f"{'strategy':<28} {'us/message':>10}")
+    print(f"{'word_tokenize + lookup':<28} {baseline:>10.1f}")
+    print(f"{'IntensityScorer':<28} {fast:>10.1f}")
+    print(f"speedup: {baseline / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
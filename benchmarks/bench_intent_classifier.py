@@ -0,0 +1,174 @@
+"""
+Accuracy and latency of the hybrid intent classifier against the regex matcher alone.
+
+    python -m benchmarks.bench_intent_classifier [--models lite|full] [--rounds 200] [--show-errors]
+
+Classifies a labeled sample of messages, none of them among the exemplars in
+intent_exemplars.py, with INTENT_ENGINE=regex (the highest-priority pattern)
+and INTENT_ENGINE=hybrid (specific patterns, then the nearest exemplars).
+GENERAL and UNKNOWN count as the same answer: both mean no specific concern.
+
+Latency is per message for the classification alone; the message embedding
+is computed by the analysis stage either way and is reported separately.
+--models full uses MiniLM (needs sentence-transformers), lite the static
+keyword vectors of ANALYSIS_MODE=lite.
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from app.services.intent_classifier import IntentClassifier, build_exemplar_index
+from app.services.intent_exemplars import INTENT_EXEMPLARS
+from app.services.intent_matcher import IntentMatcher
+from app.services.intents import MessageIntent
+from app.services.message_patterns import patterns_data
+from app.services.model_registry import LITE_LOADERS, ModelRegistry
+from app.utils.config import Config
+
+I = MessageIntent
+LABELED_SAMPLE: List[Tuple[str, MessageIntent]] = [
+    # Phrasings the patterns catch
+    ("hello there", I.GREETING),
+    ("good morning", I.GREETING),
+    ("bye for now, take care", I.FAREWELL),
+    ("thanks for listening", I.GRATITUDE),
+    ("I want to die", I.CRISIS),
+    ("sometimes I think about how to end it all", I.CRISIS),
+    ("I am really depressed", I.DEPRESSION),
+    ("I'm so stressed out, too much on my plate", I.STRESS),
+    ("I feel so lonely, no one understands me", I.LONELINESS),
+    ("I lost my temper with my brother", I.ANGER),
+    ("my partner and I are going through a breakup", I.RELATIONSHIP),
+    ("I've been mourning my grandmother", I.GRIEF),
+    ("can't sleep again, up all night", I.SLEEP),
+    ("I need to take care of myself more", I.SELF_CARE),
+    ("what can you do?", I.GENERAL),
+    # Paraphrases without the trigger phrases
+    ("hey! anybody around to chat?", I.GREETING),
+    ("greetings friend", I.GREETING),
+    ("ok I'm heading out now, later", I.FAREWELL),
+    ("gotta go, speak soon", I.FAREWELL),
+    ("you helped me a lot today", I.GRATITUDE),
+    ("I really value this conversation", I.GRATITUDE),
+    ("I don't see any reason to keep going with my life", I.CRISIS),
+    ("I've been thinking everyone would be happier if I wasn't here", I.CRISIS),
+    ("I've been planning how to hurt myself", I.CRISIS),
+    ("my stomach is in knots about the exam", I.ANXIETY),
+    ("I'm so nervous about my interview tomorrow", I.ANXIETY),
+    ("I keep overthinking every little thing", I.ANXIETY),
+    ("I feel a sense of dread all day", I.ANXIETY),
+    ("my heart pounds and I start shaking in meetings", I.ANXIETY),
+    ("I don't enjoy anything anymore", I.DEPRESSION),
+    ("I feel numb and empty most days", I.DEPRESSION),
+    ("I've been crying for no reason", I.DEPRESSION),
+    ("life just feels heavy and grey", I.DEPRESSION),
+    ("work is piling up and I'm drowning", I.STRESS),
+    ("I have three deadlines this week and I'm burnt out", I.STRESS),
+    ("I'm juggling too many things at once", I.STRESS),
+    ("nobody ever calls or texts me", I.LONELINESS),
+    ("I eat lunch by myself every day", I.LONELINESS),
+    ("I feel invisible at school", I.LONELINESS),
+    ("I'm furious at my boss", I.ANGER),
+    ("I want to scream at everyone", I.ANGER),
+    ("I slammed the door and yelled at my kids", I.ANGER),
+    ("how do I unwind after work?", I.SELF_CARE),
+    ("any tips for looking after my mental health?", I.SELF_CARE),
+    ("my boyfriend cheated on me", I.RELATIONSHIP),
+    ("my wife and I argue every night", I.RELATIONSHIP),
+    ("my friend stopped talking to me after our fight", I.RELATIONSHIP),
+    ("my dad died in March and I miss him", I.GRIEF),
+    ("we had to put our cat down yesterday", I.GRIEF),
+    ("it's been a year since she passed away", I.GRIEF),
+    ("I lie awake until 4am", I.SLEEP),
+    ("I'm exhausted but my mind won't shut off at night", I.SLEEP),
+    ("I only get a few hours of rest each night", I.SLEEP),
+    ("tell me about yourself", I.GENERAL),
+    ("are you a real person?", I.GENERAL),
+    ("ok", I.GENERAL),
+    ("hmm", I.GENERAL),
+    ("I think about things a lot", I.GENERAL),
+]
+
+
+def load_embedder(models: str):
+    if models == 'lite':
+        return ModelRegistry(loaders=dict(LITE_LOADERS)).embedding_model()
+    return ModelRegistry().embedding_model()
+
+
+def _same(a: MessageIntent, b: MessageIntent) -> bool:
+    general = (MessageIntent.GENERAL, MessageIntent.UNKNOWN)
+    return a == b or (a in general and b in general)
+
+
+def evaluate(classifier: IntentClassifier, embeddings: np.ndarray) -> List[MessageIntent]:
+    return [classifier.classify(text, embedding).intent for (text, _), embedding in zip(LABELED_SAMPLE, embeddings)]
+
+
+def latency(classifier: IntentClassifier, embeddings: np.ndarray, rounds: int) -> Tuple[float, float]:
+    samples = []
+    for _ in range(rounds):
+        for (text, _), embedding in zip(LABELED_SAMPLE, embeddings):
+            started = time.perf_counter()
+            classifier.classify(text, embedding)
+            samples.append(time.perf_counter() - started)
+    return float(np.percentile(samples, 50) * 1e6), float(np.percentile(samples, 99) * 1e6)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', choices=('lite', 'full'), default='full')
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--threshold', type=float, default=Config.INTENT_EMBEDDING_THRESHOLD)
+    parser.add_argument('--top-k', type=int, default=Config.INTENT_TOP_K)
+    parser.add_argument('--show-errors', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        embedder = load_embedder(args.models)
+    except ImportError as e:
+        raise SystemExit(f"--models {args.models} needs {e.name}; try --models lite")
+    started = time.perf_counter()
+    index = build_exemplar_index(embedder, INTENT_EXEMPLARS)
+    build_ms = (time.perf_counter() - started) * 1000
+    texts = [text for text, _ in LABELED_SAMPLE]
+    started = time.perf_counter()
+    embeddings = np.asarray([embedder.encode(text) for text in texts])
+    embed_us = (time.perf_counter() - started) / len(texts) * 1e6
+
+    matcher = IntentMatcher(patterns_data)
+    engines: Dict[str, IntentClassifier] = {
+        'regex': IntentClassifier(matcher),
+        'hybrid': IntentClassifier(matcher, index, threshold=args.threshold, top_k=args.top_k),
+    }
+    labels = [label for _, label in LABELED_SAMPLE]
+    predictions = {name: evaluate(classifier, embeddings) for name, classifier in engines.items()}
+
+    print(f"{len(LABELED_SAMPLE)} labeled messages, {args.models} embeddings "
+          f"(threshold {args.threshold:g}, top-{args.top_k})")
+    print(f"exemplar index: {len(index.theme_ids)} exemplars x {index.nbytes // max(1, len(index.theme_ids)) // 4} dims, "
+          f"{index.nbytes / 1024:.0f} KB, built in {build_ms:.0f} ms; one message embedding: {embed_us:.0f} us")
+    print()
+    print(f"{'engine':<8} {'accuracy':>9} {'p50 us':>8} {'p99 us':>8}")
+    for name, classifier in engines.items():
+        correct = sum(_same(p, label) for p, label in zip(predictions[name], labels))
+        p50, p99 = latency(classifier, embeddings, args.rounds)
+        print(f"{name:<8} {correct / len(labels):9.1%} {p50:8.1f} {p99:8.1f}")
+
+    changed = [(text, label, regex, hybrid) for (text, label), regex, hybrid
+               in zip(LABELED_SAMPLE, predictions['regex'], predictions['hybrid']) if regex != hybrid]
+    fixed = sum(_same(hybrid, label) and not _same(regex, label) for _, label, regex, hybrid in changed)
+    broken = sum(_same(regex, label) and not _same(hybrid, label) for _, label, regex, hybrid in changed)
+    print(f"\nhybrid changed {len(changed)} answers: {fixed} fixed, {broken} broken")
+    if args.show_errors:
+        for name in engines:
+            print(f"\n{name} errors:")
+            for (text, label), predicted in zip(LABELED_SAMPLE, predictions[name]):
+                if not _same(predicted, label):
+                    print(f"  {text!r}: expected {label.value}, got {predicted.value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Compiled IntentMatcher against the linear regex scan it replaces.
+
+    python -m benchmarks.bench_intent_matcher [--rounds 2000]
+
+For every message in the corpus the set of matching intents from the
+compiled matcher is checked against a scan of every pattern first.
+"""
+import argparse
+import time
+from re import Pattern
+from typing import Callable, List, Set
+
+from app.services.intent_matcher import IntentMatcher
+from app.services.intents import MessageIntent
+from app.services.message_patterns import patterns_data
+
+CORPUS = [
+    "hi",
+    "hello there",
+    "hey, how are you?",
+    "good morning",
+    "I'm feeling really anxious about work",
+    "I've been feeling really anxious about work and I can't sleep at night",
+    "I had an anxiety attack on the bus this morning",
+    "my heart is racing and I can't calm down",
+    "I feel so sad and I can't get out of bed",
+    "I am very depressed",
+    "thank you, that actually helps",
+    "thanks for listening",
+    "bye for now, take care",
+    "I feel like giving up, I want to die",
+    "sometimes I think about how to end it all",
+    "I'm so stressed out, too much on my plate",
+    "I feel so lonely, no one understands me",
+    "I'm furious, I lost my temper with my brother",
+    "my partner and I are going through a breakup",
+    "I've been mourning my grandmother since she passed",
+    "can't sleep again, up all night",
+    "trouble falling asleep lately",
+    "I need to take care of myself more",
+    "what can you do?",
+    "I'm feeling Good",
+    "I'm feeling Not Great",
+    "I'm feeling Tired",
+    "I'm feeling Unsure",
+    "my boss keeps putting pressure on me and I'm burnt out",
+    "I don't know what to do anymore, everything feels pointless and I'm exhausted all the time",
+    "ok",
+    "🙂",
+]
+
+
+def linear_first_match(message: str) -> MessageIntent:
+    """The original strategy: stop at the first pattern that matches."""
+    for entry in patterns_data:
+        for pattern in entry.patterns:
+            if isinstance(pattern, Pattern) and pattern.search(message):
+                return entry.intent
+    return MessageIntent.GENERAL
+
+
+def linear_all_matches(message: str) -> Set[MessageIntent]:
+    found = set()
+    for entry in patterns_data:
+        if entry.intent in found:
+            continue
+        for pattern in entry.patterns:
+            if isinstance(pattern, Pattern) and pattern.search(message):
+                found.add(entry.intent)
+                break
+    return found
+
+
+def _time(fn: Callable[[str], object], messages: List[str], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - started) / (rounds * len(messages)) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    matcher = IntentMatcher(patterns_data)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    mismatches = [m for m in CORPUS if {match.intent for match in matcher.match(m)} != linear_all_matches(m)]
+    if mismatches:
+        raise SystemExit(f"compiled matcher disagrees with the linear scan on: {mismatches}")
+
+    print(f"{len(CORPUS)} messages, {args.rounds} rounds, matcher built in {build_ms:.1f} ms")
+    print(f"{'strategy':<28} {'us/message':>10}")
+    print(f"{'linear, first match':<28} {_time(linear_first_match, CORPUS, args.rounds):>10.1f}")
+    print(f"{'linear, all matches':<28} {_time(linear_all_matches, CORPUS, args.rounds):>10.1f}")
+    print(f"{'compiled, all matches':<28} {_time(matcher.match, CORPUS, args.rounds):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+Agreement of the model-free lite analysis mode with the full model path.
+
+    python -m benchmarks.bench_lite_agreement [--show-disagreements]
+
+Runs the labeled PARITY_SAMPLE and a set of theme messages through the
+lexicon sentiment scorer and static keyword vectors (ANALYSIS_MODE=lite) and
+through DistilBERT/MiniLM (ANALYSIS_MODE=full), and reports:
+  - sentiment accuracy of each against the labels, and label agreement
+  - theme agreement (identical theme sets, mean Jaccard) from the same
+    SentimentAnalyzer theme detection
+  - load time and resident memory added by each mode's models (after the
+    app package is imported), each measured in a fresh interpreter
+
+Without transformers installed only the lite side is reported.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Set
+
+from app.services.model_registry import LITE_LOADERS, ModelRegistry
+from app.services.onnx_backend import PARITY_SAMPLE
+
+THEME_SAMPLE = [
+    "I had a panic attack on the bus this morning",
+    "I can't stop worrying about my exams",
+    "my wife left me and nobody calls anymore",
+    "I'm burnt out, my manager keeps piling on deadlines",
+    "my grandmother passed away last week and I miss her",
+    "I keep having nightmares about the accident",
+    "I feel worthless and stupid compared to everyone",
+    "I yelled at my kids and now I feel terrible",
+    "I can't sleep and I have no energy during the day",
+    "I don't know what I want to do with my life",
+    "I've been so bored and can't get myself to start anything",
+    "my doctor gave me a scary diagnosis",
+    "I got promoted today, I'm so happy!",
+    "I'm embarrassed about what I said at the party",
+    "I feel like giving up, nothing matters",
+    "my boyfriend and I keep fighting",
+    "I'm fine, just checking in",
+]
+
+MEASURE_SCRIPT = r'''
+import json, time
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+from app.services.model_registry import ModelRegistry
+before = rss_mb()
+started = time.perf_counter()
+registry = ModelRegistry()
+for name in ('sentiment', 'embedding', 'theme_index'):
+    registry.get(name)
+registry.sentiment_pipeline()("warm up")
+registry.embedding_model().encode("warm up")
+print(json.dumps({'load_ms': (time.perf_counter() - started) * 1000, 'models_mb': rss_mb() - before, 'rss_mb': rss_mb()}))
+'''
+
+
+def measure(mode: str) -> Dict:
+    env = dict(os.environ, ANALYSIS_MODE=mode)
+    result = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT], capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def analyze(registry: ModelRegistry, messages: List[str]) -> List[Dict]:
+    """Sentiment and themes for each message, as the chat path computes them."""
+    from app.services.sentiment_analyzer import SentimentAnalyzer
+    from app.services.state_store import InMemoryStateStore
+
+    analyzer = SentimentAnalyzer(registry, state=InMemoryStateStore())
+    sentiment_model, embedding_model = registry.sentiment_pipeline(), registry.embedding_model()
+    results = []
+    for message in messages:
+        sentiment = sentiment_model(message)[0]
+        themes = analyzer._identify_themes(message, embedding_model.encode(message))
+        results.append({'label': sentiment['label'], 'score': sentiment['score'], 'themes': set(themes)})
+    return results
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    return 1.0 if not a and not b else len(a & b) / len(a | b)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--show-disagreements', action='store_true')
+    args = parser.parse_args()
+
+    messages = [text for text, _ in PARITY_SAMPLE] + THEME_SAMPLE
+    labels = [label for _, label in PARITY_SAMPLE]
+    lite = analyze(ModelRegistry(loaders=LITE_LOADERS), messages)
+    full: Optional[List[Dict]] = None
+    try:
+        full = analyze(ModelRegistry(), messages)
+    except ImportError as e:
+        print(f"full model path unavailable ({e}); reporting the lite mode only")
+
+    lite_accuracy = sum(r['label'] == label for r, label in zip(lite, labels)) / len(labels)
+    print(f"{len(labels)} labeled messages, {len(messages)} messages for themes")
+    print(f"sentiment accuracy: lite {lite_accuracy:.2f}", end='')
+    if full is not None:
+        full_accuracy = sum(r['label'] == label for r, label in zip(full, labels)) / len(labels)
+        agreement = sum(a['label'] == b['label'] for a, b in zip(lite, full)) / len(messages)
+        same_themes = sum(a['themes'] == b['themes'] for a, b in zip(lite, full)) / len(messages)
+        jaccard = sum(_jaccard(a['themes'], b['themes']) for a, b in zip(lite, full)) / len(messages)
+        print(f", full {full_accuracy:.2f}; label agreement {agreement:.2f}")
+        print(f"themes: identical sets {same_themes:.2f}, mean Jaccard {jaccard:.2f}")
+        if args.show_disagreements:
+            for message, a, b in zip(messages, lite, full):
+                if a['label'] != b['label'] or a['themes'] != b['themes']:
+                    print(f"  {message!r}: lite {a['label']} {sorted(a['themes'])} | full {b['label']} {sorted(b['themes'])}")
+    else:
+        print()
+        if args.show_disagreements:
+            for (message, label), result in zip(PARITY_SAMPLE, lite):
+                if result['label'] != label:
+                    print(f"  {message!r}: lite {result['label']}, labeled {label}")
+
+    print()
+    print(f"{'mode':<6} {'load ms':>9} {'models MB':>10} {'RSS MB':>8}")
+    for mode in ('lite', 'full'):
+        result = measure(mode)
+        if 'error' in result:
+            print(f"{mode:<6} error: {result['error']}")
+            continue
+        print(f"{mode:<6} {result['load_ms']:9.0f} {result['models_mb']:10.1f} {result['rss_mb']:8.0f}")
+
+
+if __name__ == '__main__':
+    main()
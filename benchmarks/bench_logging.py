@@ -0,0 +1,117 @@
+"""
+Time a request thread spends in logging calls: synchronous handlers vs. the queue.
+
+    python -m benchmarks.bench_logging [--records 50000] [--rounds 3] [--sink-delay-ms 0.5]
+
+Logs the records a chat turn emits (an INFO "Chat turn" record with its
+stage timings and DEBUG records carrying the message text) into a temporary
+file, first the way the app used to (a FileHandler on the root logger, formatting
+and writing on the calling thread) and then through configure_logging()
+(the records are queued and formatted as JSON on the writer thread, DEBUG
+sampled at LOG_DEBUG_SAMPLE_RATE). Reports the best caller-side microseconds
+per record and how long the writer took to drain the queue, once with a
+local file and once with a sink that stalls --sink-delay-ms per write (a
+busy disk or a log shipper).
+
+On a single core a fast local file costs the caller about the same either
+way, since the writer thread competes for the GIL; what the queue buys is
+that a slow sink no longer stalls requests.
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from app.utils import logger as app_logger
+from app.utils.config import Config
+
+STAGE_MS = {'turn': 4.2, 'analysis': 1.9, 'intent': 0.04, 'response': 0.31, 'state_read': 0.02}
+
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, path: str, delay_s: float):
+        super().__init__(path)
+        self.delay_s = delay_s
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self.delay_s:
+            time.sleep(self.delay_s)
+        super().emit(record)
+
+
+def emit(log: logging.Logger, records: int) -> float:
+    started = time.perf_counter()
+    for i in range(records):
+        if i % 3 == 0:
+            log.info("Chat turn", extra={'session_id': f"s{i % 200}", 'language': 'en', 'stage_ms': STAGE_MS})
+        else:
+            log.debug("Updated session %s", f"s{i % 200}", extra={'user_text': "I can't sleep at night"})
+    return (time.perf_counter() - started) / records * 1e6
+
+
+def reset_root() -> logging.Logger:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    return root
+
+
+def run(path: str, records: int, rounds: int, delay_s: float) -> None:
+    log = logging.getLogger('bench.logging')
+    sync_best = float('inf')
+    for _ in range(rounds):
+        root = reset_root()
+        root.setLevel(logging.DEBUG)
+        handler = SlowFileHandler(path, delay_s)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        root.addHandler(handler)
+        sync_best = min(sync_best, emit(log, records))
+    reset_root()
+
+    queue_handler = app_logger.configure_logging(level='DEBUG', path='', fmt='json')
+    # Swap the writer's stderr handler for the file, so the terminal is not what is timed
+    app_logger.stop_logging()
+    handler = SlowFileHandler(path, delay_s)
+    handler.setFormatter(app_logger.JsonFormatter())
+    app_logger._handlers[:] = [handler]
+    app_logger.after_fork()
+    queued_best, drain = float('inf'), 0.0
+    for _ in range(rounds):
+        queued_best = min(queued_best, emit(log, records))
+        started = time.perf_counter()
+        while not queue_handler.queue.empty():
+            time.sleep(0.001)
+        drain = max(drain, time.perf_counter() - started)
+    app_logger.stop_logging()
+    reset_root()
+    app_logger._queue_handler = None
+
+    print(f"{'sync FileHandler':<24} {sync_best:10.2f}")
+    print(f"{'queued JSON':<24} {queued_best:10.2f}   ({(queued_best / sync_best - 1) * 100:+.1f}%, "
+          f"writer drained {drain * 1000:.0f} ms after the last record)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--sink-delay-ms', type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"1 in 3 records INFO, DEBUG sampled at {Config.LOG_DEBUG_SAMPLE_RATE:g} when queued")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.log')
+        print(f"\nlocal file, {args.records} records x {args.rounds} rounds")
+        print(f"{'handler':<24} {'us/record':>10}")
+        run(path, args.records, args.rounds, 0.0)
+        slow_records = max(1, min(args.records, int(2000 / max(args.sink_delay_ms, 0.001))))
+        print(f"\nsink stalling {args.sink_delay_ms:g} ms per write, {slow_records} records x {args.rounds} rounds")
+        print(f"{'handler':<24} {'us/record':>10}")
+        run(path, slow_records, args.rounds, args.sink_delay_ms / 1000)
+    print(f"\n{app_logger.dropped_records()} records dropped")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Overhead of the per-stage metrics on chat turns, and where a turn's time goes.
+
+    python -m benchmarks.bench_metrics [--turns 5000] [--rounds 5]
+
+Replays the same turns (a quarter of them in Swahili, through the stub
+translation backend) through a ConversationHandler on the lite models, each
+time against a fresh state store, in alternating rounds with METRICS_ENABLED
+off and on. Reports the best microseconds per turn of each and the cost of
+one stage timer on its own, then the per-stage breakdown the /metrics
+histograms recorded.
+"""
+import argparse
+import logging
+import random
+import time
+
+from app.services.conversation_handler import ConversationHandler
+from app.services.metrics import Metrics, get_metrics
+from app.services.model_registry import LITE_LOADERS, ModelRegistry
+from app.services.onnx_backend import PARITY_SAMPLE
+from app.services.state_store import InMemoryStateStore
+from app.services.translation import StubTranslationBackend, TranslationService
+from benchmarks.bench_lite_agreement import THEME_SAMPLE
+
+
+def run_turns(registry: ModelRegistry, turns) -> float:
+    # A fresh state store each time, so sessions' histories do not grow from one run to the next
+    handler = ConversationHandler(registry, InMemoryStateStore(max_keys=10 ** 6))
+    started = time.perf_counter()
+    for message, session_id, language in turns:
+        handler.generate_response(message, session_id, f"user_{session_id}", language)
+    return (time.perf_counter() - started) / len(turns) * 1e6
+
+
+def timer_cost(samples: int = 200000) -> float:
+    metrics = Metrics()
+    started = time.perf_counter()
+    for _ in range(samples):
+        with metrics.time('stage'):
+            pass
+    return (time.perf_counter() - started) / samples * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    loaders = dict(LITE_LOADERS)
+    loaders['inference_scheduler'] = lambda registry: None
+    loaders['translation_service'] = lambda registry: TranslationService(StubTranslationBackend())
+    registry = ModelRegistry(loaders=loaders)
+    rng = random.Random(0)
+    messages = [text for text, _ in PARITY_SAMPLE] + THEME_SAMPLE
+    turns = [(rng.choice(messages), f"s{rng.randrange(200)}", 'sw' if rng.random() < 0.25 else 'en')
+             for _ in range(args.turns)]
+    metrics = get_metrics()
+    run_turns(registry, turns[:500])
+    metrics.reset()
+
+    best = {False: float('inf'), True: float('inf')}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            metrics.enabled = enabled
+            best[enabled] = min(best[enabled], run_turns(registry, turns))
+
+    print(f"{args.turns} turns x {args.rounds} rounds (lite models, stub translation)")
+    print(f"{'metrics':<8} {'us/turn':>9}")
+    print(f"{'off':<8} {best[False]:9.1f}")
+    print(f"{'on':<8} {best[True]:9.1f}   ({(best[True] / best[False] - 1) * 100:+.1f}%)")
+    print(f"one stage timer: {timer_cost():.2f} us")
+    print()
+    print(f"{'stage':<18} {'count':>8} {'avg ms':>8}")
+    for stage, stats in metrics.stage_stats().items():
+        print(f"{stage:<18} {stats['count']:8d} {stats['avg_ms']:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+"""
+End-to-end latency and allocations of chat turns over scripted conversations.
+
+    python -m benchmarks.bench_pipeline [--models stub|lite|full] [--path handler|http|both] [--repeat 100] [--rounds 5]
+    python -m benchmarks.bench_pipeline --save-baseline
+    python -m benchmarks.bench_pipeline --tolerance 0.25
+
+Plays multi-turn scripts (greeting, anxiety, crisis, non-English and the UI's
+mood-check buttons) as fresh sessions, --repeat times each, through a
+ConversationHandler directly and through POST /api/chat on app.test_client,
+and reports p50/p95/p99 milliseconds per turn for every script (from the
+best of --rounds passes). A second pass
+under tracemalloc reports the peak KB allocated during a turn and the bytes it
+left allocated.
+
+--models stub swaps DistilBERT and MiniLM for deterministic stubs that cost
+next to nothing (a checksum picks the label and the vector), so the numbers
+are the pure Python overhead of the pipeline; lite uses ANALYSIS_MODE=lite
+and full the real models. Translation always goes through the stub backend,
+the analysis cache is off so every turn runs the models, and log records
+below WARNING are dropped.
+
+Results are compared with benchmarks/baselines/pipeline_<models>.json when it
+exists: a p50 or peak allocation of any script, or the p95 over all turns,
+more than --tolerance above the baseline is reported as a regression and the
+exit status is 1. --save-baseline writes the current results there instead.
+Every turn of the latency passes is followed by a fixed reference workload
+of the same kind (dicts, strings, a regex, a sort), timed on its own; its
+median in a round is that round's reference_ms. Latencies are compared
+relative to it, so a machine that is slower or busier while the turns run
+is slower on the reference too, rather than seen as a regression. Baselines
+still compare best on the machine that recorded them (a different one is
+reported).
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.conversation_handler import ConversationHandler
+from app.services.model_registry import LITE_LOADERS, ModelRegistry, get_registry
+from app.services.state_store import InMemoryStateStore
+from app.services.translation import StubTranslationBackend, TranslationService
+from app.utils.config import Config
+
+# (message, language) per turn
+SCRIPTS: Dict[str, List[Tuple[str, str]]] = {
+    'greeting': [
+        ("Hi there", 'en'),
+        ("How are you today?", 'en'),
+        ("I just wanted someone to talk to", 'en'),
+        ("Thanks, goodbye", 'en'),
+    ],
+    'anxiety': [
+        ("Hello", 'en'),
+        ("I've been feeling really anxious about work lately", 'en'),
+        ("My heart races before every meeting and I can't focus", 'en'),
+        ("I tried breathing exercises but they don't help much", 'en'),
+        ("I keep worrying that I'll lose my job", 'en'),
+        ("Thank you, I'll try grounding tonight", 'en'),
+    ],
+    'crisis': [
+        ("I don't know what to do anymore", 'en'),
+        ("Everything feels pointless and I can't go on", 'en'),
+        ("I want to end my life", 'en'),
+        ("I'm still here, I just feel so alone", 'en'),
+    ],
+    'non_english': [
+        ("Habari", 'sw'),
+        ("Nina wasiwasi mwingi kuhusu kazi yangu", 'sw'),
+        ("Sijalala vizuri kwa wiki nzima", 'sw'),
+        ("Je me sens très seul depuis le déménagement", 'fr'),
+        ("Webale nnyo", 'lg'),
+    ],
+    'mood_check': [
+        ("I'm feeling Good", 'en'),
+        ("I'm feeling Okay", 'en'),
+        ("I'm feeling Not", 'en'),
+        ("I'm feeling Tired", 'en'),
+        ("I'm feeling Unsure", 'en'),
+    ],
+}
+
+
+class StubSentiment:
+    """Deterministic DistilBERT stand-in: label and score come from a checksum of the text."""
+
+    def __call__(self, inputs, **kwargs) -> List[Dict[str, float]]:
+        texts = inputs if isinstance(inputs, list) else [inputs]
+        results = []
+        for text in texts:
+            digest = zlib.crc32(text.encode('utf-8'))
+            results.append({'label': 'POSITIVE' if digest % 3 == 0 else 'NEGATIVE', 'score': 0.5 + (digest % 500) / 1000})
+        return results
+
+
+class StubEmbedder:
+    """Deterministic MiniLM stand-in: one of a fixed table of unit vectors, picked by a checksum of the text."""
+
+    def __init__(self, dim: int = 384, table_size: int = 1024, seed: int = 0):
+        vectors = np.random.default_rng(seed).standard_normal((table_size, dim)).astype(np.float32)
+        self.vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def encode(self, sentences, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.vectors[self._row(sentences)].copy()
+        return self.vectors[[self._row(sentence) for sentence in sentences]]
+
+    def _row(self, text: str) -> int:
+        return zlib.crc32(text.encode('utf-8')) % len(self.vectors)
+
+
+def model_loaders(models: str) -> Dict[str, Callable]:
+    loaders: Dict[str, Callable] = {
+        'analysis_cache': lambda registry: None,
+        'inference_scheduler': lambda registry: None,
+        'translation_service': lambda registry: TranslationService(StubTranslationBackend()),
+    }
+    if models == 'stub':
+        loaders['sentiment'] = lambda registry: StubSentiment()
+        loaders['embedding'] = lambda registry: StubEmbedder()
+    elif models == 'lite':
+        loaders.update(LITE_LOADERS)
+    return loaders
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def handler_turn(registry: ModelRegistry) -> Callable[[str, str, str], None]:
+    state = InMemoryStateStore(max_keys=10 ** 6)
+    handlers: Dict[str, ConversationHandler] = {}
+
+    def turn(session_id: str, message: str, language: str) -> None:
+        # One handler per session, like the live SessionStore; built outside the timed turn
+        handlers[session_id].generate_response(message, session_id, f"user_{session_id}", language)
+
+    def start(session_id: str) -> None:
+        handlers[session_id] = ConversationHandler(registry, state)
+
+    turn.start = start
+    return turn
+
+
+def http_turn(client) -> Callable[[str, str, str], None]:
+    def turn(session_id: str, message: str, language: str) -> None:
+        response = client.post('/api/chat', json={'session_id': session_id, 'message': message, 'language': language})
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/chat returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    turn.start = lambda session_id: None
+    return turn
+
+
+REFERENCE_TEXT = ("I've been feeling really anxious about work lately and I can't sleep, my manager keeps adding "
+                  "deadlines and I feel like nobody listens to me when I say it is too much for one person")
+REFERENCE_PATTERN = re.compile(r"\b(anxious|sleep|work|deadlines?|nobody)\b")
+
+
+def reference_work() -> None:
+    """A fixed slice of the work a turn does, timed after every turn to measure the machine's speed at the time."""
+    text = REFERENCE_TEXT.lower()
+    counts: Dict[str, int] = {}
+    for word in text.split():
+        counts[word] = counts.get(word, 0) + 1
+    themes = sorted(set(REFERENCE_PATTERN.findall(text)))
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    json.dumps({'themes': themes, 'words': ranked[:10], 'length': len(text)})
+
+
+def play(turn: Callable, label: str, repeat: int, trace: bool = False,
+         reference: Optional[List[float]] = None) -> Dict[str, List[float]]:
+    """
+    Per script: seconds per turn, or (with trace) peak and retained bytes per
+    turn. Without trace, the seconds of reference_work() after each turn are
+    appended to reference when given.
+    """
+    samples: Dict[str, List] = {script: [] for script in SCRIPTS}
+    for n in range(repeat):
+        for script, messages in SCRIPTS.items():
+            session_id = f"{label}-{script}-{n}"
+            turn.start(session_id)
+            for message, language in messages:
+                if trace:
+                    tracemalloc.reset_peak()
+                    before = tracemalloc.get_traced_memory()[0]
+                    turn(session_id, message, language)
+                    current, peak = tracemalloc.get_traced_memory()
+                    samples[script].append((peak - before, current - before))
+                else:
+                    started = time.perf_counter()
+                    turn(session_id, message, language)
+                    samples[script].append(time.perf_counter() - started)
+                    if reference is not None:
+                        started = time.perf_counter()
+                        reference_work()
+                        reference.append(time.perf_counter() - started)
+    return samples
+
+
+def measure(turn: Callable, path: str, repeat: int, rounds: int, alloc_repeat: int) -> Dict[str, Dict[str, float]]:
+    play(turn, f"{path}-warmup", 1)
+    # Per script, the round with the lowest median relative to its reference, so a noisy
+    # neighbour in one round does not count; each kept with that round's reference seconds
+    latencies: Dict[str, Tuple[List[float], float]] = {}
+    for n in range(rounds):
+        reference: List[float] = []
+        played = play(turn, f"{path}-round{n}", repeat, reference=reference)
+        played['all'] = [value for script in SCRIPTS for value in played[script]]
+        reference_seconds = percentile(reference, 50)
+        for script, values in played.items():
+            if script not in latencies or (percentile(values, 50) / reference_seconds
+                                           < percentile(latencies[script][0], 50) / latencies[script][1]):
+                latencies[script] = (values, reference_seconds)
+    tracemalloc.start()
+    try:
+        allocations = play(turn, f"{path}-traced", alloc_repeat, trace=True)
+    finally:
+        tracemalloc.stop()
+    allocations['all'] = [value for script in SCRIPTS for value in allocations[script]]
+    results = {}
+    for script, (values, reference_seconds) in latencies.items():
+        peaks = [peak for peak, _ in allocations[script]]
+        retained = [kept for _, kept in allocations[script]]
+        results[f"{path}/{script}"] = {
+            'turns': len(values),
+            'p50_ms': percentile(values, 50) * 1000,
+            'p95_ms': percentile(values, 95) * 1000,
+            'p99_ms': percentile(values, 99) * 1000,
+            'peak_kb': percentile(peaks, 50) / 1024,
+            'retained_bytes': sum(retained) / len(retained),
+            'reference_ms': reference_seconds * 1000,
+        }
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict, tolerance: float) -> List[str]:
+    """Metrics over the baseline by more than tolerance; latencies are scaled by the ratio of the reference_ms."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        # A script's p95 rests on a handful of turns, so only the tail over all turns is checked
+        metrics = ('p50_ms', 'p95_ms', 'peak_kb') if key.endswith('/all') else ('p50_ms', 'peak_kb')
+        speed = current['reference_ms'] / previous['reference_ms'] if previous.get('reference_ms') else 1.0
+        for metric in metrics:
+            expected = previous[metric] * (speed if metric.endswith('_ms') else 1.0)
+            if expected > 0 and current[metric] > expected * (1 + tolerance):
+                regressions.append(f"{key} {metric}: {expected:.3f} -> {current[metric]:.3f} "
+                                   f"(+{(current[metric] / expected - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', choices=('stub', 'lite', 'full'), default='stub')
+    parser.add_argument('--path', choices=('handler', 'http', 'both'), default='both')
+    parser.add_argument('--repeat', type=int, default=100, help='sessions per script for the latency pass')
+    parser.add_argument('--rounds', type=int, default=5, help='latency passes; the best one counts')
+    parser.add_argument('--alloc-repeat', type=int, default=3, help='sessions per script for the allocation pass')
+    parser.add_argument('--baseline', help='baseline file (default benchmarks/baselines/pipeline_<models>.json)')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.4, help='allowed slowdown over the baseline (0.4 = 40%%)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    baseline_path = args.baseline or os.path.join(os.path.dirname(__file__), 'baselines', f'pipeline_{args.models}.json')
+    machine = f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPUs"
+
+    loaders = model_loaders(args.models)
+    if args.models == 'lite':
+        Config.ANALYSIS_MODE = 'lite'
+    results = {}
+    if args.path in ('handler', 'both'):
+        results.update(measure(handler_turn(ModelRegistry(loaders=loaders)), 'handler', args.repeat, args.rounds,
+                                       args.alloc_repeat))
+    if args.path in ('http', 'both'):
+        from app import create_app
+        Config.WARMUP_MODE = 'lazy'
+        registry = get_registry()
+        for name, loader in loaders.items():
+            registry.register(name, loader)
+        app = create_app()
+        with app.test_client() as client:
+            results.update(measure(http_turn(client), 'http', args.repeat, args.rounds, args.alloc_repeat))
+
+    print(f"{args.models} models, {args.repeat} sessions per script, best of {args.rounds} rounds "
+          f"({args.alloc_repeat} under tracemalloc)")
+    print(f"{'path/script':<22} {'turns':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KB':>8} {'kept B':>8} "
+          f"{'ref us':>7}")
+    for key, result in results.items():
+        print(f"{key:<22} {result['turns']:6d} {result['p50_ms']:8.3f} {result['p95_ms']:8.3f} "
+              f"{result['p99_ms']:8.3f} {result['peak_kb']:8.1f} {result['retained_bytes']:8.0f} "
+              f"{result['reference_ms'] * 1000:7.1f}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump({
+                'models': args.models,
+                'recorded': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': machine,
+                'results': results,
+            }, f, indent=2)
+            f.write('\n')
+        print(f"\nbaseline saved to {baseline_path}")
+        return
+    if not os.path.exists(baseline_path):
+        print(f"\nno baseline at {baseline_path}; record one with --save-baseline")
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if baseline['machine'] != machine:
+        print(f"\nnote: the baseline was recorded on {baseline['machine']}, this is {machine}; "
+              f"latencies are not comparable across machines")
+    print(f"\nagainst {baseline_path} (recorded {baseline['recorded']}): ", end='')
+    if not regressions:
+        print(f"no regressions over {args.tolerance:.0%}")
+        return
+    print(f"{len(regressions)} regressions over {args.tolerance:.0%}")
+    for regression in regressions:
+        print(f"  {regression}")
+    sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
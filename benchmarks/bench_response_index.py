@@ -0,0 +1,127 @@
+"""
+Candidate selection with the ResponseIndex against the list scan it replaces.
+
+    python -m benchmarks.bench_response_index [--turns 20000] [--per-theme 12] [--bank mental_health_responses.json]
+
+Builds a response bank (the JSON file if it exists, otherwise a synthetic one
+with --per-theme responses for every intent and theme) and replays random
+turns: an intent, one to three themes, a stage, a preferred technique and a
+set of responses the user already had. For each turn the candidate set of the
+original scan (_filter_by_stage over the theme lists, then dropping used
+responses by their json.dumps form) is checked against the index, and the
+per-turn cost of both is reported.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List, Set, Union
+
+from app.services.intents import MessageIntent
+from app.services.patterns import get_patterns
+from app.services.response_index import STAGES, ResponseIndex
+
+THEMES = ['anxiety', 'depression', 'stress', 'loneliness', 'anger', 'grief', 'sleep', 'work', 'relationships',
+          'self_esteem', 'trauma', 'fear']
+TECHNIQUES = ['breathing', 'grounding', 'journaling', 'walking', 'meditation']
+
+
+def synthetic_bank(per_theme: int, seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+    bank = {}
+    for intent in MessageIntent:
+        bank[intent.value.lower()] = themes = {}
+        for theme in THEMES:
+            responses = []
+            for n in range(per_theme):
+                kind = n % 4
+                if kind == 0:
+                    responses.append(f"I'm sorry you're dealing with {theme} ({n}).")
+                elif kind == 1:
+                    responses.append({'message': f"That sounds hard. Validation matters: {theme} {n}.",
+                                      'followup': "What's been on your mind?"})
+                else:
+                    responses.append({'message': f"Let's work on {theme} together ({n}).",
+                                      'techniques': rng.sample(TECHNIQUES, 2)})
+            themes[theme] = responses
+    return bank
+
+
+def scan_candidates(bank: Dict, intent_key: str, themes: List[str], stage: str, preferred: str,
+                    used: Set[str]) -> List[Union[str, Dict]]:
+    """The original strategy: gather the theme lists, filter by stage, drop used by serialized form."""
+    responses = []
+    for theme in themes:
+        if theme in bank.get(intent_key, {}):
+            responses.extend(bank[intent_key][theme])
+    if stage == 'validation':
+        stage_responses = [r for r in responses if 'validation' in str(r).lower() or 'sorry' in str(r).lower()]
+    elif stage == 'exploration':
+        stage_responses = [r for r in responses if isinstance(r, dict) and 'followup' in r]
+    else:
+        stage_responses = [r for r in responses if isinstance(r, dict) and 'techniques' in r and r['techniques']
+                           and any(preferred in t.lower() for t in r['techniques'])] \
+            or [r for r in responses if isinstance(r, dict) and 'techniques' in r]
+    return [r for r in stage_responses if json.dumps(r, sort_keys=True) not in used] or stage_responses
+
+
+def index_candidates(index: ResponseIndex, intent_key: str, themes: List[str], stage: str, preferred: str,
+                     used: int) -> int:
+    candidates = index.filter_by_stage(index.bank_candidates(intent_key, themes), stage, preferred)
+    return (candidates & ~used) or candidates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=20000)
+    parser.add_argument('--per-theme', type=int, default=12, help='responses per intent and theme (synthetic bank)')
+    parser.add_argument('--bank', default='mental_health_responses.json')
+    args = parser.parse_args()
+
+    if os.path.exists(args.bank):
+        with open(args.bank) as f:
+            bank = json.load(f)
+    else:
+        bank = synthetic_bank(args.per_theme)
+    started = time.perf_counter()
+    index = ResponseIndex(bank, get_patterns())
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    intent_keys = list(bank)
+    themes = sorted({theme for entry in bank.values() if isinstance(entry, dict) for theme in entry})
+    turns = []
+    for _ in range(args.turns):
+        intent_key = rng.choice(intent_keys)
+        used_ids = rng.sample(range(len(index)), min(len(index), rng.randrange(0, 8)))
+        turns.append((intent_key, rng.sample(themes, min(len(themes), rng.randint(1, 3))), rng.choice(STAGES),
+                      rng.choice(TECHNIQUES), used_ids))
+    scan_turns = [(k, t, s, p, {json.dumps(index.responses[i], sort_keys=True) for i in used})
+                  for k, t, s, p, used in turns]
+    index_turns = [(k, t, s, p, sum(1 << i for i in used)) for k, t, s, p, used in turns]
+
+    mismatches = 0
+    for scan_turn, index_turn in zip(scan_turns, index_turns):
+        expected = {index.id_of(r) for r in scan_candidates(bank, *scan_turn)}
+        if expected != set(index.ids(index_candidates(index, *index_turn))):
+            mismatches += 1
+
+    started = time.perf_counter()
+    for turn in scan_turns:
+        random.choice(scan_candidates(bank, *turn) or [None])
+    scan_us = (time.perf_counter() - started) / len(turns) * 1e6
+    started = time.perf_counter()
+    for turn in index_turns:
+        random.choice(index.ids(index_candidates(index, *turn)) or [None])
+    index_us = (time.perf_counter() - started) / len(turns) * 1e6
+
+    print(f"{len(index)} distinct responses, {len(index.bank)} (intent, theme) lists; index built in {build_ms:.1f} ms")
+    print(f"candidate set parity: {len(turns) - mismatches}/{len(turns)} turns identical")
+    print(f"{'strategy':<12} {'us/turn':>9}")
+    print(f"{'list scan':<12} {scan_us:9.2f}")
+    print(f"{'index':<12} {index_us:9.2f}   ({scan_us / index_us:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
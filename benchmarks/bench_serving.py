@@ -0,0 +1,198 @@
+"""
+Sustained throughput and tail latency of POST /api/chat: sync Flask vs. the ASGI app.
+
+    python -m benchmarks.bench_serving [--concurrency 8,32,128] [--duration 10] [--threads 8]
+                                       [--translation-ms 150] [--foreign 0.5] [--lite]
+
+Starts each server in its own process on a free port:
+  sync   Flask under gunicorn (gthread, 1 worker, --threads threads), or
+         Werkzeug's threaded server when gunicorn is not installed
+  async  asgi:app under uvicorn (1 worker) with ASYNC_INFERENCE_WORKERS=--threads
+         and ASYNC_MAX_PENDING=--max-pending
+and drives it with a closed loop of keep-alive connections at each
+concurrency level for --duration seconds. Translation goes to a stub backend
+that sleeps --translation-ms per call, standing in for googletrans round
+trips; a --foreign share of requests are in Swahili with a unique message
+each, so every one of them misses the translation cache. --lite uses the
+model-free ANALYSIS_MODE=lite models.
+
+Reports completed requests/sec (200s only), 503 and error counts, and
+p50/p95/p99 latency of the 200s.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, Tuple
+
+SERVER_SCRIPT = r'''
+import sys, time
+from app.services.model_registry import get_registry
+from app.services.translation import StubTranslationBackend, TranslationService
+
+class SlowTranslationBackend(StubTranslationBackend):
+    def translate_batch(self, texts, dest, src='auto'):
+        time.sleep({translation_ms} / 1000.0)
+        return super().translate_batch(texts, dest, src)
+
+get_registry().register('translation_service', lambda registry: TranslationService(SlowTranslationBackend(), max_workers=64))
+mode, port, threads = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+if mode == 'async':
+    import uvicorn
+    from app.asgi import create_asgi_app
+    uvicorn.run(create_asgi_app(), host='127.0.0.1', port=port, log_level='warning', lifespan='on')
+else:
+    from app import create_app
+    flask_app = create_app()
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        from werkzeug.serving import make_server
+        make_server('127.0.0.1', port, flask_app, threaded=True).serve_forever()
+    else:
+        class Server(BaseApplication):
+            def load_config(self):
+                for key, value in {{'bind': f'127.0.0.1:{{port}}', 'workers': 1, 'worker_class': 'gthread',
+                                   'threads': threads, 'loglevel': 'warning', 'keepalive': 30}}.items():
+                    self.cfg.set(key, value)
+            def load(self):
+                return flask_app
+        Server().run()
+'''
+
+MESSAGES = [
+    "I feel anxious about work",
+    "I can't sleep at night",
+    "my boyfriend and I keep fighting",
+    "thanks, that really helps",
+    "I feel so alone lately",
+    "I'm stressed about my exams",
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, args) -> Tuple[subprocess.Popen, int]:
+    port = _free_port()
+    env = dict(os.environ, WARMUP_MODE='eager', ASYNC_INFERENCE_WORKERS=str(args.threads),
+               ASYNC_MAX_PENDING=str(args.max_pending), ANALYSIS_CACHE_SIZE='0')
+    if args.lite:
+        env['ANALYSIS_MODE'] = 'lite'
+    script = SERVER_SCRIPT.format(translation_ms=args.translation_ms)
+    # The server logs every turn: to a file rather than a pipe nobody drains, which would block it
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen([sys.executable, '-c', script, mode, str(port), str(args.threads)],
+                               env=env, stdout=subprocess.DEVNULL, stderr=log)
+    deadline = time.time() + args.startup_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            log.seek(0)
+            raise RuntimeError(log.read().decode().strip().splitlines()[-1])
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=1) as response:
+                if response.status == 200:
+                    return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('server did not become ready')
+
+
+async def _post(reader, writer, body: bytes) -> int:
+    writer.write(b'POST /api/chat HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+                 b'Content-Length: %d\r\n\r\n%s' % (len(body), body))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(port: int, client_id: int, foreign: float, stop_at: float, results: Dict) -> None:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    n = 0
+    try:
+        while time.perf_counter() < stop_at:
+            n += 1
+            payload = {'session_id': f'bench-{client_id}', 'message': MESSAGES[n % len(MESSAGES)], 'language': 'en'}
+            if (n * 7919 + client_id) % 1000 < foreign * 1000:
+                payload.update(message=f"{payload['message']} ({client_id}-{n})", language='sw')
+            started = time.perf_counter()
+            try:
+                status = await _post(reader, writer, json.dumps(payload).encode())
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                results['errors'] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                continue
+            if status == 200:
+                results['latencies'].append(time.perf_counter() - started)
+            elif status == 503:
+                results['rejected'] += 1
+            else:
+                results['errors'] += 1
+    finally:
+        writer.close()
+
+
+async def load(port: int, concurrency: int, duration: float, foreign: float) -> Dict:
+    results = {'latencies': [], 'rejected': 0, 'errors': 0}
+    started = time.perf_counter()
+    stop_at = started + duration
+    await asyncio.gather(*(_client(port, i, foreign, stop_at, results) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(results['latencies'])
+    pick = lambda pct: latencies[min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))] * 1000 if latencies else 0.0
+    return {'rps': len(latencies) / elapsed, 'rejected': results['rejected'], 'errors': results['errors'],
+            'p50_ms': pick(50), 'p95_ms': pick(95), 'p99_ms': pick(99)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='8,32,128', help='concurrent connections per run')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per concurrency level')
+    parser.add_argument('--threads', type=int, default=8, help='sync server threads / async inference workers')
+    parser.add_argument('--max-pending', type=int, default=64, help='ASYNC_MAX_PENDING for the async server')
+    parser.add_argument('--translation-ms', type=float, default=150.0, help='stub translation latency per call')
+    parser.add_argument('--foreign', type=float, default=0.5, help='share of requests needing translation')
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--lite', action='store_true', help='lexicon sentiment and static vectors instead of the models')
+    parser.add_argument('--startup-timeout', type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'conc':>5} {'ok rps':>8} {'503s':>6} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in args.modes.split(','):
+        try:
+            process, port = start_server(mode, args)
+        except (RuntimeError, IndexError) as e:
+            print(f"{mode:<6} error: {e}")
+            continue
+        try:
+            for concurrency in (int(level) for level in args.concurrency.split(',')):
+                result = asyncio.run(load(port, concurrency, args.duration, args.foreign))
+                print(f"{mode:<6} {concurrency:5d} {result['rps']:8.1f} {result['rejected']:6d} {result['errors']:6d} "
+                      f"{result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['p99_ms']:8.1f}")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
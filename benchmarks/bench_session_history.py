@@ -0,0 +1,103 @@
+"""
+Memory and state-store cost of a session's history: list of dicts vs. the ring.
+
+    python -m benchmarks.bench_session_history [--turns 10 100 1000] [--sessions 200]
+
+For sessions of each length builds them the way the app used to (a dict and
+an ISO string per turn, a context with sets and a datetime per session) and
+with the current Session (columns in a ring of SESSION_HISTORY_SIZE turns,
+integer times, context built on demand). Reports the bytes allocated per
+session (tracemalloc), the pickled size, which is what the state store writes
+back after every turn, and the microseconds to pickle and unpickle one.
+"""
+import argparse
+import pickle
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from app.models.session_model import Session
+from app.utils.config import Config
+
+USER_MESSAGE = "I've been feeling really anxious about work and I can't sleep at night"
+BOT_MESSAGE = "I'm sorry work has been weighing on you. Would you like to try a breathing exercise together?"
+
+
+class ListSession:
+    """The previous Session: an unbounded list with a dict per turn."""
+
+    def __init__(self, session_id: str, user_id: str):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.context = {
+            'user_name': None,
+            'user_id': user_id,
+            'mood_history': [],
+            'risk_level': 'low',
+            'topics_discussed': set(),
+            'coping_strategies_suggested': set(),
+            'last_interaction': datetime.now(),
+            'session_duration': 0
+        }
+        self.conversation_history: List[Dict] = []
+
+    def update_conversation_history(self, user_message: str, bot_message: str) -> None:
+        self.conversation_history.append({
+            'user': user_message,
+            'bot': bot_message,
+            'timestamp': datetime.now().isoformat()
+        })
+
+
+def build(factory: Callable[[str, str], object], sessions: int, turns: int,
+          messages: List[Tuple[str, str]]) -> Tuple[List[object], float]:
+    """
+    Sessions with `turns` turns each, and the bytes allocated per session. The
+    messages come from the requests, so they are made beforehand and only what
+    the history adds is counted.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = []
+    for n in range(sessions):
+        session = factory(f"s{n}", f"u{n}")
+        for user_message, bot_message in messages[:turns]:
+            session.update_conversation_history(user_message, bot_message)
+        built.append(session)
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+    return built, per_session
+
+
+def pickle_cost(session: object, rounds: int = 200) -> Tuple[int, float, float]:
+    payload = pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL)
+    dump_us = (time.perf_counter() - started) / rounds * 1e6
+    started = time.perf_counter()
+    for _ in range(rounds):
+        pickle.loads(payload)
+    load_us = (time.perf_counter() - started) / rounds * 1e6
+    return len(payload), dump_us, load_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--sessions', type=int, default=200)
+    args = parser.parse_args()
+
+    messages = [(f"{USER_MESSAGE} ({n})", f"{BOT_MESSAGE} ({n})") for n in range(max(args.turns))]
+    print(f"{args.sessions} sessions per row, SESSION_HISTORY_SIZE={Config.SESSION_HISTORY_SIZE}")
+    print(f"{'turns':>6} {'history':<8} {'KB/session':>11} {'pickle KB':>10} {'dump us':>9} {'load us':>9}")
+    for turns in args.turns:
+        for name, factory in (('list', ListSession), ('ring', Session)):
+            sessions, per_session = build(factory, args.sessions, turns, messages)
+            size, dump_us, load_us = pickle_cost(sessions[0])
+            print(f"{turns:6d} {name:<8} {per_session / 1024:11.1f} {size / 1024:10.1f} {dump_us:9.1f} {load_us:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Cold start: import time by module, time to first response and time to ready.
+
+    python -m benchmarks.bench_startup [--top 15] [--modes background,lazy,eager]
+
+Each measurement runs in a fresh interpreter. The import breakdown comes from
+`python -X importtime -c "import app"`; the serving numbers create the app
+with the given WARMUP_MODE, request '/', then poll '/ready'.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+SERVE_SCRIPT = r'''
+import json, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+client = app.test_client()
+status = client.get('/').status_code
+first = time.perf_counter()
+ready = None
+while time.perf_counter() - started < {timeout}:
+    response = client.get('/ready')
+    if response.status_code == 200:
+        ready = time.perf_counter()
+        break
+    if response.get_json().get('state') == 'failed':
+        break
+    time.sleep(0.05)
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'first_response_ms': (first - started) * 1000,
+    'home_status': status,
+    'ready_ms': (ready - started) * 1000 if ready else None,
+    'warmup': client.get('/ready').get_json(),
+}}))
+'''
+
+
+def import_times() -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for every module imported by 'import app'."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'],
+                            capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def by_package(rows: List[Tuple[str, int, int]]) -> Dict[str, int]:
+    """Self time summed per top-level package (app modules are kept separate)."""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, own, _ in rows:
+        package = name if name.startswith('app.') or name == 'app' else name.split('.')[0]
+        totals[package] += own
+    return totals
+
+
+def serve(mode: str, timeout: float) -> Dict:
+    env = dict(os.environ, WARMUP_MODE=mode)
+    result = subprocess.run([sys.executable, '-c', SERVE_SCRIPT.format(timeout=timeout)],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--top', type=int, default=15, help='how many packages to list')
+    parser.add_argument('--modes', default='background,lazy', help='WARMUP_MODE values to time')
+    parser.add_argument('--timeout', type=float, default=300.0, help='seconds to wait for /ready')
+    args = parser.parse_args()
+
+    rows = import_times()
+    total = next((cumulative for name, _, cumulative in rows if name == 'app'), 0)
+    print(f"import app: {total / 1000:.1f} ms")
+    print(f"{'package':<40} {'self ms':>9}")
+    for package, own in sorted(by_package(rows).items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{package:<40} {own / 1000:9.1f}")
+
+    print()
+    print(f"{'mode':<12} {'import ms':>10} {'first / ms':>11} {'ready ms':>10}  warm-up")
+    for mode in args.modes.split(','):
+        result = serve(mode, args.timeout)
+        if 'error' in result:
+            print(f"{mode:<12} error: {result['error']}")
+            continue
+        ready = f"{result['ready_ms']:.0f}" if result['ready_ms'] is not None else '-'
+        warmup = result['warmup']
+        detail = warmup['state'] + (f" ({warmup['error']})" if warmup.get('error') else '')
+        print(f"{mode:<12} {result['import_ms']:10.0f} {result['first_response_ms']:11.0f} {ready:>10}  {detail}")
+        if warmup.get('timings_ms'):
+            print('             ' + ', '.join(f"{name} {ms:.0f}" for name, ms in warmup['timings_ms'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Theme similarity: the per-theme cosine loop against ThemeEmbeddingIndex.
+
+    python -m benchmarks.bench_theme_index
+    python -m benchmarks.bench_theme_index --synthetic [--dim 384] [--rounds 2000]
+
+By default the keyword embeddings and messages are encoded with MiniLM through
+the model registry. --synthetic uses random vectors of the same shape instead,
+which needs no model download. For each storage dtype the matched themes are
+checked against the loop and the memory held by the matrix is reported.
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.services.sentiment_analyzer import THEME_KEYWORDS
+from app.services.theme_index import SUPPORTED_DTYPES, ThemeEmbeddingIndex
+
+MESSAGES = [
+    "I'm feeling really anxious about work",
+    "I can't sleep at night",
+    "I feel so lonely since my friend moved away",
+    "My boss keeps putting pressure on me and I'm burnt out",
+    "I've been mourning my grandmother since she passed",
+    "I don't know what to do anymore, everything feels pointless",
+]
+
+
+def loop_match(theme_embeddings: Dict[str, np.ndarray], embedding: np.ndarray, threshold: float = 0.6) -> List[str]:
+    """The original strategy: one cosine similarity call per theme."""
+    vector = embedding / np.linalg.norm(embedding)
+    themes = []
+    for theme, keywords in theme_embeddings.items():
+        keywords = keywords / np.linalg.norm(keywords, axis=1, keepdims=True)
+        if (keywords @ vector).max() > threshold:
+            themes.append(theme)
+    return themes
+
+
+def _time(fn: Callable[[np.ndarray], List[str]], embeddings: List[np.ndarray], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for embedding in embeddings:
+            fn(embedding)
+    return (time.perf_counter() - started) / (rounds * len(embeddings)) * 1e6
+
+
+def _synthetic(dim: int):
+    rng = np.random.default_rng(0)
+    theme_embeddings = {theme: rng.standard_normal((len(keywords), dim)).astype(np.float32)
+                        for theme, keywords in THEME_KEYWORDS.items()}
+    # Messages close to one keyword each, so some themes clear the threshold
+    anchors = np.vstack(list(theme_embeddings.values()))
+    picks = rng.choice(len(anchors), size=len(MESSAGES), replace=False)
+    embeddings = [anchors[i] + 0.5 * rng.standard_normal(dim).astype(np.float32) for i in picks]
+    return theme_embeddings, embeddings
+
+
+def _encoded():
+    from app.services.model_registry import get_registry
+    model = get_registry().embedding_model()
+    theme_embeddings = {theme: np.asarray(model.encode(keywords)) for theme, keywords in THEME_KEYWORDS.items()}
+    embeddings = list(np.asarray(model.encode(MESSAGES)))
+    return theme_embeddings, embeddings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', action='store_true', help='random vectors instead of MiniLM')
+    parser.add_argument('--dim', type=int, default=384)
+    parser.add_argument('--rounds', type=int, default=2000)
+    args = parser.parse_args()
+
+    theme_embeddings, embeddings = _synthetic(args.dim) if args.synthetic else _encoded()
+    keywords = sum(len(rows) for rows in theme_embeddings.values())
+    print(f"{len(theme_embeddings)} themes, {keywords} keywords, dim {embeddings[0].shape[-1]}")
+
+    expected = [loop_match(theme_embeddings, embedding) for embedding in embeddings]
+    loop_us = _time(lambda embedding: loop_match(theme_embeddings, embedding), embeddings, args.rounds)
+    loop_bytes = sum(rows.astype(np.float32).nbytes for rows in theme_embeddings.values())
+    print(f"{'per-theme loop':<16} {loop_us:8.1f} µs/message  {loop_bytes / 1024:8.1f} KiB")
+
+    for dtype in SUPPORTED_DTYPES:
+        index = ThemeEmbeddingIndex(theme_embeddings, dtype=dtype)
+        mismatches = sum(sorted(index.match(embedding)) != sorted(themes)
+                         for embedding, themes in zip(embeddings, expected))
+        us = _time(index.match, embeddings, args.rounds)
+        print(f"{'index ' + dtype:<16} {us:8.1f} µs/message  {index.nbytes / 1024:8.1f} KiB"
+              f"  {loop_us / us:5.1f}x  mismatches: {mismatches}/{len(embeddings)}")
+
+
+if __name__ == '__main__':
+    main()
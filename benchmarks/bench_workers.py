@@ -0,0 +1,90 @@
+"""
+Memory of a multi-worker gunicorn server with and without preloaded, shared models.
+
+    python -m benchmarks.bench_workers [--workers 4] [--requests 200] [--lite]
+
+Starts gunicorn -c gunicorn.conf.py run:app twice, with PRELOAD_MODELS=False
+(each worker loads its own models) and PRELOAD_MODELS=True (the master loads
+them and the workers share them copy-on-write), sends --requests chat
+requests spread over the workers, and reports RSS, unique memory and PSS of
+the master and every worker. Total PSS is the server's real footprint; the
+unique MB of one worker is what each additional worker costs.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+from app.utils.memory import format_report, server_memory
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure(preload: bool, args) -> List[Dict[str, float]]:
+    port = _free_port()
+    # Several workers need a shared state store; only /ready is requested, so no state is ever read or written
+    env = dict(os.environ, PRELOAD_MODELS=str(preload), WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_BIND=f'127.0.0.1:{port}', TRANSLATION_BACKEND='stub', STATE_BACKEND='redis')
+    env.pop('WARMUP_MODE', None)
+    if args.lite:
+        env['ANALYSIS_MODE'] = 'lite'
+    log = tempfile.TemporaryFile()
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'run:app'],
+                               env=env, stdout=log, stderr=log)
+    try:
+        deadline = time.time() + args.startup_timeout
+        while True:
+            if process.poll() is not None or time.time() > deadline:
+                log.seek(0)
+                raise RuntimeError(log.read().decode().strip().splitlines()[-1])
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/ready', timeout=5) as response:
+                    if response.status == 200:
+                        break
+            except OSError:
+                time.sleep(0.5)
+        for n in range(args.requests):
+            body = json.dumps({'session_id': f'bench-{n % 50}', 'message': "I feel anxious about work",
+                               'language': 'sw' if n % 4 == 0 else 'en'}).encode()
+            request = urllib.request.Request(f'http://127.0.0.1:{port}/api/chat', data=body,
+                                             headers={'Content-Type': 'application/json'})
+            urllib.request.urlopen(request, timeout=60).read()
+        return server_memory(process.pid)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200, help='chat requests sent before measuring')
+    parser.add_argument('--lite', action='store_true', help='lexicon sentiment and static vectors instead of the models')
+    parser.add_argument('--startup-timeout', type=float, default=300.0)
+    args = parser.parse_args()
+
+    totals = {}
+    for preload in (False, True):
+        print(f"PRELOAD_MODELS={preload}, {args.workers} workers")
+        usages = measure(preload, args)
+        print(format_report(usages))
+        print()
+        workers = usages[1:]
+        totals[preload] = (sum(u['pss_mb'] for u in usages), max(u['uss_mb'] for u in workers) if workers else 0.0)
+    (plain_pss, plain_uss), (shared_pss, shared_uss) = totals[False], totals[True]
+    print(f"total PSS {plain_pss:.0f} -> {shared_pss:.0f} MB; "
+          f"unique MB per worker {plain_uss:.0f} -> {shared_uss:.0f}")
+
+
+if __name__ == '__main__':
+    main()
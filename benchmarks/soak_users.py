@@ -0,0 +1,98 @@
+"""
+Memory of per-user conversation state over a long stream of distinct users.
+
+    python -m benchmarks.soak_users [--users 1000000] [--turns-per-user 3] [--arrival 1.0] [--ttl 3600]
+
+Runs a ConversationHandler (lite models, stub translation, analysis cache off)
+against an InMemoryStateStore on a virtual clock: a new user arrives every
+--arrival virtual seconds, chats --turns-per-user turns and never comes back.
+Every tenth of the run it reports the live state keys, the users they belong
+to, the process RSS and the stored bytes of the live state (user and session
+keys) per live user. With a TTL the live users settle at about ttl / arrival
+and RSS stays flat; --ttl 0 keeps every user and shows the growth expiry
+prevents. The last line compares one user's recent-responses ring with the
+set of JSON strings it replaced.
+"""
+import argparse
+import json
+import logging
+import pickle
+import random
+import time
+
+from app.services.conversation_handler import ConversationHandler
+from app.services.model_registry import LITE_LOADERS, ModelRegistry
+from app.services.onnx_backend import PARITY_SAMPLE
+from app.services.recent_responses import RecentResponses
+from app.services.state_store import InMemoryStateStore
+from app.services.translation import StubTranslationBackend, TranslationService
+from app.utils.memory import process_memory
+from app.utils.config import Config
+from benchmarks.bench_lite_agreement import THEME_SAMPLE
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def state_bytes(store: InMemoryStateStore) -> int:
+    with store._lock:
+        return sum(len(key) + len(payload) for key, (_, payload) in store._data.items())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--turns-per-user', type=int, default=3)
+    parser.add_argument('--arrival', type=float, default=1.0, help='virtual seconds between new users')
+    parser.add_argument('--ttl', type=float, default=3600.0, help='state TTL in virtual seconds (0 = never expire)')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    loaders = dict(LITE_LOADERS)
+    loaders['analysis_cache'] = lambda registry: None
+    loaders['inference_scheduler'] = lambda registry: None
+    loaders['translation_service'] = lambda registry: TranslationService(StubTranslationBackend())
+    clock = VirtualClock()
+    store = InMemoryStateStore(ttl_seconds=args.ttl or None, max_keys=10 ** 9, clock=clock)
+    registry = ModelRegistry(loaders=loaders)
+    handler = ConversationHandler(registry, store)
+    rng = random.Random(0)
+    messages = [text for text, _ in PARITY_SAMPLE] + THEME_SAMPLE
+
+    print(f"{args.users} users x {args.turns_per_user} turns, one every {args.arrival:g}s, "
+          f"TTL {args.ttl:g}s (virtual)")
+    print(f"{'users':>9} {'live keys':>10} {'live users':>11} {'RSS MB':>8} {'state KB':>9} "
+          f"{'B/user':>7} {'expired':>9} {'turns/s':>8}")
+    checkpoint = max(1, args.users // 10)
+    started = time.perf_counter()
+    for n in range(1, args.users + 1):
+        for _ in range(args.turns_per_user):
+            handler.generate_response(rng.choice(messages), f"session-{n}", f"user-{n}", 'en')
+        clock.now += args.arrival
+        if n % checkpoint == 0 or n == args.users:
+            stats = store.stats()
+            live_users = len({key.rsplit(':', 1)[-1] for key in list(store._data) if ':session:' not in key})
+            stored = state_bytes(store)
+            elapsed = time.perf_counter() - started
+            print(f"{n:9d} {stats['keys']:10d} {live_users:11d} {process_memory().get('rss_mb', 0.0):8.1f} "
+                  f"{stored / 1024:9.0f} {stored // max(1, live_users):7d} {stats['expired']:9d} "
+                  f"{n * args.turns_per_user / elapsed:8.0f}")
+
+    # One user's recent responses after a long conversation, both ways
+    recent = RecentResponses(Config.RECENT_RESPONSES_PER_USER)
+    index = registry.response_index()
+    ring, used = None, set()
+    for response_id in range(min(len(index), 1000)):
+        ring = recent.add(ring, response_id)
+        used.add(json.dumps(index.responses[response_id], sort_keys=True))
+    print(f"recent responses of a user with {min(len(index), 1000)} replies: ring {len(pickle.dumps(ring))} B "
+          f"vs set of JSON strings {len(pickle.dumps(used))} B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# gunicorn -c gunicorn.conf.py run:app
+#
+# With PRELOAD_MODELS=True (the default) the master imports the app and loads
+# the models once (WARMUP_MODE=preload); the workers are forked from it and
+# share the weights copy-on-write instead of each loading its own copy. Only
+# what cannot cross a fork (thread pools, the analysis cache, the translation
+# service, and with INFERENCE_BACKEND=onnx the ONNX Runtime sessions) is
+# rebuilt per worker. Check the savings with
+#     python -m app.utils.memory <master pid>
+#
+# Each worker has its own memory, so STATE_BACKEND=memory allows one worker
+# only: the turns of a session would otherwise land on workers holding
+# different per-user and per-session state. Several workers need
+# STATE_BACKEND=redis; WEB_CONCURRENCY defaults to 2 then, and to 1 otherwise.
+import gc
+import importlib.util
+import os
+import sys
+
+from app.utils.config import Config
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', '2' if Config.STATE_BACKEND == 'redis' else '1'))
+if workers > 1 and Config.STATE_BACKEND != 'redis':
+    raise SystemExit(f"WEB_CONCURRENCY={workers} needs STATE_BACKEND=redis: with the '{Config.STATE_BACKEND}' "
+                     f"state store each worker would keep its own conversation state")
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = 120
+preload_app = os.getenv('PRELOAD_MODELS', 'True') == 'True'
+
+if preload_app:
+    os.environ.setdefault('WARMUP_MODE', 'preload')
+    # No collections while the models load, so freed objects leave no holes
+    # between them on pages the workers would otherwise share
+    gc.disable()
+    if Config.ANALYSIS_MODE == 'full' and Config.INFERENCE_BACKEND == 'torch' and importlib.util.find_spec('torch'):
+        # torch's OpenMP pool is not fork-safe: the master's warm-up runs on one
+        # thread so no pool exists at the fork, and post_fork sizes each worker's
+        import torch
+        torch.set_num_threads(1)
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        # Everything loaded so far goes to the permanent generation: collections
+        # in the workers never touch it, so its pages stay shared
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+    # The log writer thread stayed behind in the master
+    from app.utils.logger import after_fork
+    after_fork()
+    if 'torch' in sys.modules:
+        # One intra-op pool per worker, sized so the workers together use each core once
+        sys.modules['torch'].set_num_threads(max(1, (os.cpu_count() or 1) // server.cfg.workers))
+    if server.cfg.preload_app:
+        from app.services.warmup import get_warmup
+        get_warmup().after_fork()
+
+
+def post_worker_init(worker):
+    from app.utils.memory import process_memory
+    usage = process_memory()
+    if usage:
+        worker.log.info(f"Worker {usage['pid']} ready: RSS {usage['rss_mb']:.0f} MB, "
+                        f"unique {usage['uss_mb']:.0f} MB, PSS {usage['pss_mb']:.0f} MB")
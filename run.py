@@ -1,20 +1,7 @@
-import nltk
 from app import create_app
 
-def setup_nltk():
-    """Download required NLTK resources"""
-    try:
-        nltk.download('punkt')
-        nltk.download('punkt_tab')
-        print("NLTK resources downloaded successfully")
-    except Exception as e:
-        print(f"Error downloading NLTK resources: {e}")
-        raise
-
-# Initialize NLTK resources
-setup_nltk()
-
-# Create Flask app
+# Create Flask app; the models are loaded by the warm-up
+# started in create_app, see WARMUP_MODE
 app = create_app()
 
 if __name__ == '__main__':
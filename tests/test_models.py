@@ -3,4 +3,24 @@ from app.models.session_model import Session
 def test_session_model():
     session = Session("123")
     session.update_conversation_history("Hello", "Hi there")
-    assert len(session.conversation_history) == 1
\ No newline at end of file
+    assert len(session.conversation_history) == 1
+
+def test_session_history_is_a_ring_that_survives_pickling():
+    import pickle
+    from datetime import datetime
+
+    session = Session("s1", "u1", history_size=3)
+    for n in range(5):
+        session.update_conversation_history(f"user {n}", f"bot {n}")
+
+    history = session.get_history()
+    assert [turn['turn'] for turn in history] == [2, 3, 4] and len(session.history._users) == 3
+    assert all(datetime.fromisoformat(turn['timestamp']) for turn in history)
+    page = session.history_page(limit=2)
+    assert [turn['user'] for turn in page['turns']] == ["user 3", "user 4"] and page['next_cursor'] == 3
+    assert session.history_page(before=3, limit=2)['next_cursor'] is None
+
+    restored = pickle.loads(pickle.dumps(session, protocol=pickle.HIGHEST_PROTOCOL))
+    assert restored.get_history() == history and restored.history.total == 5
+    # The legacy context is only built when read
+    assert session._context is None and session.context['user_id'] == "u1"
@@ -14,4 +14,247 @@ def test_home_route(client):
 
 def test_chat_route(client):
     response = client.post('/api/chat', json={"session_id": "123", "message": "Hello"})
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def test_ready_route_reports_warmup_state(client):
+    response = client.get('/ready')
+    assert response.status_code in (200, 503)
+    assert response.get_json()['ready'] == (response.status_code == 200)
+
+def _events(response):
+    import json
+    events = []
+    for frame in response.get_data(as_text=True).strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in frame.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+@pytest.fixture
+def lite_models(monkeypatch):
+    from app.services.model_registry import get_registry
+    from app.utils.config import Config
+    monkeypatch.setattr(Config, 'ANALYSIS_MODE', 'lite')
+    get_registry().clear()
+    yield
+    get_registry().clear()
+
+def test_chat_stream_sends_crisis_resources_first(client, lite_models):
+    response = client.post('/api/chat/stream', json={"session_id": "s-crisis", "message": "I want to die"})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    events = _events(response)
+    assert [event for event, _ in events] == ['crisis', 'done']
+    crisis, done = events[0][1], events[1][1]
+    assert crisis['priority'] == 'urgent' and crisis['resources']['crisis_line']
+    assert done['message'] == crisis['message'] and done['context']['crisis_mode']
+
+    events = _events(client.post('/api/chat/stream', json={"session_id": "s-calm", "message": "I had a good day"}))
+    assert [event for event, _ in events] == ['message', 'done']
+    assert events[1][1]['message'] == events[0][1]['message']
+    assert not events[1][1]['context']['crisis_mode']
+
+    assert client.post('/api/chat/stream', json={"session_id": "s-calm"}).status_code == 400
+
+def test_chat_batch_streams_jsonl_results_in_input_order(client, lite_models, monkeypatch):
+    import json
+    from app.utils.config import Config
+    monkeypatch.setattr(Config, 'BATCH_REPLAY_ROUTE', True)
+    body = "\n".join([
+        json.dumps({"session_id": "a", "message": "I feel anxious"}),
+        json.dumps({"session_id": "b", "message": "I can't sleep"}),
+        "not json",
+        json.dumps({"session_id": "a", "message": "thanks, that helps"}),
+    ])
+    response = client.post('/api/chat/batch', data=body, content_type='application/x-ndjson')
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line.get('index') for line in lines[:-1]] == [0, 1, 2, 3]
+    assert 'error' in lines[2] and lines[3]['session_id'] == 'a' and lines[3]['response']
+    assert lines[-1]['stats']['turns'] == 3 and lines[-1]['stats']['sessions'] == 2
+
+def test_chat_batch_is_off_by_default_and_bounded(client, lite_models, monkeypatch):
+    import json
+    from app.utils.config import Config
+    body = "\n".join(json.dumps({"session_id": f"s{n}", "message": "I feel anxious"}) for n in range(4))
+    assert client.post('/api/chat/batch', data=body, content_type='application/x-ndjson').status_code == 404
+
+    monkeypatch.setattr(Config, 'BATCH_REPLAY_ROUTE', True)
+    monkeypatch.setattr(Config, 'BATCH_REPLAY_SIZE', 2)
+    response = client.post('/api/chat/batch?batch_size=1000&window=1000', data=body,
+                           content_type='application/x-ndjson')
+    stats = json.loads(response.get_data(as_text=True).splitlines()[-1])['stats']
+    assert stats['turns'] == 4 and stats['avg_batch_size'] <= 2
+
+    monkeypatch.setattr(Config, 'BATCH_REPLAY_MAX_BYTES', 64)
+    assert client.post('/api/chat/batch', data=body, content_type='application/x-ndjson').status_code == 413
+
+def test_asgi_chat_rejects_requests_over_the_pending_limit(lite_models, monkeypatch):
+    import asyncio
+    import json
+    import threading
+    from app import asgi
+
+    release = threading.Event()
+    run_turn = asgi._run_turn
+    def slow_turn(*args):
+        release.wait(5)
+        return run_turn(*args)
+    monkeypatch.setattr(asgi, '_run_turn', slow_turn)
+    application = asgi.ChatASGIApp(create_app(), workers=1, max_pending=1)
+
+    async def post(path, payload):
+        events = [{'type': 'http.request', 'body': json.dumps(payload).encode(), 'more_body': False}]
+        sent = []
+        async def receive():
+            return events.pop(0) if events else {'type': 'http.disconnect'}
+        async def send(message):
+            sent.append(message)
+        await application({'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+                           'headers': [(b'content-type', b'application/json')]}, receive, send)
+        return sent[0]['status'], dict(sent[0]['headers']), json.loads(b''.join(m.get('body', b'') for m in sent[1:]))
+
+    async def run():
+        first = asyncio.ensure_future(post('/api/chat', {"session_id": "a1", "message": "I feel anxious"}))
+        while application.pending == 0:
+            await asyncio.sleep(0.01)
+        busy = await post('/api/chat', {"session_id": "a2", "message": "hello"})
+        release.set()
+        return await first, busy, await post('/api/chat/stream', {"session_id": "a3"})
+
+    (status, _, body), (busy_status, busy_headers, _), (invalid_status, _, _) = asyncio.run(run())
+    assert status == 200 and body['message'] and body['context']['interaction_count'] == 1
+    assert busy_status == 503 and busy_headers[b'retry-after'] == b'1'
+    # Routes other than /api/chat are served by the Flask app
+    assert invalid_status == 400
+    assert application.stats()['rejected'] == 1 and application.stats()['completed'] == 1
+    application.close()
+
+def test_asgi_chat_times_translation_once_and_unregisters_its_collector(lite_models):
+    import asyncio
+    import json
+    from app import asgi, create_app
+    from app.services.metrics import get_metrics
+
+    metrics = get_metrics()
+    application = asgi.ChatASGIApp(create_app(), workers=1)
+    pending_samples = lambda: [line for line in metrics.render().splitlines()
+                               if line.split(' ')[0].endswith('_asgi_pending_requests')]
+    assert len(pending_samples()) == 1
+    before = metrics.stage_stats().get('translate_in', {}).get('count', 0)
+
+    async def post(payload):
+        events = [{'type': 'http.request', 'body': json.dumps(payload).encode(), 'more_body': False}]
+        sent = []
+        async def receive():
+            return events.pop(0) if events else {'type': 'http.disconnect'}
+        async def send(message):
+            sent.append(message)
+        await application({'type': 'http', 'method': 'POST', 'path': '/api/chat', 'query_string': b'',
+                           'headers': [(b'content-type', b'application/json')]}, receive, send)
+        return sent[0]['status']
+
+    assert asyncio.run(post({"session_id": "t1", "message": "I feel anxious", "language": "sw"})) == 200
+    assert metrics.stage_stats()['translate_in']['count'] == before + 1
+    application.close()
+    assert pending_samples() == []
+
+def test_asgi_streams_sse_replies_from_the_flask_app(lite_models):
+    import asyncio
+    import json
+    from app import asgi, create_app
+
+    application = asgi.ChatASGIApp(create_app(), workers=1)
+
+    async def stream(message):
+        events = [{'type': 'http.request', 'body': json.dumps({"session_id": "sse", "message": message}).encode(),
+                   'more_body': False}]
+        sent = []
+        async def receive():
+            return events.pop(0) if events else {'type': 'http.disconnect'}
+        async def send(event):
+            sent.append(event)
+        await application({'type': 'http', 'method': 'POST', 'path': '/api/chat/stream', 'query_string': b'',
+                           'headers': [(b'content-type', b'application/json')]}, receive, send)
+        return sent
+
+    async def run():
+        return await stream("I feel anxious about work"), await stream("it's still hard")
+
+    for n, sent in enumerate(asyncio.run(run()), start=1):
+        assert sent[0]['type'] == 'http.response.start' and sent[0]['status'] == 200
+        assert sent[-1] == {'type': 'http.response.body', 'body': b'', 'more_body': False}
+        frames = b''.join(event.get('body', b'') for event in sent[1:]).decode().strip().split('\n\n')
+        events = [dict(line.split(': ', 1) for line in frame.split('\n')) for frame in frames]
+        assert [event['event'] for event in events] == ['message', 'done']
+        # The turn's state was stored: the next turn of the session sees it
+        assert json.loads(events[1]['data'])['context']['interaction_count'] == n
+    application.close()
+
+def test_asgi_answers_413_for_bodies_over_the_limit(lite_models):
+    import asyncio
+    from app import asgi, create_app
+
+    application = asgi.ChatASGIApp(create_app(), workers=1, max_body_bytes=64)
+
+    async def post(path, chunks, headers=()):
+        events = [{'type': 'http.request', 'body': chunk, 'more_body': n < len(chunks) - 1}
+                  for n, chunk in enumerate(chunks)]
+        sent = []
+        async def receive():
+            return events.pop(0) if events else {'type': 'http.disconnect'}
+        async def send(message):
+            sent.append(message)
+        await application({'type': 'http', 'method': 'POST', 'path': path, 'query_string': b'',
+                           'headers': [(b'content-type', b'application/json'), *headers]}, receive, send)
+        return sent[0]['status'], len(events)
+
+    async def run():
+        return (await post('/api/chat', [b'{"message": "', b'x' * 60, b'"}']),
+                await post('/api/chat/batch', [b'{}\n'], [(b'content-length', b'100000')]),
+                await post('/api/chat/stream', [b'{}']))
+
+    (chat_status, _), (batch_status, unread), (small_status, _) = asyncio.run(run())
+    assert chat_status == 413
+    # Refused on Content-Length, before reading the body
+    assert batch_status == 413 and unread == 1
+    assert small_status == 400
+    application.close()
+
+def test_metrics_route_exposes_stage_histograms_and_service_counters(client, lite_models):
+    client.post('/api/chat', json={"session_id": "m1", "message": "I feel anxious about work", "language": "sw"})
+    response = client.get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    lines = response.get_data(as_text=True).splitlines()
+    assert '# TYPE ssuubi_chat_stage_seconds histogram' in lines
+    for stage in ('turn', 'translate_in', 'analysis', 'intent', 'response', 'translate_out', 'state_read'):
+        count = next(line for line in lines if line.startswith(f'ssuubi_chat_stage_seconds_count{{stage="{stage}"}}'))
+        assert int(count.split()[-1]) >= 1
+    assert any(line.startswith('ssuubi_cache_hits_total{cache="translation"}') for line in lines)
+    assert int(next(line for line in lines if line.startswith('ssuubi_live_sessions ')).split()[-1]) >= 1
+
+def test_chat_logs_carry_the_request_id_and_redact_message_text(client, lite_models):
+    import json
+    import logging
+    from app.utils.logger import JsonFormatter
+
+    records = []
+    capture = logging.Handler()
+    capture.emit = records.append
+    root, handler_logger = logging.getLogger(), logging.getLogger('app.services.conversation_handler')
+    # After the queue handler, which stamps the request id on each record
+    root.addHandler(capture)
+    handler_logger.setLevel(logging.DEBUG)
+    try:
+        response = client.post('/api/chat', json={"session_id": "log1", "message": "my secret worry"},
+                               headers={'X-Request-ID': 'req-123'})
+    finally:
+        root.removeHandler(capture)
+        handler_logger.setLevel(logging.NOTSET)
+    assert response.headers['X-Request-ID'] == 'req-123'
+    turn = next(record for record in records if record.getMessage() == 'Chat turn')
+    assert turn.request_id == 'req-123' and turn.stage_ms['turn'] > 0 and 'response' in turn.stage_ms
+
+    updated = json.loads(JsonFormatter().format(next(r for r in records if r.getMessage().startswith('Updated session'))))
+    assert updated['request_id'] == 'req-123' and updated['user_text']['chars'] == len("my secret worry")
+    assert 'my secret worry' not in json.dumps(updated)
+    assert client.get('/ready').headers['X-Request-ID'] != 'req-123'
@@ -10,4 +10,607 @@ def test_conversation_manager():
 def test_response_generator():
     generator = ResponseGenerator()
     response = generator.generate_response("I feel sad", {})
-    assert "message" in response
\ No newline at end of file
+    assert "message" in response
+
+class _CountingSentiment:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text):
+        self.calls += 1
+        return [{'label': 'NEGATIVE', 'score': 0.9}]
+
+class _CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, **kwargs):
+        self.calls += 1
+        return [0.0]
+
+def _stub_loaders():
+    from app.services.theme_index import ThemeEmbeddingIndex
+    from app.services.translation import StubTranslationBackend, TranslationService
+
+    return {
+        'sentiment': lambda registry: _CountingSentiment(),
+        'embedding': lambda registry: _CountingEmbedder(),
+        'theme_index': lambda registry: ThemeEmbeddingIndex({}),
+        'intent_index': lambda registry: ThemeEmbeddingIndex({}),
+        'response_bank': lambda registry: {},
+        'translation_service': lambda registry: TranslationService(StubTranslationBackend()),
+    }
+
+def test_model_registry_loads_each_resource_once():
+    import threading
+    from app.services.model_registry import ModelRegistry
+
+    calls = []
+    loaders = _stub_loaders()
+    loaders['sentiment'] = lambda registry: calls.append('sentiment') or object()
+    registry = ModelRegistry(loaders=loaders)
+
+    threads = [threading.Thread(target=registry.sentiment_pipeline) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['sentiment']
+    assert registry.sentiment_pipeline() is registry.sentiment_pipeline()
+
+def test_handlers_share_registry_models():
+    from app.services.conversation_handler import ConversationHandler
+    from app.services.model_registry import ModelRegistry
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    first = ConversationHandler(registry)
+    second = ConversationHandler(registry)
+    assert first.analyzer is second.analyzer
+    assert first.sentiment_analyzer.pipeline is second.sentiment_analyzer.pipeline
+    assert first.sentiment_analyzer.state is second.sentiment_analyzer.state
+
+def test_generate_response_runs_models_once_per_message():
+    from app.services.conversation_handler import ConversationHandler
+    from app.services.model_registry import ModelRegistry
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    handler = ConversationHandler(registry)
+    handler.generate_response("I feel anxious about work", "s1", "u1")
+
+    assert registry.sentiment_pipeline().calls == 1
+    assert registry.embedding_model().calls == 1
+
+def test_micro_batcher_groups_concurrent_requests():
+    import threading
+    from app.services.inference_scheduler import MicroBatcher
+
+    batches = []
+    def double(items):
+        batches.append(len(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50)
+    results = {}
+    def worker(n):
+        results[n] = batcher(n)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert results == {n: n * 2 for n in range(8)}
+    assert max(batches) > 1
+    assert batcher.stats()['requests'] == 8
+
+def test_micro_batcher_serves_or_refuses_every_submit_racing_close():
+    import threading
+    from app.services.inference_scheduler import MicroBatcher
+
+    batcher = MicroBatcher(lambda items: items, max_batch_size=4, max_wait_ms=1)
+    futures, refused = [], []
+    def submit():
+        for n in range(200):
+            try:
+                futures.append(batcher.submit(n))
+            except RuntimeError:
+                refused.append(n)
+
+    threads = [threading.Thread(target=submit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    batcher.close()
+    for thread in threads:
+        thread.join()
+    # Every accepted request is answered: none is left queued behind the stop marker
+    assert all(future.result(timeout=5) is not None for future in futures)
+    assert len(futures) + len(refused) == 800
+
+def test_intent_matcher_returns_every_intent_by_priority():
+    from re import Pattern
+    from app.services.intent_matcher import IntentMatcher
+    from app.services.intents import MessageIntent
+    from app.services.message_patterns import patterns_data
+
+    matcher = IntentMatcher(patterns_data)
+    matches = matcher.match("Hi, I feel like I can't go on and I can't sleep")
+    intents = [match.intent for match in matches]
+
+    assert intents[0] == MessageIntent.CRISIS
+    assert {MessageIntent.GREETING, MessageIntent.SLEEP, MessageIntent.UNKNOWN} <= set(intents)
+    assert intents[-1] == MessageIntent.UNKNOWN
+
+    for message in ["hello there", "thank you so much", "I am so  anxious", "İ feel\thopeless", ""]:
+        expected = {
+            entry.intent for entry in patterns_data
+            if any(isinstance(p, Pattern) and p.search(message) for p in entry.patterns)
+        }
+        assert {match.intent for match in matcher.match(message)} == expected
+
+def test_intent_classifier_keeps_specific_regex_matches_and_falls_back_to_exemplars():
+    from app.services.intent_classifier import IntentClassifier, IntentPrediction, build_exemplar_index
+    from app.services.intent_exemplars import INTENT_EXEMPLARS
+    from app.services.intent_matcher import IntentMatcher
+    from app.services.intents import MessageIntent
+    from app.services.message_patterns import patterns_data
+    from app.services.model_registry import LITE_LOADERS, ModelRegistry
+
+    embedder = ModelRegistry(loaders=dict(LITE_LOADERS)).embedding_model()
+    index = build_exemplar_index(embedder, INTENT_EXEMPLARS)
+    assert len(index.theme_ids) == sum(len(phrases) for phrases in INTENT_EXEMPLARS.values())
+    matcher = IntentMatcher(patterns_data)
+    classifier = IntentClassifier(matcher, index, threshold=0.5, top_k=5)
+
+    def classify(message):
+        return classifier.classify(message, embedder.encode(message))
+
+    # Crisis and specific concerns matched by a pattern never reach the exemplars
+    assert classify("I want to die") == IntentPrediction(MessageIntent.CRISIS, 1.0, 'regex')
+    assert classify("I can't sleep, I'm so lonely").source == 'regex'
+    # Only the catch-all matched: the nearest exemplars decide
+    prediction = classify("my wife and I argue every night")
+    assert (prediction.intent, prediction.source) == (MessageIntent.RELATIONSHIP, 'embedding')
+    assert prediction.score >= 0.5
+    # Nothing close enough: the regex answer stands
+    assert classify("hmm").intent == MessageIntent.UNKNOWN
+    assert IntentClassifier(matcher).classify("my wife and I argue every night").intent == MessageIntent.UNKNOWN
+
+def test_theme_matcher_matches_per_theme_regex():
+    import re
+    from app.services.sentiment_analyzer import THEME_KEYWORDS
+    from app.services.theme_matcher import ThemeMatcher
+
+    matcher = ThemeMatcher(THEME_KEYWORDS)
+    messages = [
+        "I'm burnt out and feel not good enough at work",
+        "I'm so burntout",
+        "feeling stressed, overwhelmed and lonely",
+        "I can’t go on",
+        "giving up on my career",
+        "nothing here",
+    ]
+    for message in messages:
+        expected = {
+            theme for theme, keywords in THEME_KEYWORDS.items()
+            if re.search(r'\b(' + '|'.join(keywords) + r')\b', message.lower())
+        }
+        assert matcher.match(message.lower()) == expected
+    assert matcher.match("i'm burnt out") == {'stress'}
+
+def test_intensity_scorer_counts_standalone_marker_words():
+    from app.services.intensity_scorer import IntensityScorer
+
+    scorer = IntensityScorer()
+    assert scorer.score("I'm feeling really anxious about work") == 1.5
+    assert scorer.score("I am very, very tired.") == 4.0
+    assert scorer.score("SO! Very. Extremely") == 5.0
+    assert scorer.score("\"so\" (really)") == 3.0
+    assert scorer.score("veryn't so's") == 3.5
+    # Joined to another word by a hyphen, slash or inner period: not a marker
+    assert scorer.score("I feel so-so today, very/bad, x.so") == 0
+    assert scorer.score("reallyso soup also") == 0
+    assert scorer.score("") == 0
+    assert scorer.score("very very very") == 5.0
+
+def test_intensity_scorer_agrees_with_word_tokenize_on_plain_sentences():
+    nltk = pytest.importorskip('nltk')
+    from app.services.intensity_scorer import INTENSITY_MARKERS, IntensityScorer
+    try:
+        nltk.word_tokenize('warm up.')
+    except LookupError:
+        pytest.skip('punkt_tab data is not installed')
+
+    scorer = IntensityScorer()
+    messages = [
+        "I'm feeling really anxious about work",
+        "I am very, very tired.",
+        "extremely sad... and somewhat lonely",
+        "It's been incredibly hard (really hard) since she passed.",
+        "I feel so-so today",
+        "Honestly? Moderately okay. Slightly better than yesterday.",
+        "SO! Very. Extremely",
+    ]
+    for message in messages:
+        tokens = nltk.word_tokenize(message.lower())
+        assert scorer.score(message) == min(sum(INTENSITY_MARKERS.get(t, 0) for t in tokens), 5.0), message
+
+def test_theme_index_scores_every_theme_in_one_product():
+    import numpy as np
+    from app.services.theme_index import ThemeEmbeddingIndex
+
+    rng = np.random.default_rng(0)
+    theme_embeddings = {theme: rng.standard_normal((n, 16)).astype(np.float32)
+                        for theme, n in [('anxiety', 4), ('grief', 3), ('work', 5)]}
+    message = theme_embeddings['grief'][1] + 0.1 * rng.standard_normal(16).astype(np.float32)
+
+    expected = []
+    for keywords in theme_embeddings.values():
+        keywords = keywords / np.linalg.norm(keywords, axis=1, keepdims=True)
+        expected.append((keywords @ (message / np.linalg.norm(message))).max())
+
+    for dtype, tolerance in [('float32', 1e-6), ('float16', 1e-3), ('int8', 1e-2)]:
+        index = ThemeEmbeddingIndex(theme_embeddings, dtype=dtype)
+        assert np.allclose(index.scores(message), expected, atol=tolerance)
+        assert index.match(message, threshold=0.8) == ['grief']
+    assert ThemeEmbeddingIndex(theme_embeddings, 'int8').nbytes < ThemeEmbeddingIndex(theme_embeddings).nbytes
+
+class _FakeTokenizer:
+    def __call__(self, texts, padding, truncation, max_length, return_tensors):
+        import numpy as np
+        width = min(max_length, max(len(text.split()) for text in texts))
+        mask = np.array([[1] * min(len(t.split()), width) + [0] * (width - min(len(t.split()), width)) for t in texts])
+        return {'input_ids': mask * 7, 'attention_mask': mask, 'token_type_ids': mask * 0}
+
+class _FakeSession:
+    """Stands in for an onnxruntime session; records the feeds it was run with."""
+
+    def __init__(self, output):
+        self.output = output
+        self.feeds = []
+
+    def get_inputs(self):
+        from types import SimpleNamespace
+        return [SimpleNamespace(name='input_ids'), SimpleNamespace(name='attention_mask')]
+
+    def run(self, output_names, feed):
+        self.feeds.append(feed)
+        return [self.output(feed)]
+
+def test_onnx_wrappers_match_pipeline_and_encode_outputs():
+    import numpy as np
+    from app.services.onnx_backend import OnnxModel, OnnxSentenceEncoder, OnnxSentimentPipeline
+
+    # Logits favour POSITIVE for one-word messages and NEGATIVE otherwise
+    logits = lambda feed: np.array([[float(m.sum() > 1), float(m.sum() <= 1)] for m in feed['attention_mask']])
+    session = _FakeSession(logits)
+    sentiment = OnnxSentimentPipeline(OnnxModel(session, _FakeTokenizer(), 512), {0: 'NEGATIVE', 1: 'POSITIVE'})
+    assert sentiment("great")[0]['label'] == 'POSITIVE'
+    results = sentiment(["great", "not great at all", "fine"], batch_size=2)
+    assert [r['label'] for r in results] == ['POSITIVE', 'NEGATIVE', 'POSITIVE']
+    assert abs(results[0]['score'] - np.exp(1) / (1 + np.exp(1))) < 1e-6
+    assert len(session.feeds) == 3 and set(session.feeds[-1]) == {'input_ids', 'attention_mask'}
+
+    # Token vectors are [position, 1]; padded positions must not count towards the mean
+    hidden = lambda feed: np.stack([np.stack([np.arange(m.shape[0]), np.ones(m.shape[0])], axis=1) for m in feed['attention_mask']])
+    encoder = OnnxSentenceEncoder(OnnxModel(_FakeSession(hidden), _FakeTokenizer(), 256), normalize=False)
+    embeddings = encoder.encode(["a b c", "a"])
+    assert embeddings.shape == (2, 2)
+    assert np.allclose(embeddings, [[1.0, 1.0], [0.0, 1.0]])
+    single = OnnxSentenceEncoder(encoder.model).encode("a b c")
+    assert single.shape == (2,) and abs(np.linalg.norm(single) - 1.0) < 1e-6
+
+def test_lite_mode_analyzes_without_models():
+    from app.services.model_registry import LITE_LOADERS, ModelRegistry
+    from app.services.sentiment_analyzer import SentimentAnalyzer
+    from app.services.state_store import InMemoryStateStore
+
+    registry = ModelRegistry(loaders=LITE_LOADERS)
+    sentiment = registry.sentiment_pipeline()
+    assert sentiment("I feel so much better today")[0]['label'] == 'POSITIVE'
+    assert sentiment("I feel hopeless and alone")[0]['label'] == 'NEGATIVE'
+    assert sentiment("I'm not happy at all")[0]['label'] == 'NEGATIVE'
+    assert sentiment("I don't feel worthless anymore")[0]['label'] == 'POSITIVE'
+    assert sentiment(["hello"]) == [{'label': 'POSITIVE', 'score': 0.5}]
+
+    analyzer = SentimentAnalyzer(registry, state=InMemoryStateStore())
+    result = analyzer.analyze_message("I had a panic attack at the office", {'user_id': 'u1'})
+    assert result['sentiment']['label'] == 'NEGATIVE'
+    # Neither 'panic' nor 'office' is a theme keyword; the static vectors find both themes
+    assert set(result['themes']) == {'anxiety', 'work'}
+    assert analyzer.analyze_message("hello there", {'user_id': 'u1'})['themes'] == []
+
+def test_batch_replayer_batches_across_sessions_in_session_order():
+    from app.services.batch_replay import BatchReplayer
+    from app.services.model_registry import LITE_LOADERS, ModelRegistry
+    from app.services.state_store import session_key
+    from app.services.translation import StubTranslationBackend, TranslationService
+
+    batches = []
+    def counting_sentiment(registry):
+        lexicon = LITE_LOADERS['sentiment'](registry)
+        return lambda texts, **kwargs: batches.append(len(texts)) or lexicon(texts, **kwargs)
+
+    registry = ModelRegistry(loaders={**LITE_LOADERS, 'sentiment': counting_sentiment,
+                                      'translation_service': lambda registry: TranslationService(StubTranslationBackend())})
+    turns = [{'session_id': f"s{n % 3}", 'message': f"turn {n // 3} I feel anxious", 'language': 'en'} for n in range(9)]
+    turns[4]['language'] = 'sw'
+    turns.insert(5, {'message': "no session"})
+    replayer = BatchReplayer(registry, batch_size=8)
+    results = list(replayer.replay(turns))
+
+    assert [result['index'] for result in results] == list(range(10))
+    assert 'error' in results[5]
+    assert all(paragraph.startswith('[sw] ') for paragraph in results[4]['response'].split('\n\n'))
+    # One model batch per wave: the k-th turn of every session goes together
+    assert batches == [3, 3, 3]
+    history = replayer.state.get(session_key("s0")).get_history()
+    assert [entry['user'] for entry in history] == [f"turn {k} I feel anxious" for k in range(3)]
+    stats = replayer.stats()
+    assert stats['turns'] == 9 and stats['sessions'] == 3 and stats['errors'] == 1 and stats['turns_per_second'] > 0
+
+def test_response_index_selects_by_stage_without_repeating():
+    from app.services.intents import MessageIntent
+    from app.services.model_registry import ModelRegistry
+    from app.services.response_generator import ResponseGenerator
+    from app.services.response_index import ResponseIndex
+    from app.services.state_store import InMemoryStateStore, user_key
+
+    bank = {'anxiety': {
+        'anxiety': ["I'm sorry you feel anxious.", {'message': "Validation first.", 'followup': "What happened?"},
+                    "Tell me more."],
+        'work': ["I'm sorry work is hard.", {'message': "Let's try something.", 'techniques': ['Box breathing']},
+                 {'message': "Another idea.", 'techniques': ['Grounding']}, "Tell me more."],
+    }}
+    loaders = _stub_loaders()
+    loaders['response_bank'] = lambda registry: bank
+    registry = ModelRegistry(loaders=loaders)
+    index = registry.response_index()
+    assert len(index.bank) == 2
+    # The same response under two themes gets one id
+    shared = index.id_of("Tell me more.")
+    assert shared is not None
+    assert index.bank[('anxiety', 'anxiety')] & index.bank[('anxiety', 'work')] == 1 << shared
+    assert len(index.ids(index.bank_candidates('anxiety', ['anxiety', 'work']))) == 6
+    assert len(ResponseIndex(bank, [])) == 6
+
+    candidates = index.bank_candidates('anxiety', ['anxiety', 'work'])
+    assert [index.responses[i] for i in index.ids(index.filter_by_stage(candidates, 'validation', 'breathing'))] == \
+        ["I'm sorry you feel anxious.", {'message': "Validation first.", 'followup': "What happened?"},
+         "I'm sorry work is hard."]
+    coping = index.filter_by_stage(candidates, 'coping', 'grounding')
+    assert [index.responses[i]['message'] for i in index.ids(coping)] == ["Another idea."]
+    assert index.filter_by_stage(candidates, 'coping', 'yoga') == candidates & index.techniques
+
+    generator = ResponseGenerator(registry, InMemoryStateStore())
+    context = {'user_id': 'u1', 'sentiment_analysis': {'themes': ['anxiety', 'work']}, 'details': {}}
+    replies = set()
+    for _ in range(3):
+        generator.state.set(user_key('stage', 'u1'), {'stage': 'validation'})
+        replies.add(generator.generate_response(MessageIntent.ANXIETY, context))
+    assert len(replies) == 3
+
+def test_analysis_cache_reuses_model_outputs_for_repeated_messages():
+    from app.services.message_analysis import AnalysisPipeline
+    from app.services.analysis_cache import AnalysisCache
+    from app.services.model_registry import ModelRegistry
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    pipeline = AnalysisPipeline(registry, cache=AnalysisCache(max_entries=10))
+    pipeline.analyze("I'm sad")
+    analysis = pipeline.analyze("  i'm   SAD ")
+
+    assert registry.sentiment_pipeline().calls == 1
+    assert registry.embedding_model().calls == 1
+    assert analysis.text == "  i'm   SAD " and analysis.sentiment['label'] == 'NEGATIVE'
+    assert pipeline.cache.stats()['hits'] == 1
+
+def test_analysis_cache_evicts_and_expires(tmp_path):
+    from app.services.analysis_cache import AnalysisCache
+
+    now = [0.0]
+    cache = AnalysisCache(max_entries=2, ttl_seconds=60, clock=lambda: now[0])
+    for message in ["hi", "can't sleep", "I'm sad"]:
+        cache.put(message, {'label': 'NEGATIVE', 'score': 0.9}, [1.0, 2.0])
+    assert cache.get("hi") is None and cache.stats()['evictions'] == 1
+    now[0] = 61.0
+    assert cache.get("I'm sad") is None and cache.stats()['expirations'] == 1
+
+    path = str(tmp_path / 'analysis.db')
+    cache = AnalysisCache(path=path)
+    cache.put("hi", {'label': 'POSITIVE', 'score': 0.7}, [0.5, 0.25])
+    cache.close()
+    sentiment, embedding = AnalysisCache(path=path).get("HI")
+    assert sentiment == {'label': 'POSITIVE', 'score': 0.7}
+    assert embedding.tolist() == [0.5, 0.25]
+
+    # Rows written by other models are never served: another namespace, or another embedding size
+    lite = AnalysisCache(path=path, namespace='lite', dimension=20)
+    lite.put("hi", {'label': 'POSITIVE', 'score': 0.6}, [0.1] * 20)
+    lite.close()
+    assert AnalysisCache(path=path, namespace='torch:models', dimension=384).get("hi") is None
+    assert AnalysisCache(path=path, namespace='lite', dimension=384).get("hi") is None
+    assert len(AnalysisCache(path=path, namespace='lite', dimension=20)) == 0
+
+def test_translation_service_caches_and_batches():
+    from app.services.translation import StubTranslationBackend, TranslationService
+
+    backend = StubTranslationBackend()
+    service = TranslationService(backend, batch_size=2)
+    service.pretranslate(["I'm here for you.", "Try this: deep breathing"], ['sw']).result()
+    calls = len(backend.calls)
+
+    response = service.translate_response("I'm here for you.\n\nTry this: deep breathing", dest='sw')
+    assert response == "[sw] I'm here for you.\n\n[sw] Try this: deep breathing"
+    assert len(backend.calls) == calls
+
+    assert service.translate_many(["a", "b", "c", "a"], dest='fr') == ["[fr] a", "[fr] b", "[fr] c", "[fr] a"]
+    assert [texts for texts, _, _ in backend.calls[calls:]] == [("a", "b"), ("c",)]
+    assert service.submit("a", dest='fr').result() == "[fr] a"
+    assert service.stats()['hits'] == 3
+    service.close()
+
+def test_generate_response_translates_through_shared_service():
+    from app.services.conversation_handler import ConversationHandler
+    from app.services.model_registry import ModelRegistry
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    handler = ConversationHandler(registry)
+    response = handler.generate_response("Nina wasiwasi", "s1", "u1", language='sw')
+
+    backend = registry.translation_service().backend
+    assert backend.calls[0] == (("Nina wasiwasi",), 'en', 'auto')
+    assert all(paragraph.startswith('[sw] ') for paragraph in response.split('\n\n'))
+
+def test_session_store_evicts_least_recently_used_and_idle_sessions():
+    from app.services.session_store import SessionStore
+
+    now = [0.0]
+    store = SessionStore(lambda session_id: {'id': session_id}, max_sessions=2, idle_ttl_seconds=60,
+                         reap_interval_seconds=0, clock=lambda: now[0])
+    first = store.get_or_create('a')
+    store.get_or_create('b')
+    assert store.get_or_create('a') is first
+    store.get_or_create('c')
+    assert 'b' not in store and store.stats()['evicted_lru'] == 1
+
+    now[0] = 30.0
+    store.get_or_create('c')
+    now[0] = 70.0
+    assert store.reap() == 1
+    assert 'a' not in store and 'c' in store
+    assert store.stats() == {'created': 3, 'evicted_lru': 1, 'expired_idle': 1, 'peak': 2, 'live': 1}
+
+def _state_round_trips(store):
+    calls = {'get_many': 0, 'set_many': 0}
+    for name in calls:
+        method = getattr(store, name)
+        def counted(*args, name=name, method=method):
+            calls[name] += 1
+            return method(*args)
+        setattr(store, name, counted)
+    return calls
+
+def test_state_store_shares_state_across_handlers_in_one_round_trip():
+    from app.services.conversation_handler import ConversationHandler
+    from app.services.model_registry import ModelRegistry
+    from app.services.state_store import InMemoryStateStore
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    store = InMemoryStateStore()
+    calls = _state_round_trips(store)
+    # Two handlers stand in for two workers behind the same store
+    ConversationHandler(registry, store).generate_response("I feel anxious", "s1", "u1")
+    assert calls == {'get_many': 1, 'set_many': 1}
+
+    second = ConversationHandler(registry, store)
+    second.generate_response("still anxious", "s1", "u1")
+    assert calls == {'get_many': 2, 'set_many': 2}
+    assert len(store.get("ssuubi:session:s1").get_history()) == 2
+
+def test_state_store_expires_idle_users_and_recent_responses_stay_bounded():
+    from app.services.recent_responses import RecentResponses
+    from app.services.state_store import InMemoryStateStore
+
+    now = [0.0]
+    store = InMemoryStateStore(ttl_seconds=60, clock=lambda: now[0])
+    for n in range(100):
+        store.set(f"user-{n}", n)
+        now[0] += 1.0
+    # Only the users written within the last minute are still held
+    assert store.stats()['keys'] == 60 and store.stats()['expired'] == 40
+    assert store.get("user-40") is None and store.get("user-41") == 41
+
+    recent = RecentResponses(capacity=3)
+    value = None
+    for response_id in [5, 9, 5, 70, 200]:
+        value = recent.add(value, response_id)
+    assert recent.ids(value) == [5, 70, 200] and len(value) == 12
+    assert recent.mask(value) == (1 << 5) | (1 << 70) | (1 << 200)
+    assert recent.ids({'legacy'}) == [] and recent.mask(0b101) == 0
+
+def test_redis_state_store_refuses_the_default_secret():
+    from app.services.state_store import RedisStateStore
+    from app.utils.config import DEFAULT_SECRET_KEY
+
+    for secret in (DEFAULT_SECRET_KEY, ''):
+        with pytest.raises(ValueError):
+            RedisStateStore(client=object(), secret_key=secret)
+
+def test_redis_state_store_pipelines_turns():
+    fakeredis = pytest.importorskip('fakeredis')
+    from app.services.state_store import RedisStateStore
+
+    store = RedisStateStore(client=fakeredis.FakeRedis(), ttl_seconds=60, secret_key='test-secret')
+    with store.turn(['a', 'b']):
+        store.set('a', {'themes': {'anxiety'}})
+        assert store.get('a') == {'themes': {'anxiety'}}
+        assert store.get('b', []) == []
+    assert store.get('a') == {'themes': {'anxiety'}}
+    assert 0 < store.client.ttl('a') <= 60
+
+    # Only values signed with the same secret, under the same key, are unpickled
+    payload = store.client.get('a')
+    store.client.set('b', payload)
+    store.client.set('c', payload[:-1] + b'.')
+    assert store.get('b') is None and store.get('c') is None
+    assert RedisStateStore(client=store.client, secret_key='other').get('a') is None
+    assert RedisStateStore(client=store.client, secret_key='test-secret').get('a') == {'themes': {'anxiety'}}
+
+def test_warmup_loads_registry_resources_and_reports_status():
+    from app.services.model_registry import ModelRegistry
+    from app.services.warmup import Warmup
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    warmup = Warmup(registry, resources=['sentiment', 'embedding'])
+    assert not warmup.ready
+    warmup.start('background').wait(timeout=5)
+
+    status = warmup.status()
+    assert status['ready'] and status['state'] == 'ready'
+    assert set(status['timings_ms']) == {'sentiment', 'embedding'}
+    assert {'sentiment', 'embedding'} <= set(status['loaded'])
+
+    def broken(registry):
+        raise RuntimeError("model download failed")
+    failing = Warmup(ModelRegistry(loaders={'sentiment': broken}), resources=['sentiment'])
+    assert not failing.start('eager').ready
+    assert failing.status()['error'] == "model download failed"
+    assert Warmup(registry).start('lazy').ready
+
+def test_preload_warmup_shares_models_and_rebuilds_process_local_resources_after_fork():
+    from app.services.model_registry import ModelRegistry
+    from app.services.warmup import Warmup
+
+    registry = ModelRegistry(loaders=_stub_loaders())
+    warmup = Warmup(registry, resources=['sentiment', 'embedding', 'analysis_pipeline', 'translation_service'])
+    assert warmup.start('preload').ready
+    assert registry.loaded() == ['embedding', 'sentiment']
+    sentiment = registry.sentiment_pipeline()
+    registry.analysis_pipeline()
+
+    # In the forked worker: the models stay, what owns threads or files is rebuilt
+    assert warmup.after_fork().wait(timeout=5)
+    assert registry.sentiment_pipeline() is sentiment
+    assert {'analysis_pipeline', 'translation_service'} <= set(registry.loaded())
+    assert registry.analysis_pipeline().sentiment_model is sentiment
+    assert set(warmup.status()['timings_ms']) == {'sentiment', 'embedding', 'analysis_pipeline', 'translation_service'}
+
+def test_after_fork_rebuilds_onnx_sessions(monkeypatch):
+    from app.services.model_registry import ModelRegistry, process_local_resources
+    from app.utils.config import Config
+
+    monkeypatch.setattr(Config, 'ANALYSIS_MODE', 'full')
+    monkeypatch.setattr(Config, 'INFERENCE_BACKEND', 'onnx')
+    assert {'sentiment', 'embedding'} <= set(process_local_resources())
+    registry = ModelRegistry(loaders=_stub_loaders())
+    sentiment = registry.sentiment_pipeline()
+    registry.theme_index()
+    registry.after_fork()
+    assert registry.loaded() == ['theme_index']
+    assert registry.sentiment_pipeline() is not sentiment
+
+    monkeypatch.setattr(Config, 'INFERENCE_BACKEND', 'torch')
+    assert 'sentiment' not in process_local_resources()